@@ -0,0 +1,197 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from google.genai import types
+
+from agent.config import MODEL, MAX_ITERATIONS, generate_content_config
+from agent.history import HistoryManager
+from agent.loop import append_candidates, is_valid_tool_response
+from agent.tracing import Tracer
+from functions.call_function import call_function, WORKING_DIRECTORY
+from functions.manifest import build_manifest
+
+
+async def run_session_async(
+    backend, user_prompt, working_directory, verbose=False, history_budget=None, tracer=None, manifest=False
+):
+    """
+    Run one agent session on a backend's async generate_content.
+
+    Mirrors agent.loop.run_session, but awaits generate_content and runs the
+    blocking tools in a worker thread so many sessions can share one event loop.
+
+    Args:
+        backend: model backend (see agent.backends)
+        user_prompt (str): the task for the agent
+        working_directory (str): directory the session's tools are confined to
+        verbose (bool): whether to print detailed call information
+        history_budget (int | None): token budget for HistoryManager, or None to send the full history
+        tracer (Tracer | None): collects spans and token totals; a private one is used if None
+        manifest (bool): send a manifest of the working directory with the system prompt
+
+    Returns:
+        dict: final text, steps taken, token usage summed over all steps and error (if any).
+    """
+    messages = [types.Content(role="user", parts=[types.Part(text=user_prompt)])]
+    history = HistoryManager(history_budget) if history_budget is not None else None
+    if tracer is None:
+        tracer = Tracer()
+    manifest_text = None
+    if manifest:
+        with tracer.span("manifest", "prepare") as manifest_span:
+            manifest_text = await asyncio.to_thread(build_manifest, working_directory)
+            manifest_span["chars"] = len(manifest_text)
+    config = generate_content_config(manifest_text)
+    step = 0
+    response = None
+    text = None
+    error = None
+
+    while step < MAX_ITERATIONS:
+        step += 1
+        with tracer.span("step", "step", step=step):
+            try:
+                if history is not None:
+                    history.compact(messages)
+                with tracer.span("generate_content", "model", step=step) as model_span:
+                    response = await backend.generate_content_async(MODEL, messages, config)
+                    model_span.update(tracer.record_usage(getattr(response, "usage_metadata", None)))
+                append_candidates(messages, response)
+
+                function_calls = getattr(response, "function_calls", None) or []
+                if len(function_calls) > 0:
+                    for function_call_part in function_calls:
+                        function_call_result = await asyncio.to_thread(
+                            call_function,
+                            function_call_part,
+                            verbose=verbose,
+                            working_directory=working_directory,
+                            tracer=tracer,
+                        )
+                        if not is_valid_tool_response(function_call_result):
+                            error = "Invalid tool response structure: missing function_response part"
+                            break
+                        messages.append(function_call_result)
+                    if error is not None:
+                        # Same as agent.loop.run_session: a malformed tool response ends the session
+                        break
+                    continue
+
+                if getattr(response, "text", None):
+                    text = response.text
+                    break
+
+            except Exception as e:
+                error = f"Error during generate_content at step {step}: {e}"
+                break
+
+    return {
+        "text": text,
+        "steps": step,
+        "prompt_tokens": tracer.prompt_tokens,
+        "response_tokens": tracer.response_tokens,
+        "model_seconds": round(tracer.model_seconds, 3),
+        "history_tokens_saved": history.tokens_saved if history is not None else 0,
+        "error": error,
+    }
+
+
+def _load_batch(batch_path):
+    """Read prompts.jsonl: one {"prompt": ..., "id"?: ..., "working_directory"?: ...} per line."""
+    tasks = []
+    with open(batch_path, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            task = json.loads(line)
+            if isinstance(task, str):
+                task = {"prompt": task}
+            task.setdefault("id", str(line_number))
+            tasks.append(task)
+    return tasks
+
+
+def _session_workspace(task):
+    """
+    Give each session its own copy of the working directory unless one is provided.
+
+    Returns:
+        tuple: (directory, whether it is a temporary copy)
+    """
+    if task.get("working_directory"):
+        return task["working_directory"], False
+    workspace = tempfile.mkdtemp(prefix=f"agent-session-{task['id']}-")
+    shutil.copytree(WORKING_DIRECTORY, workspace, dirs_exist_ok=True)
+    return workspace, True
+
+
+async def run_batch(
+    backend,
+    batch_path,
+    output_path,
+    concurrency=4,
+    verbose=False,
+    history_budget=None,
+    tracer=None,
+    manifest=False,
+    keep_workspaces=False,
+):
+    """
+    Run every prompt in a JSONL file as an independent session.
+
+    At most `concurrency` sessions are in flight at once. Each result is written
+    to `output_path` as one JSON line as soon as its session finishes, so the
+    output order follows completion, not input order. A task without its own
+    "working_directory" runs in a temporary copy of the calculator, deleted
+    when the session ends unless `keep_workspaces` is set.
+
+    Returns:
+        int: the number of sessions run.
+    """
+    tasks = _load_batch(batch_path)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_task(task):
+        async with semaphore:
+            started = time.perf_counter()
+            workspace = None
+            temporary = False
+            try:
+                workspace, temporary = _session_workspace(task)
+                result = await run_session_async(
+                    backend,
+                    task["prompt"],
+                    workspace,
+                    verbose=verbose,
+                    history_budget=history_budget,
+                    tracer=tracer.session(task["id"]) if tracer is not None else None,
+                    manifest=manifest,
+                )
+            except Exception as e:
+                result = {"text": None, "steps": 0, "error": f"Session failed: {e}"}
+            finally:
+                if temporary and not keep_workspaces:
+                    await asyncio.to_thread(shutil.rmtree, workspace, ignore_errors=True)
+            result.update(
+                id=task["id"],
+                working_directory=workspace if keep_workspaces or not temporary else None,
+                elapsed_seconds=round(time.perf_counter() - started, 3),
+            )
+            return result
+
+    with open(output_path, "w", encoding="utf-8") as output:
+        for finished in asyncio.as_completed([run_task(task) for task in tasks]):
+            result = await finished
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            if result["error"]:
+                print(f"Session {result['id']}: {result['error']}", file=sys.stderr)
+
+    print(f"Wrote {len(tasks)} results to {os.path.abspath(output_path)}")
+    return len(tasks)
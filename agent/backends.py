@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+from google.genai import types
+
+from agent.streaming import StreamAssembler, split_response
+
+
+def _request_digest(contents):
+    """Short hash of a request's contents, stored with recordings for debugging."""
+    payload = json.dumps(
+        [content.model_dump(mode="json", exclude_none=True) for content in contents],
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+class LiveBackend:
+    """Model backend that calls the Gemini API through a genai.Client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, model, contents, config):
+        return self.client.models.generate_content(model=model, contents=contents, config=config)
+
+    def generate_content_stream(self, model, contents, config):
+        return self.client.models.generate_content_stream(model=model, contents=contents, config=config)
+
+    async def generate_content_async(self, model, contents, config):
+        return await self.client.aio.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+
+
+class LazyBackend:
+    """
+    Build a backend on first use.
+
+    A daemon serving only replay requests then never imports the SDK or
+    needs an API key. `factory` is called once, under a lock, and its
+    backend serves every later call.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = self.factory()
+            return self._backend
+
+    def generate_content(self, model, contents, config):
+        return self._get().generate_content(model, contents, config)
+
+    def generate_content_stream(self, model, contents, config):
+        return self._get().generate_content_stream(model, contents, config)
+
+    async def generate_content_async(self, model, contents, config):
+        return await self._get().generate_content_async(model, contents, config)
+
+
+class RecordingBackend:
+    """
+    Wrap another backend and append every response to a JSONL recording.
+
+    Each line holds the step number, a digest of the request contents and the
+    full response, so the session can be served back by ReplayBackend.
+    """
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self.step = 0
+        self._lock = threading.Lock()
+        # Start a fresh recording
+        open(self.path, "w", encoding="utf-8").close()
+
+    def _record(self, contents, response, chunks=None):
+        with self._lock:
+            self.step += 1
+            record = {
+                "step": self.step,
+                "request_digest": _request_digest(contents),
+                "response": response.model_dump(mode="json", exclude_none=True),
+            }
+            if chunks is not None:
+                record["chunks"] = [chunk.model_dump(mode="json", exclude_none=True) for chunk in chunks]
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record) + "\n")
+
+    def generate_content(self, model, contents, config):
+        response = self.inner.generate_content(model, contents, config)
+        self._record(contents, response)
+        return response
+
+    def generate_content_stream(self, model, contents, config):
+        # The chunks are kept too, so a replayed stream arrives in the same pieces
+        assembler = StreamAssembler()
+        chunks = []
+        for chunk in self.inner.generate_content_stream(model, contents, config):
+            assembler.add(chunk)
+            chunks.append(chunk)
+            yield chunk
+        self._record(contents, assembler.response(), chunks)
+
+    async def generate_content_async(self, model, contents, config):
+        response = await self.inner.generate_content_async(model, contents, config)
+        self._record(contents, response)
+        return response
+
+
+class ReplayBackend:
+    """
+    Serve the responses of a recording back in order, without any network.
+
+    Requests are not matched against the recording: tool output such as
+    timings differs between runs, and the loop only needs the same responses
+    in the same order to take the same path.
+
+    `latency` (seconds) is slept before every chunk of a streamed response,
+    and once per chunk it would have had before a whole response, to mimic
+    a model that takes time to generate; time-to-first-output of streaming
+    and non-streaming runs can then be compared offline.
+    """
+
+    def __init__(self, path, latency=0.0):
+        self.path = path
+        self.latency = latency
+        with open(path, "r", encoding="utf-8") as file:
+            records = [json.loads(line) for line in file if line.strip()]
+        # Other lines (such as a fixture's prompt header) are metadata, not responses
+        self.records = [record for record in records if "response" in record]
+        self.step = 0
+        self._lock = threading.Lock()
+
+    def _next_record(self):
+        with self._lock:
+            if self.step >= len(self.records):
+                raise RuntimeError(
+                    f"Replay exhausted: {self.path} has only {len(self.records)} responses"
+                )
+            record = self.records[self.step]
+            self.step += 1
+        return record
+
+    def _chunks(self, record):
+        if "chunks" in record:
+            return [types.GenerateContentResponse.model_validate(chunk) for chunk in record["chunks"]]
+        return split_response(types.GenerateContentResponse.model_validate(record["response"]))
+
+    def generate_content(self, model, contents, config):
+        record = self._next_record()
+        if self.latency:
+            time.sleep(self.latency * len(self._chunks(record)))
+        return types.GenerateContentResponse.model_validate(record["response"])
+
+    def generate_content_stream(self, model, contents, config):
+        for chunk in self._chunks(self._next_record()):
+            if self.latency:
+                time.sleep(self.latency)
+            yield chunk
+
+    async def generate_content_async(self, model, contents, config):
+        record = self._next_record()
+        if self.latency:
+            # Sleep without blocking the event loop, so replayed batch sessions overlap
+            await asyncio.sleep(self.latency * len(self._chunks(record)))
+        return types.GenerateContentResponse.model_validate(record["response"])
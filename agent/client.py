@@ -0,0 +1,57 @@
+import json
+import os
+import socket
+import sys
+
+# Kept free of SDK and agent imports: the point of the client is to start fast
+
+
+def default_socket_path():
+    """The daemon's socket: $AI_AGENT_SOCKET, or agent.sock in the cache directory."""
+    if os.environ.get("AI_AGENT_SOCKET"):
+        return os.environ["AI_AGENT_SOCKET"]
+    from functions.disk_cache import CACHE_DIR
+
+    return os.path.join(CACHE_DIR, "agent.sock")
+
+
+def run_remote(request, socket_path=None, on_event=None):
+    """
+    Run one session on a daemon (see agent.daemon) and relay its output.
+
+    What the session prints is written to this process's stdout and stderr
+    as it arrives, so the command line behaves as if it ran locally.
+
+    Args:
+        request (dict): the session request; "cwd" defaults to the current directory
+        socket_path (str | None): the daemon's socket, default_socket_path() if None
+        on_event (callable | None): called with every other event (such as "step")
+
+    Returns:
+        int: the session's exit status, or 1 if the daemon could not be reached
+    """
+    socket_path = socket_path or default_socket_path()
+    request = dict(request, cwd=request.get("cwd") or os.getcwd())
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError as e:
+        sock.close()
+        print(f"Error: Cannot connect to the agent daemon at {socket_path}: {e}", file=sys.stderr)
+        return 1
+
+    with sock, sock.makefile("r", encoding="utf-8") as reader:
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        for line in reader:
+            event = json.loads(line)
+            kind = event.get("event")
+            if kind == "output":
+                stream = sys.stderr if event.get("stream") == "stderr" else sys.stdout
+                stream.write(event["text"])
+                stream.flush()
+            elif kind == "done":
+                return event.get("status", 0)
+            elif on_event is not None:
+                on_event(event)
+    print("Error: The agent daemon closed the connection before the session finished", file=sys.stderr)
+    return 1
@@ -0,0 +1,71 @@
+from functools import cache
+
+from functions.declarations import declaration
+from functions.get_files_info import get_files_info
+from functions.get_file_content import get_file_content
+from functions.run_python_file import run_python_file
+from functions.write_file import write_file
+from functions.edit_file import edit_file
+from functions.search_files import search_files
+from functions.read_files import read_files
+from functions.run_tests import run_tests
+
+MODEL = "gemini-2.0-flash-001"
+
+MAX_ITERATIONS = 20
+
+SYSTEM_PROMPT = """
+    You are a helpful AI coding agent.
+
+    When a user asks a question or makes a request, make a function call plan and use the available tools to accomplish the task end-to-end:
+
+    - List files and directories (get_files_info)
+    - Read file contents (get_file_content), or several files at once (read_files)
+    - Search all files for text or a regex, returning file:line matches (search_files)
+    - Write or modify files (write_file)
+    - Edit part of an existing file with search/replace blocks or a unified diff (edit_file)
+    - Run a Python file with optional args (run_python_file)
+    - Run the tests affected by your changes and get a pass/fail summary (run_tests)
+
+    For bug fixes or changes:
+    1) Reproduce the issue (e.g., run a file or tests),
+    2) Propose a minimal code change,
+    3) Apply the change by editing the file (prefer edit_file over rewriting it with write_file),
+    4) Re-run to verify the fix (run_tests runs only the tests your edits can affect),
+    5) Summarize what changed and the result.
+
+    All paths you provide should be relative to the working directory. You do not need to specify the working directory in your function calls as it is automatically injected for security reasons.
+    """
+
+# Tools offered to the model; their declarations are generated from these functions
+TOOL_FUNCTIONS = (
+    get_files_info,
+    get_file_content,
+    run_python_file,
+    write_file,
+    edit_file,
+    search_files,
+    read_files,
+    run_tests,
+)
+
+
+@cache
+def available_functions():
+    """Build the Tool with every tool's FunctionDeclaration, once, on first use."""
+    from google.genai import types
+
+    return types.Tool(function_declarations=[declaration(func) for func in TOOL_FUNCTIONS])
+
+
+def generate_content_config(manifest=None):
+    """Build the request config shared by every generate_content call, with an optional workspace manifest."""
+    from google.genai import types
+
+    system_instruction = SYSTEM_PROMPT
+    if manifest:
+        system_instruction += "\n" + manifest
+    return types.GenerateContentConfig(
+        tools=[available_functions()],
+        system_instruction=system_instruction,
+    )
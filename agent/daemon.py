@@ -0,0 +1,266 @@
+import contextvars
+import io
+import json
+import os
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.backends import ReplayBackend
+from agent.client import default_socket_path
+from agent.history import HistoryManager
+from agent.loop import run_session, session_summary
+from agent.tracing import Tracer
+from functions.call_function import WORKING_DIRECTORY
+from functions.dispatch import DEFAULT_MAX_WORKERS
+
+DEFAULT_SESSIONS = 4
+
+# The channel of the session running in the current context; None outside sessions
+_channel = contextvars.ContextVar("session_channel", default=None)
+
+
+class _Channel:
+    """
+    One client connection, as seen by its session.
+
+    Events go out as JSON lines. Printed text is buffered per stream and sent
+    as an "output" event at each newline or flush, so a session's prints reach
+    its own client and nobody else's. A client that has gone away is ignored:
+    the session still runs to completion.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.buffers = {"stdout": [], "stderr": []}
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def send(self, **event):
+        data = (json.dumps(event) + "\n").encode("utf-8")
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self.conn.sendall(data)
+            except OSError:
+                self.closed = True
+
+    def write(self, stream, text):
+        with self._lock:
+            self.buffers[stream].append(text)
+        if "\n" in text:
+            self.flush(stream)
+
+    def flush(self, stream=None):
+        for name in (stream,) if stream else tuple(self.buffers):
+            with self._lock:
+                text = "".join(self.buffers[name])
+                self.buffers[name].clear()
+            if text:
+                self.send(event="output", stream=name, text=text)
+
+
+class _RoutedStream(io.TextIOBase):
+    """Stand-in for sys.stdout/sys.stderr that sends a session's writes to its client."""
+
+    def __init__(self, name, fallback):
+        self.name = name
+        self.fallback = fallback
+
+    @property
+    def encoding(self):
+        return self.fallback.encoding
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        channel = _channel.get()
+        if channel is None:
+            return self.fallback.write(text)
+        channel.write(self.name, text)
+        return len(text)
+
+    def flush(self):
+        channel = _channel.get()
+        if channel is None:
+            self.fallback.flush()
+        else:
+            channel.flush(self.name)
+
+
+class AgentDaemon:
+    """
+    Serve agent sessions to local clients over a Unix socket.
+
+    The process builds the model backend (and so its HTTP connection pool)
+    once, and keeps tool state such as the result cache,
+    search indexes and warm Python workers between sessions. Up to `sessions`
+    requests run at once on a thread pool; further clients wait in the
+    listen queue.
+
+    A client sends one JSON line: {"prompt", "cwd", and optionally "verbose",
+    "parallel", "max_workers", "history_budget", "stream", "manifest",
+    "trace", "replay"}. The daemon answers with JSON lines: "output" events
+    carrying what the session printed, a "step" event after every step, and
+    a final {"event": "done", "status": N}. Relative "replay" and "trace"
+    paths are resolved against the client's "cwd", and both must lie under
+    the daemon's working directory, since the daemon reads and writes them
+    on a client's behalf.
+
+    Args:
+        backend: model backend shared by every session, or None to accept
+            only requests that name a recording to replay
+        socket_path (str): where to listen; created with owner-only permissions
+        sessions (int): sessions run concurrently
+        root (str | None): directory replay and trace paths are resolved
+            under; the daemon's working directory if None
+    """
+
+    def __init__(self, backend, socket_path=None, sessions=DEFAULT_SESSIONS, root=None):
+        self.backend = backend
+        self.root = os.path.realpath(root or os.getcwd())
+        self.socket_path = socket_path or default_socket_path()
+        self.sessions = sessions
+        self.sock = None
+        self._stopping = threading.Event()
+
+    def _bind(self):
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                # Left behind by a daemon that did not shut down cleanly
+                os.unlink(self.socket_path)
+            else:
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            finally:
+                probe.close()
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        sock.listen(64)
+        return sock
+
+    def serve_forever(self, ready=None):
+        """Accept clients until shutdown() is called. `ready` (an Event) is set once listening."""
+        stdout, stderr = sys.stdout, sys.stderr
+        if not isinstance(stdout, _RoutedStream):
+            sys.stdout = _RoutedStream("stdout", stdout)
+            sys.stderr = _RoutedStream("stderr", stderr)
+        try:
+            self.sock = self._bind()
+        except BaseException:
+            sys.stdout, sys.stderr = stdout, stderr
+            raise
+        if ready is not None:
+            ready.set()
+        try:
+            with ThreadPoolExecutor(max_workers=self.sessions, thread_name_prefix="session") as pool:
+                while not self._stopping.is_set():
+                    try:
+                        conn, _ = self.sock.accept()
+                    except OSError:
+                        break
+                    pool.submit(self._handle, conn)
+        finally:
+            self.sock.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+            sys.stdout, sys.stderr = stdout, stderr
+
+    def shutdown(self):
+        self._stopping.set()
+        if self.sock is not None:
+            # Unblocks accept()
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+
+    def _handle(self, conn):
+        with conn:
+            channel = _Channel(conn)
+            token = _channel.set(channel)
+            try:
+                with conn.makefile("r", encoding="utf-8") as reader:
+                    line = reader.readline()
+                request = json.loads(line)
+                if not isinstance(request, dict) or not request.get("prompt"):
+                    raise ValueError("request needs a prompt")
+                status = self._run(request, channel)
+            except Exception as e:
+                print(f"Error: {e}", file=sys.stderr)
+                status = 1
+            finally:
+                _channel.reset(token)
+            channel.flush()
+            channel.send(event="done", status=status)
+
+    def _resolve(self, path, kind, cwd):
+        """
+        Absolute path of a client-supplied file, which must lie under self.root.
+
+        Relative paths are taken from the client's directory, as they would be
+        without the daemon.
+        """
+        resolved = os.path.realpath(os.path.join(cwd, path))
+        if not resolved.startswith(self.root + os.sep):
+            raise ValueError(
+                f'{kind} file "{path}" resolves to {resolved}, outside {self.root}; the daemon only '
+                f"reads replays and writes traces under the directory it was started in"
+            )
+        return resolved
+
+    def _run(self, request, channel):
+        cwd = request.get("cwd") or os.getcwd()
+        # Checked before the session starts, so a bad trace path costs no model calls
+        trace_path = self._resolve(request["trace"], "trace", cwd) if request.get("trace") else None
+        if request.get("replay"):
+            backend = ReplayBackend(self._resolve(request["replay"], "replay", cwd))
+        else:
+            backend = self.backend
+        if backend is None:
+            raise ValueError("this daemon has no model backend; only replay requests are served")
+
+        working_directory = os.path.join(cwd, request.get("working_directory") or WORKING_DIRECTORY)
+        history_budget = request.get("history_budget")
+        history = HistoryManager(history_budget) if history_budget is not None else None
+        tracer = Tracer()
+
+        def on_step(step, messages, model_seconds, tool_seconds):
+            channel.send(
+                event="step",
+                step=step,
+                model_seconds=round(model_seconds, 6),
+                tool_seconds=round(tool_seconds, 6),
+            )
+
+        response, _ = run_session(
+            backend,
+            request["prompt"],
+            working_directory=working_directory,
+            verbose=bool(request.get("verbose")),
+            parallel=bool(request.get("parallel")),
+            max_workers=request.get("max_workers") or DEFAULT_MAX_WORKERS,
+            history=history,
+            on_step=on_step,
+            tracer=tracer,
+            stream=bool(request.get("stream")),
+            manifest=bool(request.get("manifest")),
+        )
+        if trace_path is not None:
+            tracer.write(trace_path)
+        if request.get("verbose") and response is not None:
+            print(session_summary(request["prompt"], tracer, history))
+        return 0
@@ -0,0 +1,154 @@
+import json
+
+DEFAULT_TOKEN_BUDGET = 8000
+
+# Rough chars-per-token ratio; good enough to keep the prompt size bounded
+CHARS_PER_TOKEN = 4
+
+_STUB_SUFFIX = "; call the tool again if needed]"
+
+
+def _part_chars(part):
+    chars = len(getattr(part, "text", None) or "")
+    function_call = getattr(part, "function_call", None)
+    if function_call is not None:
+        chars += len(function_call.name or "") + len(json.dumps(function_call.args or {}, default=str))
+    function_response = getattr(part, "function_response", None)
+    if function_response is not None:
+        chars += len(function_response.name or "") + len(
+            json.dumps(function_response.response or {}, default=str)
+        )
+    return chars
+
+
+def estimate_tokens(content):
+    """Estimate the prompt tokens a types.Content adds to a request."""
+    parts = getattr(content, "parts", None) or []
+    return sum(_part_chars(part) for part in parts) // CHARS_PER_TOKEN + 1
+
+
+class HistoryManager:
+    """
+    Keep the conversation sent on every step within a token budget.
+
+    Once the estimated size of `messages` exceeds the budget, tool responses and
+    large function call arguments the model has already seen are replaced,
+    oldest first, by a short stub with a preview of the original. If that is
+    not enough, the oldest tool exchanges (a model turn with its tool
+    responses) are dropped entirely. The most recent `keep_recent` model turns
+    and the tool traffic after them are never touched, so the model always
+    sees what it just asked for.
+    """
+
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, keep_recent=1, preview_chars=200):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.preview_chars = preview_chars
+        # Tokens removed from the history so far; every later request saves them again
+        self.elided_tokens = 0
+        self.tokens_saved = 0
+
+    def _preview(self, value, label):
+        text = value if isinstance(value, str) else json.dumps(value, default=str)
+        if len(text) <= self.preview_chars or text.endswith(_STUB_SUFFIX):
+            return None
+        return (
+            text[: self.preview_chars]
+            + f"\n[...{len(text) - self.preview_chars} characters of earlier {label} elided"
+            + _STUB_SUFFIX
+        )
+
+    def _stub_part(self, part):
+        function_response = getattr(part, "function_response", None)
+        if function_response is not None:
+            response = dict(function_response.response or {})
+            changed = False
+            for key in ("result", "error"):
+                if key in response:
+                    stub = self._preview(response[key], f"{function_response.name} output")
+                    if stub is not None:
+                        response[key] = stub
+                        changed = True
+            if changed:
+                return part.model_copy(
+                    update={"function_response": function_response.model_copy(update={"response": response})}
+                )
+
+        function_call = getattr(part, "function_call", None)
+        if function_call is not None and function_call.args:
+            args = dict(function_call.args)
+            changed = False
+            for key, value in args.items():
+                stub = self._preview(value, f"{function_call.name} argument")
+                if stub is not None:
+                    args[key] = stub
+                    changed = True
+            if changed:
+                return part.model_copy(
+                    update={"function_call": function_call.model_copy(update={"args": args})}
+                )
+        return None
+
+    def _stub(self, content):
+        parts = getattr(content, "parts", None) or []
+        new_parts = []
+        changed = False
+        for part in parts:
+            stubbed = self._stub_part(part)
+            changed = changed or stubbed is not None
+            new_parts.append(stubbed if stubbed is not None else part)
+        if not changed:
+            return None
+        return content.model_copy(update={"parts": new_parts})
+
+    def _cutoff(self, messages):
+        """Index of the oldest model turn that must be kept intact."""
+        model_turns = [i for i, content in enumerate(messages) if getattr(content, "role", None) == "model"]
+        if self.keep_recent <= 0:
+            return len(messages)
+        if len(model_turns) < self.keep_recent:
+            return 0
+        return model_turns[-self.keep_recent]
+
+    def _oldest_exchange_end(self, messages):
+        """End index of the oldest droppable model turn plus its tool responses, or None."""
+        cutoff = self._cutoff(messages)
+        if cutoff <= 1 or getattr(messages[1], "role", None) != "model":
+            return None
+        end = 2
+        while end < cutoff and getattr(messages[end], "role", None) == "tool":
+            end += 1
+        return end if end <= cutoff else None
+
+    def compact(self, messages):
+        """
+        Compact `messages` in place before it is sent to the model.
+
+        Returns:
+            list: the same `messages` list.
+        """
+        total = sum(estimate_tokens(content) for content in messages)
+        if total > self.token_budget:
+            # The first message is the user prompt and is always kept as is
+            for i in range(1, self._cutoff(messages)):
+                if total <= self.token_budget:
+                    break
+                stubbed = self._stub(messages[i])
+                if stubbed is None:
+                    continue
+                saved = estimate_tokens(messages[i]) - estimate_tokens(stubbed)
+                messages[i] = stubbed
+                total -= saved
+                self.elided_tokens += saved
+
+        while total > self.token_budget:
+            end = self._oldest_exchange_end(messages)
+            if end is None:
+                break
+            saved = sum(estimate_tokens(content) for content in messages[1:end])
+            del messages[1:end]
+            total -= saved
+            self.elided_tokens += saved
+
+        self.tokens_saved += self.elided_tokens
+        return messages
@@ -0,0 +1,242 @@
+import sys
+import time
+
+from google.genai import types
+
+from agent.config import MODEL, MAX_ITERATIONS, generate_content_config
+from agent.streaming import StreamAssembler
+from agent.tracing import Tracer
+from functions.call_function import call_function, result_cache, WORKING_DIRECTORY
+from functions.dispatch import call_functions, Dispatcher, DEFAULT_MAX_WORKERS
+from functions.manifest import build_manifest
+
+
+def append_candidates(messages, response):
+    """Add each candidate's content of a model response to the conversation history."""
+    candidates = getattr(response, "candidates", None) or []
+    for cand in candidates:
+        content = getattr(cand, "content", None)
+        if content is not None:
+            messages.append(content)
+
+
+def is_valid_tool_response(function_call_result):
+    """Check that a tool response Content carries a function_response part."""
+    try:
+        return bool(function_call_result.parts) and bool(
+            getattr(function_call_result.parts[0], "function_response", None)
+        )
+    except Exception:
+        return False
+
+
+def session_summary(user_prompt, tracer, history=None):
+    """The summary printed after a verbose session: tokens, model and tool totals, cache stats."""
+    lines = [f"User prompt: {user_prompt} ", tracer.summary()]
+    if history is not None:
+        lines.append(f"History tokens saved: {history.tokens_saved}")
+    lines.append(result_cache.stats())
+    return "\n".join(lines)
+
+
+def generate_streaming(backend, model, messages, config, dispatcher, model_span, started):
+    """
+    Consume a streamed response as it arrives.
+
+    Text is printed chunk by chunk and every function call is handed to
+    `dispatcher` as soon as the chunk carrying it is in, so tools run while
+    the rest of the turn is still being generated. The time from `started`
+    to the first text or call is stored in model_span["first_output"].
+
+    Returns:
+        types.GenerateContentResponse: the chunks assembled into one response.
+    """
+    assembler = StreamAssembler()
+    printed = False
+    for chunk in backend.generate_content_stream(model, messages, config):
+        text, function_calls = assembler.add(chunk)
+        if (text or function_calls) and "first_output" not in model_span:
+            model_span["first_output"] = round(time.perf_counter() - started, 6)
+        if text:
+            print(text, end="", flush=True)
+            printed = True
+        for function_call in function_calls:
+            dispatcher.submit(function_call)
+    if printed:
+        print()
+    return assembler.response()
+
+
+def run_session(
+    backend,
+    user_prompt,
+    working_directory=WORKING_DIRECTORY,
+    verbose=False,
+    parallel=False,
+    max_workers=DEFAULT_MAX_WORKERS,
+    history=None,
+    on_step=None,
+    tracer=None,
+    stream=False,
+    manifest=False,
+    session_log=None,
+):
+    """
+    Run the agent loop for one prompt.
+
+    Args:
+        backend: model backend (see agent.backends) providing generate_content,
+            and generate_content_stream when streaming
+        user_prompt (str): the task for the agent
+        working_directory (str): directory the tools are confined to
+        verbose (bool): whether to print detailed call information
+        parallel (bool): run the function calls of a turn concurrently
+        max_workers (int): size of the worker pool when parallel
+        history (HistoryManager | None): compacts the history before each step
+        on_step (callable | None): called after each step as
+            on_step(step, messages, model_seconds, tool_seconds)
+        tracer (Tracer | None): collects spans and token totals; a private one is used if None
+        stream (bool): stream each response, printing text as it arrives and
+            starting tools before the turn is complete; tool_seconds then only
+            counts the wait for tools after the stream has ended
+        manifest (bool): send a manifest of the working directory (files, sizes,
+            hashes, Python symbols) with the system prompt, built before the first step
+        session_log (SessionLog | None): log every completed step to; when it was
+            resumed, the loop continues from its messages and last completed step
+
+    Returns:
+        tuple: (last response or None, messages)
+    """
+    if session_log is not None and session_log.messages:
+        messages = list(session_log.messages)
+    else:
+        messages = [types.Content(role="user", parts=[types.Part(text=user_prompt)])]
+    if tracer is None:
+        tracer = Tracer()
+
+    model = MODEL
+
+    manifest_text = None
+    if manifest:
+        with tracer.span("manifest", "prepare") as manifest_span:
+            manifest_text = build_manifest(working_directory)
+            manifest_span["chars"] = len(manifest_text)
+    config = generate_content_config(manifest_text)
+
+    # Iteratively call the model, append candidates, run tools, append tool responses
+    max_iterations = MAX_ITERATIONS
+    step = session_log.step if session_log is not None else 0
+    response = None
+
+    while step < max_iterations:
+        step += 1
+        model_seconds = tool_seconds = 0.0
+        dispatcher = None
+        with tracer.span("step", "step", step=step) as step_span:
+            try:
+                if history is not None:
+                    history.compact(messages)
+                # Everything after this point is new in this step
+                step_start = len(messages)
+
+                started = time.perf_counter()
+                with tracer.span("generate_content", "model", step=step) as model_span:
+                    if stream:
+                        dispatcher = Dispatcher(
+                            verbose=verbose,
+                            max_workers=max_workers if parallel else 1,
+                            working_directory=working_directory,
+                            tracer=tracer,
+                        )
+                        response = generate_streaming(
+                            backend, model, messages, config, dispatcher, model_span, started
+                        )
+                    else:
+                        response = backend.generate_content(
+                            model,
+                            messages,  # Always pass the full conversation so the model continues from current state
+                            config,
+                        )
+                        model_span["first_output"] = round(time.perf_counter() - started, 6)
+                    model_span.update(tracer.record_usage(getattr(response, "usage_metadata", None)))
+                model_seconds = time.perf_counter() - started
+
+                # Add each candidate's content to the conversation history
+                append_candidates(messages, response)
+
+                # Execute any function calls and append tool responses
+                function_calls = getattr(response, "function_calls", None) or []
+                if len(function_calls) > 0:
+                    started = time.perf_counter()
+                    if dispatcher is not None:
+                        # Already running since their parts arrived
+                        function_call_results = dispatcher.results()
+                    elif parallel:
+                        # Results come back in call order, so history is unchanged
+                        function_call_results = call_functions(
+                            function_calls,
+                            verbose=verbose,
+                            max_workers=max_workers,
+                            working_directory=working_directory,
+                            tracer=tracer,
+                        )
+                    else:
+                        function_call_results = (
+                            call_function(
+                                function_call_part,
+                                verbose=verbose,
+                                working_directory=working_directory,
+                                tracer=tracer,
+                            )
+                            for function_call_part in function_calls
+                        )
+
+                    for function_call_result in function_call_results:
+                        # Validate structure
+                        if not is_valid_tool_response(function_call_result):
+                            # Print and stop if tool response is malformed
+                            print(
+                                "Error: Invalid tool response structure: missing function_response part",
+                                file=sys.stderr,
+                            )
+                            break
+
+                        if verbose:
+                            print(
+                                f"-> {function_call_result.parts[0].function_response.response}"
+                            )
+
+                        # Append tool response message back into the conversation
+                        messages.append(function_call_result)
+                    tool_seconds = time.perf_counter() - started
+                    step_span["tool_calls"] = len(function_calls)
+                    if session_log is not None:
+                        session_log.complete_step(step, messages[step_start:])
+
+                    # Continue loop to let the model consume the tool outputs
+                    continue
+
+                # If the model returned final text and there are no tool calls, we're done
+                if getattr(response, "text", None):
+                    if not stream:
+                        print(response.text)
+                    if session_log is not None:
+                        session_log.complete_step(step, messages[step_start:], done=True)
+                    break
+
+                # Neither final text nor tool calls: iterate again until max iterations
+                if session_log is not None:
+                    session_log.complete_step(step, messages[step_start:])
+                continue
+
+            except Exception as e:
+                print(f"Error during generate_content at step {step}: {e}", file=sys.stderr)
+                break
+
+            finally:
+                if dispatcher is not None:
+                    dispatcher.close()
+                if on_step is not None:
+                    on_step(step, messages, model_seconds, tool_seconds)
+
+    return response, messages
@@ -0,0 +1,273 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from agent.history import estimate_tokens
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+
+# HTTP statuses worth retrying: rate limiting, timeouts and transient server errors
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` units per minute.
+
+    reserve() always takes its units immediately, letting the level go
+    negative, and returns how long the caller must wait before using them.
+    Callers are therefore served in the order they reserved, and a burst of
+    concurrent callers is spread out at the refill rate instead of racing.
+    """
+
+    def __init__(self, per_minute, now, capacity=None):
+        self.rate = per_minute / 60
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = now
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        self._refill(now)
+        # More than the capacity could never be satisfied; wait for a full bucket instead
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def adjust(self, amount, now):
+        """Take (or, if negative, give back) units without waiting, e.g. to settle an estimate."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits shared by every caller.
+
+    One limiter is meant to be shared by all concurrent sessions (threads or
+    asyncio tasks) using the same quota. A limit of None is not enforced.
+
+    Args:
+        requests_per_minute (int | None): request quota
+        tokens_per_minute (int | None): prompt + response token quota
+        clock (callable): monotonic time source, replaceable in tests
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, clock=time.monotonic):
+        self.clock = clock
+        now = clock()
+        self.requests = TokenBucket(requests_per_minute, now) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, now) if tokens_per_minute else None
+        # Set when the server asks everyone to back off (429 with a retry delay)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens):
+        """Reserve one request and an estimated token count; returns the seconds to wait first."""
+        with self._lock:
+            now = self.clock()
+            wait = max(0.0, self.paused_until - now)
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            return wait
+
+    def settle(self, estimated, actual):
+        """Correct a reservation once the real token usage is known."""
+        if self.tokens is None:
+            return
+        with self._lock:
+            self.tokens.adjust(actual - estimated, self.clock())
+
+    def pause(self, seconds):
+        """Hold back every caller for `seconds`, as a server-sent retry delay applies to the whole quota."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+def _parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after(error):
+    """
+    Return the delay the server asked for in a failed response, or None.
+
+    Looks at the Retry-After header (seconds or an HTTP date) and at the
+    retryDelay of a google.rpc.RetryInfo in the error body.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None and headers.get("retry-after") is not None:
+        return _parse_retry_after(headers.get("retry-after"))
+
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        body = details.get("error", details)
+        for detail in body.get("details", None) or []:
+            if isinstance(detail, dict) and isinstance(detail.get("retryDelay"), str):
+                return _parse_retry_after(detail["retryDelay"].rstrip("s"))
+    return None
+
+
+def is_retryable(error):
+    """Whether a failed model call is transient: a retryable HTTP status or a network error."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in RETRY_STATUSES
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(error, httpx.TransportError)
+
+
+def _usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None)
+
+
+class SchedulingBackend:
+    """
+    Wrap another backend with rate limiting and retries of transient failures.
+
+    Every call first waits for the shared RateLimiter, using the request's
+    estimated prompt size, then settles the estimate against the reported
+    usage. Rate limiting (429), timeouts, 5xx errors and network errors are
+    retried with exponential backoff and full jitter; a delay sent by the
+    server (Retry-After or RetryInfo) is honoured and also pauses the limiter,
+    so concurrent sessions back off together instead of hammering the quota.
+
+    Args:
+        inner: the backend making the actual calls
+        limiter (RateLimiter | None): shared limiter; one without limits if None
+        max_retries (int): retries after the first attempt before giving up
+        base_delay (float): backoff for the first retry, doubled on each one after
+        max_delay (float): cap on the backoff
+    """
+
+    def __init__(
+        self,
+        inner,
+        limiter=None,
+        max_retries=DEFAULT_MAX_RETRIES,
+        base_delay=DEFAULT_BASE_DELAY,
+        max_delay=DEFAULT_MAX_DELAY,
+        sleep=time.sleep,
+        async_sleep=asyncio.sleep,
+        jitter=random.random,
+    ):
+        self.inner = inner
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+        self.jitter = jitter
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def _backoff(self, error, attempt):
+        """Seconds to wait before retrying after `error`, or None to give up."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        with self._lock:
+            self.retries += 1
+        delay = self.jitter() * min(self.max_delay, self.base_delay * 2**attempt)
+        requested = retry_after(error)
+        if requested is not None:
+            self.limiter.pause(requested)
+            delay = max(delay, requested)
+        return delay
+
+    def generate_content(self, model, contents, config):
+        estimate = sum(estimate_tokens(content) for content in contents)
+        attempt = 0
+        while True:
+            wait = self.limiter.reserve(estimate)
+            if wait:
+                self.sleep(wait)
+            try:
+                response = self.inner.generate_content(model, contents, config)
+            except Exception as e:
+                self.limiter.settle(estimate, 0)
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                self.sleep(delay)
+                continue
+            actual = _usage_tokens(response)
+            self.limiter.settle(estimate, estimate if actual is None else actual)
+            return response
+
+    def generate_content_stream(self, model, contents, config):
+        # Only failures before the first chunk are retried: after that, part
+        # of the response has been handed on and a retry would repeat it
+        estimate = sum(estimate_tokens(content) for content in contents)
+        attempt = 0
+        while True:
+            wait = self.limiter.reserve(estimate)
+            if wait:
+                self.sleep(wait)
+            try:
+                stream = iter(self.inner.generate_content_stream(model, contents, config))
+                first = next(stream, None)
+            except Exception as e:
+                self.limiter.settle(estimate, 0)
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                self.sleep(delay)
+                continue
+            break
+
+        actual = None
+        try:
+            if first is None:
+                return
+            actual = _usage_tokens(first)
+            yield first
+            for chunk in stream:
+                actual = _usage_tokens(chunk) or actual
+                yield chunk
+        finally:
+            self.limiter.settle(estimate, estimate if actual is None else actual)
+
+    async def generate_content_async(self, model, contents, config):
+        estimate = sum(estimate_tokens(content) for content in contents)
+        attempt = 0
+        while True:
+            wait = self.limiter.reserve(estimate)
+            if wait:
+                await self.async_sleep(wait)
+            try:
+                response = await self.inner.generate_content_async(model, contents, config)
+            except Exception as e:
+                self.limiter.settle(estimate, 0)
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await self.async_sleep(delay)
+                continue
+            actual = _usage_tokens(response)
+            self.limiter.settle(estimate, estimate if actual is None else actual)
+            return response
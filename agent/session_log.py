@@ -0,0 +1,135 @@
+import glob
+import json
+import os
+import secrets
+import time
+
+from google.genai import types
+
+from functions.disk_cache import CACHE_DIR
+
+SESSIONS_DIR = os.path.join(CACHE_DIR, "sessions")
+
+LOG_VERSION = 1
+
+# Older logs are removed when a new session starts
+MAX_SESSIONS = 50
+MAX_AGE = 30 * 24 * 60 * 60
+
+
+def _dump(content):
+    return content.model_dump(mode="json", exclude_none=True)
+
+
+def prune(directory=SESSIONS_DIR, keep=MAX_SESSIONS, max_age=MAX_AGE):
+    """Delete all but the newest keep logs, and any log not written for max_age seconds."""
+    logs = []
+    for path in glob.glob(os.path.join(directory, "*.jsonl")):
+        try:
+            logs.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    logs.sort(reverse=True)
+    cutoff = time.time() - max_age
+    for index, (mtime, path) in enumerate(logs):
+        if index >= keep or mtime < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class SessionLog:
+    """
+    Append-only JSONL log of one agent session, for resuming it after a crash.
+
+    The first line holds the prompt and working directory. Every completed
+    step then appends one line with the contents it added to the history
+    (the model turn and its tool responses), flushed and fsynced before the
+    next step starts. A step that did not complete leaves no line, so a
+    resumed session repeats only that step: finished model calls and tool
+    runs are never executed again.
+    """
+
+    def __init__(self, path, prompt, working_directory, messages=None, step=0, done=False):
+        self.path = path
+        self.prompt = prompt
+        self.working_directory = working_directory
+        # History rebuilt from the log, starting with the prompt; empty for a new session
+        self.messages = messages or []
+        self.step = step
+        self.done = done
+
+    @property
+    def session_id(self):
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    @classmethod
+    def create(cls, prompt, working_directory, directory=SESSIONS_DIR):
+        """Start the log of a new session under a fresh id, pruning old logs first."""
+        os.makedirs(directory, exist_ok=True)
+        prune(directory, keep=MAX_SESSIONS - 1)
+        session_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        log = cls(os.path.join(directory, f"{session_id}.jsonl"), prompt, working_directory)
+        log._append(
+            {"version": LOG_VERSION, "prompt": prompt, "working_directory": working_directory}
+        )
+        return log
+
+    @classmethod
+    def resume(cls, session, directory=SESSIONS_DIR):
+        """
+        Load a session by id, path or "last" (the most recently written log).
+
+        Raises:
+            FileNotFoundError: if there is no such session
+            ValueError: if the log is not a session log this version can read
+        """
+        if session == "last":
+            logs = glob.glob(os.path.join(directory, "*.jsonl"))
+            if not logs:
+                raise FileNotFoundError(f"No sessions in {directory}")
+            path = max(logs, key=os.path.getmtime)
+        elif os.path.exists(session):
+            path = session
+        else:
+            path = os.path.join(directory, f"{session}.jsonl")
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No session {session!r} in {directory}")
+
+        with open(path, "rb+") as file:
+            data = file.read()
+            # A line cut short by a crash is dropped, so appends start on a fresh line
+            complete = data[: data.rfind(b"\n") + 1]
+            if len(complete) != len(data):
+                file.truncate(len(complete))
+        lines = complete.decode("utf-8").splitlines()
+        header = json.loads(lines[0]) if lines else {}
+        if header.get("version") != LOG_VERSION:
+            raise ValueError(f"{path} is not a version {LOG_VERSION} session log")
+
+        prompt = header["prompt"]
+        messages = [types.Content(role="user", parts=[types.Part(text=prompt)])]
+        step = 0
+        done = False
+        for line in lines[1:]:
+            record = json.loads(line)
+            messages.extend(types.Content.model_validate(content) for content in record["contents"])
+            step = record["step"]
+            done = record.get("done", False)
+        return cls(path, prompt, header.get("working_directory"), messages, step, done)
+
+    def _append(self, record):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def complete_step(self, step, contents, done=False):
+        """Record a completed step and the contents it added; done marks the final answer."""
+        record = {"step": step, "contents": [_dump(content) for content in contents]}
+        if done:
+            record["done"] = True
+        self._append(record)
+        self.step = step
+        self.done = done
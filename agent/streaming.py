@@ -0,0 +1,118 @@
+from google.genai import types
+
+# Characters of text per chunk when a whole response is replayed as a stream
+REPLAY_TEXT_CHUNK = 40
+
+
+def _is_text(part):
+    return part.text is not None and part.function_call is None
+
+
+class StreamAssembler:
+    """
+    Rebuild a full GenerateContentResponse from streamed chunks.
+
+    Streamed text arrives as many small text parts; consecutive ones are
+    joined back into one part, so the assembled candidate content (and with
+    it the conversation history) is the same as a non-streaming call would
+    have returned. Function calls always arrive whole, in a single chunk.
+    """
+
+    def __init__(self):
+        # candidate index -> {"role", "parts", "finish_reason"}
+        self.candidates = {}
+        self.usage_metadata = None
+        self.last_chunk = None
+
+    def add(self, chunk):
+        """
+        Merge one chunk.
+
+        Returns:
+            tuple: (text, function_calls) new in this chunk for the first
+            candidate, the same one response.text and response.function_calls read.
+        """
+        self.last_chunk = chunk
+        if chunk.usage_metadata is not None:
+            self.usage_metadata = chunk.usage_metadata
+        text = []
+        function_calls = []
+        for position, candidate in enumerate(chunk.candidates or []):
+            index = candidate.index if candidate.index is not None else position
+            merged = self.candidates.setdefault(index, {"role": None, "parts": [], "finish_reason": None})
+            if candidate.finish_reason is not None:
+                merged["finish_reason"] = candidate.finish_reason
+            content = candidate.content
+            if content is None:
+                continue
+            merged["role"] = content.role or merged["role"]
+            parts = merged["parts"]
+            for part in content.parts or []:
+                if index == min(self.candidates):
+                    if _is_text(part) and not part.thought:
+                        text.append(part.text)
+                    elif part.function_call is not None:
+                        function_calls.append(part.function_call)
+                if parts and _is_text(part) and _is_text(parts[-1]) and parts[-1].thought == part.thought:
+                    parts[-1] = parts[-1].model_copy(update={"text": parts[-1].text + part.text})
+                else:
+                    parts.append(part)
+        return "".join(text), function_calls
+
+    def response(self):
+        """The assembled response, as generate_content would have returned it."""
+        candidates = [
+            types.Candidate(
+                content=types.Content(role=merged["role"] or "model", parts=merged["parts"]),
+                finish_reason=merged["finish_reason"],
+                index=index,
+            )
+            for index, merged in sorted(self.candidates.items())
+        ]
+        last = self.last_chunk
+        return types.GenerateContentResponse(
+            candidates=candidates,
+            usage_metadata=self.usage_metadata,
+            model_version=getattr(last, "model_version", None),
+            response_id=getattr(last, "response_id", None),
+        )
+
+
+def split_response(response, text_chunk=REPLAY_TEXT_CHUNK):
+    """
+    Cut a complete response into the chunks a streaming call would deliver.
+
+    Text is cut into pieces of text_chunk characters and every other part
+    (such as a function call) becomes a chunk of its own. Usage metadata
+    and the finish reason ride on the last chunk, as they do from the API.
+    """
+    chunks = []
+    finish_reason = None
+    for position, candidate in enumerate(response.candidates or []):
+        index = candidate.index if candidate.index is not None else position
+        finish_reason = candidate.finish_reason or finish_reason
+        content = candidate.content
+        for part in (content.parts or []) if content is not None else []:
+            if _is_text(part) and part.text:
+                pieces = [
+                    part.model_copy(update={"text": part.text[start : start + text_chunk]})
+                    for start in range(0, len(part.text), text_chunk)
+                ]
+            else:
+                pieces = [part]
+            for piece in pieces:
+                chunks.append(
+                    types.GenerateContentResponse(
+                        candidates=[
+                            types.Candidate(
+                                content=types.Content(role=content.role, parts=[piece]), index=index
+                            )
+                        ]
+                    )
+                )
+    if not chunks:
+        return [response]
+    last = chunks[-1]
+    last.usage_metadata = response.usage_metadata
+    last.candidates[0].finish_reason = finish_reason
+    return chunks
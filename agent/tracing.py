@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Tracer:
+    """
+    Collect timed spans and running totals for agent sessions.
+
+    Spans cover each loop step, model call and tool execution. Totals sum the
+    token usage of every model response and the time and bytes returned per
+    tool, so a session's cost is visible without reading the trace itself.
+    Sessions of a batch share one event list through `session()`, each with
+    its own totals and its own track in the exported trace.
+    """
+
+    def __init__(self, track=None, _events=None, _origin=None, _lock=None):
+        self.track = track
+        self.origin = _origin if _origin is not None else time.perf_counter()
+        self.events = _events if _events is not None else []
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.total_tokens = 0
+        self.model_calls = 0
+        self.model_seconds = 0.0
+        # tool name -> [calls, seconds, bytes returned]
+        self.tools = {}
+        self._lock = _lock if _lock is not None else threading.Lock()
+
+    def session(self, track):
+        """A tracer for one session that writes into this tracer's events."""
+        return Tracer(track=str(track), _events=self.events, _origin=self.origin, _lock=self._lock)
+
+    @contextmanager
+    def span(self, name, category, **args):
+        """
+        Time the body of a with block as one span.
+
+        Yields the span's args dict so the body can add fields (such as the
+        bytes a tool returned) once they are known.
+        """
+        started = time.perf_counter()
+        try:
+            yield args
+        finally:
+            duration = time.perf_counter() - started
+            event = {
+                "name": name,
+                "cat": category,
+                "start": round(started - self.origin, 6),
+                "duration": round(duration, 6),
+                "track": self.track if self.track is not None else threading.current_thread().name,
+                "args": args,
+            }
+            with self._lock:
+                self.events.append(event)
+                if category == "model":
+                    self.model_calls += 1
+                    self.model_seconds += duration
+                elif category == "tool":
+                    totals = self.tools.setdefault(name, [0, 0.0, 0])
+                    totals[0] += 1
+                    totals[1] += duration
+                    totals[2] += args.get("bytes", 0)
+
+    def record_usage(self, usage):
+        """Add a response's usage_metadata to the token totals. Returns the counts added."""
+        counts = {
+            "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+            "response_tokens": getattr(usage, "candidates_token_count", None) or 0,
+            "total_tokens": getattr(usage, "total_token_count", None) or 0,
+        }
+        with self._lock:
+            self.prompt_tokens += counts["prompt_tokens"]
+            self.response_tokens += counts["response_tokens"]
+            self.total_tokens += counts["total_tokens"]
+        return counts
+
+    def summary(self):
+        """Human readable totals over all steps, one item per line."""
+        lines = [
+            f"Prompt tokens: {self.prompt_tokens}",
+            f"Response tokens: {self.response_tokens}",
+            f"Model calls: {self.model_calls} ({self.model_seconds:.2f}s)",
+        ]
+        for name, (calls, seconds, returned) in sorted(self.tools.items()):
+            lines.append(f"Tool {name}: {calls} calls, {seconds:.2f}s, {returned} bytes returned")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _chrome_events(events):
+        tracks = {}
+        for event in events:
+            tid = tracks.setdefault(event["track"], len(tracks) + 1)
+            yield {
+                "name": event["name"],
+                "cat": event["cat"],
+                "ph": "X",
+                "ts": round(event["start"] * 1e6),
+                "dur": round(event["duration"] * 1e6),
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": event["args"],
+            }
+        for track, tid in tracks.items():
+            yield {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": str(track)},
+            }
+
+    def write(self, path):
+        """
+        Export the spans to `path`.
+
+        A path ending in .json gets Chrome trace format (load it in
+        chrome://tracing or Perfetto); anything else gets one JSON span per line.
+        """
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event["start"])
+        with open(path, "w", encoding="utf-8") as file:
+            if path.endswith(".json"):
+                json.dump({"traceEvents": list(self._chrome_events(events))}, file)
+            else:
+                for event in events:
+                    file.write(json.dumps(event) + "\n")
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Replay scripted agent sessions against a copy of calculator/ without the API.
+
+Each session in benchmarks/sessions/ is a recording in the format written by
+`main.py --record`; the loop runs its real tools on the replayed calls, so the
+numbers cover our own overhead: dispatch, tool latency and history growth.
+
+Usage:
+    python benchmarks/agent_bench.py [runs] [--parallel] [--stream] [--latency=MS] [--regenerate]
+
+--regenerate rewrites the session fixtures from SCRIPTS below.
+Sessions whose name ends in _manifest replay with the workspace manifest
+(run_session(manifest=True)). Their scripts are the plain ones with the
+exploration turns removed by hand, so their step counts are fixed by the
+fixture and say nothing about what a model given the manifest would do.
+What they do measure is cost: "prompt tokens" estimates what every request
+sent, including the system prompt and manifest, and "vs plain" is the
+change against the session without the manifest.
+--latency makes the replayed model take MS per streamed chunk (and as long
+for a whole response), so "first out ms", the mean time from sending a
+request to the first text or tool call, compares --stream with the default.
+"""
+
+import contextlib
+import glob
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from google.genai import types
+
+from agent.backends import ReplayBackend
+from agent.history import estimate_tokens, CHARS_PER_TOKEN
+from agent.loop import run_session
+from agent.tracing import Tracer
+
+SESSIONS_DIR = os.path.join(os.path.dirname(__file__), "sessions")
+CALCULATOR_DIR = os.path.join(os.path.dirname(__file__), "..", "calculator")
+
+# Each script is a prompt and the model turns to replay: a list of
+# (tool name, args) calls, or a string for the final answer.
+SCRIPTS = {
+    "explore": (
+        "What does the calculator project contain?",
+        [
+            [("get_files_info", {"directory": ".", "recursive": True})],
+            [
+                ("get_file_content", {"file_path": "main.py"}),
+                ("get_file_content", {"file_path": "pkg/calculator.py"}),
+                ("get_file_content", {"file_path": "pkg/render.py"}),
+            ],
+            [("run_python_file", {"file_path": "main.py", "args": ["3 + 5"]})],
+            "It is a command line infix calculator with a box renderer for results.",
+        ],
+    ),
+    "add_operator": (
+        "Add a % (modulo) operator to the calculator.",
+        [
+            [("search_files", {"query": "operator.truediv"})],
+            [("get_file_content", {"file_path": "pkg/calculator.py", "start_line": 70, "end_line": 88})],
+            [
+                (
+                    "edit_file",
+                    {
+                        "file_path": "pkg/calculator.py",
+                        "edits": [
+                            {
+                                "search": '            "/": operator.truediv,\n        }\n        self.precedence = {',
+                                "replace": (
+                                    '            "/": operator.truediv,\n'
+                                    '            "%": operator.mod,\n'
+                                    "        }\n"
+                                    "        self.precedence = {"
+                                ),
+                            },
+                            {
+                                "search": '            "/": 2,\n        }',
+                                "replace": '            "/": 2,\n            "%": 2,\n        }',
+                            },
+                        ],
+                    },
+                )
+            ],
+            [("run_python_file", {"file_path": "tests.py"})],
+            [("run_python_file", {"file_path": "main.py", "args": ["7 % 3 + 1"]})],
+            "The calculator now supports %, with the same precedence as * and /.",
+        ],
+    ),
+    "large_reads": (
+        "Summarize the lorem files.",
+        [
+            [("get_file_content", {"file_path": "lorem.txt"})],
+            [("get_file_content", {"file_path": "pkg/morelorem.txt"})],
+            [("search_files", {"query": "lorem", "case_sensitive": False, "max_results": 50})],
+            [("get_file_content", {"file_path": "lorem.txt", "offset": 0, "length": 4000})],
+            "Both files are placeholder lorem ipsum text.",
+        ],
+    ),
+}
+
+
+# The same tasks replayed with the workspace manifest. The listing and search
+# turns are dropped by hand, assuming the manifest makes them unnecessary;
+# only the prompt tokens this costs are measured, not the steps.
+SCRIPTS["explore_manifest"] = (
+    SCRIPTS["explore"][0],
+    [
+        SCRIPTS["explore"][1][1],
+        SCRIPTS["explore"][1][2],
+        SCRIPTS["explore"][1][3],
+    ],
+)
+SCRIPTS["add_operator_manifest"] = (SCRIPTS["add_operator"][0], SCRIPTS["add_operator"][1][1:])
+
+
+def _response(turn):
+    if isinstance(turn, str):
+        parts = [types.Part(text=turn)]
+    else:
+        parts = [types.Part(function_call=types.FunctionCall(name=name, args=args)) for name, args in turn]
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=parts))]
+    )
+
+
+def regenerate():
+    os.makedirs(SESSIONS_DIR, exist_ok=True)
+    for name, (prompt, turns) in SCRIPTS.items():
+        path = os.path.join(SESSIONS_DIR, f"{name}.jsonl")
+        header = {"prompt": prompt}
+        if name.endswith("_manifest"):
+            header["manifest"] = True
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(json.dumps(header) + "\n")
+            for step, turn in enumerate(turns, start=1):
+                record = {
+                    "step": step,
+                    "request_digest": None,
+                    "response": _response(turn).model_dump(mode="json", exclude_none=True),
+                }
+                file.write(json.dumps(record) + "\n")
+        print(f"Wrote {path}")
+
+
+class _CountingBackend:
+    """Pass calls through, adding up the estimated prompt tokens of every request."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.prompt_tokens = 0
+
+    def _count(self, contents, config):
+        system = getattr(config, "system_instruction", None) or ""
+        self.prompt_tokens += len(system) // CHARS_PER_TOKEN + sum(estimate_tokens(c) for c in contents)
+
+    def generate_content(self, model, contents, config):
+        self._count(contents, config)
+        return self.inner.generate_content(model, contents, config)
+
+    def generate_content_stream(self, model, contents, config):
+        self._count(contents, config)
+        return self.inner.generate_content_stream(model, contents, config)
+
+
+def _load_session(path, latency=0.0):
+    """Return a fixture's header and a ReplayBackend serving its responses."""
+    with open(path, "r", encoding="utf-8") as file:
+        header = json.loads(file.readline())
+    header.setdefault("prompt", "Replay session")
+    return header, ReplayBackend(path, latency=latency)
+
+
+def _history_bytes(messages):
+    return len(json.dumps([m.model_dump(mode="json", exclude_none=True) for m in messages]))
+
+
+def _tool_errors(messages):
+    """Tool calls in the history that failed, as "name: message" strings."""
+    errors = []
+    for message in messages:
+        for part in message.parts or []:
+            response = part.function_response
+            if response is None:
+                continue
+            result = (response.response or {}).get("result")
+            error = (response.response or {}).get("error")
+            if error is None and isinstance(result, str) and result.startswith(("Error", "No matches")):
+                error = result
+            if error is not None:
+                errors.append(f"{response.name}: {error.splitlines()[0]}")
+    return errors
+
+
+def run_once(path, parallel=False, trace_memory=False, stream=False, latency=0.0):
+    """Replay one session in a fresh copy of calculator/ and return its measurements."""
+    header, replay = _load_session(path, latency)
+    backend = _CountingBackend(replay)
+    tracer = Tracer()
+    workspace = tempfile.mkdtemp(prefix="agent-bench-")
+    shutil.copytree(CALCULATOR_DIR, workspace, dirs_exist_ok=True)
+    steps = []
+    history = []
+
+    def on_step(step, messages, model_seconds, tool_seconds):
+        history[:] = messages
+        memory = tracemalloc.get_traced_memory()[0] if trace_memory else None
+        steps.append((step, model_seconds, tool_seconds, _history_bytes(messages), memory))
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_session(
+                backend,
+                header["prompt"],
+                working_directory=workspace,
+                parallel=parallel,
+                on_step=on_step,
+                tracer=tracer,
+                stream=stream,
+                manifest=header.get("manifest", False),
+            )
+    finally:
+        wall = time.perf_counter() - started
+        if trace_memory:
+            tracemalloc.stop()
+        shutil.rmtree(workspace, ignore_errors=True)
+    first_outputs = [event["args"]["first_output"] for event in tracer.events if "first_output" in event["args"]]
+    first_output = statistics.mean(first_outputs) if first_outputs else 0.0
+    errors = _tool_errors(history)
+    if errors:
+        # A fixture that no longer matches calculator/ would time its error paths
+        print(f"warning: {os.path.basename(path)}: {'; '.join(errors)}", file=sys.stderr)
+    return wall, steps, first_output, backend.prompt_tokens
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if "--regenerate" in sys.argv:
+        regenerate()
+        return
+    runs = int(args[0]) if args else 10
+    parallel = "--parallel" in sys.argv
+    stream = "--stream" in sys.argv
+    latency = 0.0
+    for arg in sys.argv[1:]:
+        if arg.startswith("--latency="):
+            latency = float(arg.partition("=")[2]) / 1000
+
+    paths = sorted(glob.glob(os.path.join(SESSIONS_DIR, "*.jsonl")))
+    if not paths:
+        print(f"No sessions in {SESSIONS_DIR}; run with --regenerate")
+        return
+
+    print(
+        f"{'session':<22} {'steps':>5} {'wall ms':>9} {'tool ms':>9} {'model ms':>9} "
+        f"{'overhead ms':>12} {'first out ms':>13} {'prompt tokens':>14} {'vs plain':>16}"
+    )
+    prompt_tokens_by_name = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        walls, tools, models, first_outputs = [], [], [], []
+        for _ in range(runs):
+            wall, steps, first_output, prompt_tokens = run_once(
+                path, parallel=parallel, stream=stream, latency=latency
+            )
+            walls.append(wall)
+            tools.append(sum(s[2] for s in steps))
+            models.append(sum(s[1] for s in steps))
+            first_outputs.append(first_output)
+        wall = statistics.median(walls) * 1000
+        tool = statistics.median(tools) * 1000
+        model = statistics.median(models) * 1000
+        first_output = statistics.median(first_outputs) * 1000
+        prompt_tokens_by_name[name] = prompt_tokens
+        # Sorted paths put each plain session before its _manifest variant
+        plain = prompt_tokens_by_name.get(name.removesuffix("_manifest")) if name.endswith("_manifest") else None
+        change = f"{prompt_tokens - plain:+d} ({(prompt_tokens - plain) / plain:+.1%})" if plain else ""
+        print(
+            f"{name:<22} {len(steps):>5} {wall:>9.1f} {tool:>9.1f} {model:>9.1f} "
+            f"{wall - tool - model:>12.1f} {first_output:>13.1f} {prompt_tokens:>14} {change:>16}"
+        )
+
+    # One traced run per session for per-step growth; tracemalloc would skew the timings above
+    print()
+    print(f"{'session':<22} {'step':>4} {'history KB':>11} {'traced KB':>10}")
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        _, steps, _, _ = run_once(path, parallel=parallel, trace_memory=True, stream=stream, latency=latency)
+        for step, _, _, history_bytes, memory in steps:
+            print(f"{name:<22} {step:>4} {history_bytes / 1024:>11.1f} {memory / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
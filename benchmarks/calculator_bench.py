@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmarks for the calculator package, with a regression check.
+
+Each case is timed with timeit (best of several repeats) and reported as
+operations per second. Results are compared with the baselines in
+calculator_baseline.json and the run fails when any case is slower than its
+baseline by more than the threshold.
+
+A fixed pure-Python calibration loop is timed right before every case and
+the comparison uses the ratio of the two, which absorbs most of the noise
+from CPU frequency changes and shared machines. Baselines are still machine
+specific: save new ones (--save-baseline) where the check runs. Cases in
+UNGATED are reported against their baseline but never fail the run.
+
+Usage:
+    python benchmarks/calculator_bench.py [--save-baseline] [--threshold 0.3] [--only NAME]
+"""
+
+import io
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "calculator"))
+
+from pkg.calculator import Calculator
+from pkg.render import render, render_many
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "calculator_baseline.json")
+DEFAULT_THRESHOLD = 0.3
+REPEATS = 5
+
+# A case that looks like a regression is measured again this many times and
+# its best run kept, so one noisy sample does not fail the check
+RETRIES = 2
+
+# NumPy throughput depends on the build and on memory bandwidth far more than
+# the calibration loop does, so these are reported but do not fail the check
+UNGATED = {"evaluate_batch_rows"}
+
+
+def _expression(terms, operators, rng):
+    words = [str(rng.randint(1, 99))]
+    for _ in range(terms - 1):
+        words += [rng.choice(operators), str(rng.randint(1, 99))]
+    return " ".join(words)
+
+
+def _unique(expression):
+    """Return a function producing variants of expression that no cache has seen."""
+    counter = iter(range(1 << 62))
+    return lambda: f"{next(counter)} + {expression}"
+
+
+def build_cases():
+    """Return {name: (callable, operations per call)}."""
+    rng = random.Random(0)
+    calculator = Calculator()
+    short = "3 + 5 * 2"
+    long = _expression(1000, "+-*/", rng)
+    # Low and high precedence operators alternate, so the operator stack churns
+    precedence = " * ".join(f"{i} + {i + 1} * {i + 2} - {i + 3} / {i + 4}" for i in range(1, 400, 5))
+    long_tokens = long.split()
+    unique_short = _unique(short)
+    unique_long = _unique(long)
+    results = [(f"{i} * {i}", float(i * i)) for i in range(1000)]
+
+    def apply_operators():
+        values = [1.5] * 101
+        operators = ["+", "*"] * 50
+        while operators:
+            calculator._apply_operator(operators, values)
+
+    cases = {
+        "evaluate_short_repeated": (lambda: calculator.evaluate(short), 1),
+        "evaluate_short_unique": (lambda: calculator.evaluate(unique_short()), 1),
+        "evaluate_long_repeated": (lambda: calculator.evaluate(long), 1),
+        "evaluate_long_unique": (lambda: calculator.evaluate(unique_long()), 1),
+        "evaluate_precedence_repeated": (lambda: calculator.evaluate(precedence), 1),
+        "evaluate_infix_long": (lambda: calculator._evaluate_infix(long_tokens), 1),
+        "apply_operator": (apply_operators, 100),
+        "render": (lambda: [render(expression, result) for expression, result in results], len(results)),
+        "render_many": (lambda: render_many(results, io.StringIO()), len(results)),
+    }
+
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    if numpy is not None:
+        columns = {
+            "price": numpy.random.default_rng(0).random(100_000) * 100,
+            "qty": numpy.arange(1, 100_001, dtype=float),
+        }
+        cases["evaluate_batch_rows"] = (
+            lambda: calculator.evaluate_batch("price * qty - price / qty + 1", columns),
+            len(columns["qty"]),
+        )
+    return cases
+
+
+def _calibration():
+    total = 0
+    for i in range(10_000):
+        total += i * i % 7
+    return total
+
+
+def measure(function, operations):
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=REPEATS, number=number))
+    return number * operations / best
+
+
+def _change(measured, expected):
+    """Relative speed change against a baseline, normalized by the calibration loop."""
+    rate, reference = measured
+    return (rate / reference) / (expected["ops_per_second"] / expected["calibration"]) - 1
+
+
+def main():
+    args = sys.argv[1:]
+    save = "--save-baseline" in args
+    threshold = DEFAULT_THRESHOLD
+    only = None
+    for i, arg in enumerate(args):
+        if arg.startswith("--threshold"):
+            threshold = float(arg.partition("=")[2] or args[i + 1])
+        elif arg.startswith("--only"):
+            only = arg.partition("=")[2] or args[i + 1]
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    results = {}
+    failures = []
+    print(f"{'case':<30} {'ops/s':>14} {'baseline':>14} {'change':>8}")
+    for name, (function, operations) in build_cases().items():
+        if only is not None and only not in name:
+            continue
+        expected = baseline.get(name)
+        best = None
+        for _ in range(RETRIES + 1):
+            reference = measure(_calibration, 1)
+            rate = measure(function, operations)
+            if best is None or rate / reference > best[0] / best[1]:
+                best = (rate, reference)
+            if save or not expected or name in UNGATED or _change(best, expected) >= -threshold:
+                break
+        rate, reference = best
+        results[name] = {"ops_per_second": round(rate, 1), "calibration": round(reference, 1)}
+        if expected:
+            change = _change(best, expected)
+            regression = name not in UNGATED and change < -threshold
+            flag = "  REGRESSION" if regression else "  (not gated)" if name in UNGATED else ""
+            print(f"{name:<30} {rate:>14,.0f} {expected['ops_per_second']:>14,.0f} {change:>+7.0%}{flag}")
+            if regression:
+                failures.append(name)
+        else:
+            print(f"{name:<30} {rate:>14,.0f} {'-':>14} {'':>8}")
+
+    if save:
+        baseline.update(results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Saved baselines to {BASELINE_PATH}")
+    elif failures:
+        print(f"{len(failures)} case(s) slower than baseline by more than {threshold:.0%}: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Compare run_python_file with a fresh python3 per run against the warm worker pool.
+
+Usage: python benchmarks/run_python_file_bench.py [runs]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from functions import run_python_file as run_module
+
+CASES = [
+    ("main.py", ["3 + 5"]),
+    ("tests.py", []),
+]
+
+
+def time_runs(runs):
+    timings = {}
+    for file_path, args in CASES:
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            run_module.run_python_file("calculator", file_path, args)
+            samples.append(time.perf_counter() - started)
+        timings[file_path] = samples
+    return timings
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    subprocess_timings = time_runs(runs)
+    if not run_module.enable_worker_pool():
+        print("Warm Python workers are not supported on this platform")
+        return
+    # Warm up the pool once so startup is not counted
+    run_module.run_python_file("calculator", "main.py", ["1 + 1"])
+    pool_timings = time_runs(runs)
+
+    print(f"{'file':<12} {'subprocess ms':>14} {'warm pool ms':>14} {'speedup':>8}")
+    for file_path, _ in CASES:
+        cold = statistics.median(subprocess_timings[file_path]) * 1000
+        warm = statistics.median(pool_timings[file_path]) * 1000
+        print(f"{file_path:<12} {cold:>14.1f} {warm:>14.1f} {cold / warm:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
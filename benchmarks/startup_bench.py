@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Measure CLI startup: how long main.py takes before it can do any work.
+
+Each case runs in a fresh interpreter. "import google.genai" is what every
+invocation used to pay up front, before main.py imported the SDK lazily.
+
+Usage: python benchmarks/startup_bench.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+CASES = [
+    ("python -c pass", ["-c", "pass"]),
+    ("import google.genai", ["-c", "import google.genai"]),
+    ("import main", ["-c", "import main"]),
+    ("main.py (no prompt)", ["main.py"]),
+    (
+        "build tool declarations",
+        ["-c", "from agent.config import generate_content_config; generate_content_config()"],
+    ),
+]
+
+
+def time_case(argv, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *argv], cwd=ROOT, stdout=subprocess.DEVNULL, check=False)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    baseline = time_case(["-c", "pass"], runs)
+    print(f"{'case':<26} {'median ms':>10} {'over python ms':>15}")
+    for name, argv in CASES:
+        elapsed = time_case(argv, runs)
+        print(f"{name:<26} {elapsed * 1000:>10.1f} {(elapsed - baseline) * 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
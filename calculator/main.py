@@ -1,16 +1,121 @@
+import csv
 import sys
 from pkg.calculator import Calculator
-from pkg.render import render
+from pkg.render import format_result, render, render_many
+
+FORMATS = ("table", "box", "plain", "csv")
+
+
+def usage():
+    print("Calculator App")
+    print('Usage: python main.py "<expression>"')
+    print("       python main.py --stdin | --file PATH [--format table|box|plain|csv] [--jobs N] [--chunk-size N]")
+    print('Example: python main.py "3 + 5"')
+
+
+def write_results(results, output_format, out):
+    """Write streamed (expression, result, error) rows; returns the number of failed lines."""
+    errors = 0
+    if output_format == "table":
+        def rows():
+            nonlocal errors
+            for line_number, (expression, result, error) in enumerate(results, start=1):
+                if error is not None:
+                    errors += 1
+                    print(f"Error: line {line_number}: {error}", file=sys.stderr)
+                    result = f"Error: {error}"
+                yield expression, result
+
+        render_many(rows(), out)
+        return errors
+
+    writer = csv.writer(out) if output_format == "csv" else None
+    if writer is not None:
+        writer.writerow(["expression", "result", "error"])
+    for line_number, (expression, result, error) in enumerate(results, start=1):
+        if error is not None:
+            errors += 1
+            print(f"Error: line {line_number}: {error}", file=sys.stderr)
+        if writer is not None:
+            writer.writerow([expression, "" if result is None else format_result(result), error or ""])
+        elif error is not None:
+            out.write(f"Error: {error}\n")
+        elif result is None:
+            # Blank lines stay blank so output lines match input lines
+            out.write("\n")
+        elif output_format == "plain":
+            out.write(format_result(result) + "\n")
+        else:
+            out.write(render(expression, result) + "\n")
+    return errors
+
+
+def bulk(args):
+    from pkg.bulk import evaluate_stream, DEFAULT_CHUNK_SIZE
+
+    path = None
+    output_format = "table"
+    jobs = None
+    chunk_size = DEFAULT_CHUNK_SIZE
+    i = 0
+    while i < len(args):
+        if not args[i].startswith("--"):
+            usage()
+            return 2
+        name, _, value = args[i][2:].partition("=")
+        if not value and name in ("file", "format", "jobs", "chunk-size") and i + 1 < len(args):
+            i += 1
+            value = args[i]
+        i += 1
+        match name:
+            case "stdin":
+                path = "-"
+            case "file":
+                path = value
+            case "format":
+                output_format = value
+            case "jobs" | "chunk-size":
+                try:
+                    number = int(value)
+                except ValueError:
+                    print(f"Error: --{name} needs a whole number, got '{value}'", file=sys.stderr)
+                    return 2
+                if name == "jobs":
+                    jobs = number
+                else:
+                    chunk_size = number
+            case _:
+                print(f"Unknown option: --{name}")
+                return 2
+    if path is None or output_format not in FORMATS:
+        usage()
+        return 2
+
+    try:
+        source = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    except OSError as e:
+        print(f"Error: Cannot read '{path}': {e.strerror}", file=sys.stderr)
+        return 2
+    # Large output buffer: results go out a chunk at a time, not line by line
+    out = open(sys.stdout.fileno(), "w", buffering=1 << 16, encoding="utf-8", newline="", closefd=False)
+    try:
+        errors = write_results(evaluate_stream(source, jobs=jobs, chunk_size=chunk_size), output_format, out)
+    finally:
+        out.flush()
+        if source is not sys.stdin:
+            source.close()
+    return 1 if errors else 0
 
 
 def main():
     calculator = Calculator()
     if len(sys.argv) <= 1:
-        print("Calculator App")
-        print('Usage: python main.py "<expression>"')
-        print('Example: python main.py "3 + 5"')
+        usage()
         return
 
+    if any(arg == "--stdin" or arg.partition("=")[0] == "--file" for arg in sys.argv[1:]):
+        sys.exit(bulk(sys.argv[1:]))
+
     expression = " ".join(sys.argv[1:])
     try:
         result = calculator.evaluate(expression)
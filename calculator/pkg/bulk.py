@@ -0,0 +1,61 @@
+# bulk.py
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from pkg.calculator import Calculator
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# One Calculator per worker process, so its compile cache is reused across chunks
+_calculator = None
+
+
+def evaluate_chunk(expressions):
+    """Evaluate a list of expressions; returns (expression, result, error) per line."""
+    global _calculator
+    if _calculator is None:
+        _calculator = Calculator()
+    results = []
+    for expression in expressions:
+        try:
+            results.append((expression, _calculator.evaluate(expression), None))
+        except Exception as e:
+            results.append((expression, None, str(e)))
+    return results
+
+
+def _chunks(lines, chunk_size):
+    lines = (line.rstrip("\r\n") for line in lines)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_stream(lines, jobs=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Evaluate an iterable of expression lines across a process pool.
+
+    Yields (expression, result, error) in input order. At most two chunks
+    per worker are in flight, so memory stays bounded however long the
+    input is. A failing line yields its error and the stream continues.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    chunks = _chunks(lines, chunk_size)
+    if jobs == 1:
+        for chunk in chunks:
+            yield from evaluate_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(evaluate_chunk, chunk))
+            if len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
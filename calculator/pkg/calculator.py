@@ -1,12 +1,79 @@
 # calculator.py
 
+import operator
+import re
+from collections import OrderedDict
+
+# Compiled expressions kept per Calculator, keyed by source text
+COMPILE_CACHE_SIZE = 1024
+
+
+# Operators that compile to plain Python arithmetic instead of a function call
+_INFIX = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
+
+_NUMBER = r"[+-]?(?:\d[\d_]*(?:\.[\d_]*)?|\.\d[\d_]*)(?:[eE][+-]?\d+)?"
+_NAME = r"[A-Za-z_]\w*"
+
+_PUSH, _OP, _RAISE, _VAR = range(4)
+
+# Placeholder for code that has not been generated yet
+_PENDING = object()
+
+
+def _numpy():
+    import numpy
+
+    return numpy
+
+
+def _divide_arrays(a, b):
+    np = _numpy()
+    if not np.all(b):
+        raise ZeroDivisionError("float division by zero")
+    with np.errstate(all="ignore"):
+        return np.true_divide(a, b)
+
+
+class CompiledExpression:
+    def __init__(self, source, program, names):
+        self.source = source
+        # RPN instructions: (_PUSH, value), (_VAR, name), (_OP, symbol) or (_RAISE, message)
+        self.program = program
+        # Variable names in order of first use; the compiled functions take them positionally
+        self.names = names
+        # Python code for well-formed expressions, None when the program must be interpreted
+        self.function = _PENDING
+        # NumPy version of function, generated on the first evaluate_batch
+        self.array_function = _PENDING
+
+    def bind(self, variables):
+        variables = variables or {}
+        missing = [name for name in self.names if name not in variables]
+        if missing:
+            raise ValueError(f"no value for variable: {missing[0]}")
+        return [variables[name] for name in self.names]
+
+    def evaluate(self, calculator, variables=None):
+        values = [float(value) for value in self.bind(variables)]
+        if self.function is _PENDING:
+            self.function = calculator._codegen(self.program, self.names)
+        if self.function is not None:
+            return self.function(*values)
+        return calculator._run_program(self.program, dict(zip(self.names, values)))
+
+
 class Calculator:
     def __init__(self):
         self.operators = {
-            "+": lambda a, b: a + b,
-            "-": lambda a, b: a - b,
-            "*": lambda a, b: a * b,
-            "/": lambda a, b: a / b,
+            "+": operator.add,
+            "-": operator.sub,
+            "*": operator.mul,
+            "/": operator.truediv,
         }
         self.precedence = {
             "+": 1,
@@ -14,12 +81,261 @@ class Calculator:
             "*": 2,
             "/": 2,
         }
+        self._compiled = OrderedDict()
+        # Expressions evaluated once without compiling; compiled when seen again
+        self._seen = set()
+        self._token_pattern = None
 
-    def evaluate(self, expression):
+    def evaluate(self, expression, variables=None):
         if not expression or expression.isspace():
             return None
-        tokens = expression.strip().split()
-        return self._evaluate_infix(tokens)
+        if variables is None and expression not in self._compiled and expression not in self._seen:
+            # Compiling only pays off for repeated expressions, so the first
+            # time round run the plain evaluator when it understands the input
+            if len(self._seen) >= 4 * COMPILE_CACHE_SIZE:
+                self._seen.clear()
+            self._seen.add(expression)
+            try:
+                return self._evaluate_infix(expression.split())
+            except ValueError as e:
+                # A word it can't read may be "3+5" or a variable; the
+                # tokenizer below handles those
+                if not str(e).startswith("invalid token"):
+                    raise
+        return self.compile(expression).evaluate(self, variables)
+
+    def evaluate_batch(self, expression, columns):
+        # Compile once and run the formula as NumPy array operations over
+        # whole columns. A zero divisor anywhere raises ZeroDivisionError,
+        # like the scalar evaluate does for that row. Without NumPy the
+        # rows are evaluated one by one and a list is returned.
+        try:
+            np = _numpy()
+        except ImportError:
+            return self._evaluate_rows(expression, columns)
+
+        compiled = self.compile(expression)
+        arrays = [np.asarray(column, dtype=np.float64) for column in compiled.bind(columns)]
+        if len({array.shape for array in arrays}) > 1:
+            raise ValueError("columns must have the same shape")
+        if arrays:
+            shape = arrays[0].shape
+        else:
+            shape = np.shape(next(iter(columns.values()))) if columns else ()
+
+        with np.errstate(all="ignore"):
+            if compiled.array_function is _PENDING:
+                compiled.array_function = self._codegen(compiled.program, compiled.names, arrays=True)
+            if compiled.array_function is None:
+                operators = dict(self.operators, **{"/": _divide_arrays})
+                result = self._run_program(compiled.program, dict(zip(compiled.names, arrays)), operators)
+            else:
+                result = compiled.array_function(*arrays)
+
+        result = np.asarray(result, dtype=np.float64)
+        if result.shape != shape:
+            result = np.full(shape, result)
+        return result
+
+    def _evaluate_rows(self, expression, columns):
+        compiled = self.compile(expression)
+        values = compiled.bind(columns)
+        lengths = {len(column) for column in (values or list(columns.values()))}
+        if len(lengths) > 1:
+            raise ValueError("columns must have the same shape")
+        if not lengths:
+            return compiled.evaluate(self)
+        rows = zip(*values) if values else [()] * lengths.pop()
+        return [compiled.evaluate(self, dict(zip(compiled.names, row))) for row in rows]
+
+    def compile(self, expression):
+        compiled = self._compiled.get(expression)
+        if compiled is not None:
+            self._compiled.move_to_end(expression)
+            return compiled
+
+        program = self._to_rpn(self.tokenize(expression))
+        names = list(dict.fromkeys(value for kind, value in program if kind == _VAR))
+        compiled = CompiledExpression(expression, program, names)
+        self._compiled[expression] = compiled
+        if len(self._compiled) > COMPILE_CACHE_SIZE:
+            self._compiled.popitem(last=False)
+        return compiled
+
+    def tokenize(self, expression):
+        # Whitespace-separated words keep their old meaning (any word float()
+        # accepts is a number, e.g. "-3" or "1e3"); only other words are split
+        # further, so "3+5" and "(2-1)*4" need no spaces, and names such as
+        # "price" become variables.
+        tokens = []
+        for word in expression.split():
+            if word in self.operators:
+                tokens.append((_OP, word))
+                continue
+            try:
+                tokens.append((_PUSH, float(word)))
+                continue
+            except ValueError:
+                pass
+            pieces = self._split_word(word)
+            if pieces is None:
+                tokens.append((_RAISE, f"invalid token: {word}"))
+                break
+            tokens.extend(pieces)
+        return tokens
+
+    def _split_word(self, word):
+        if self._token_pattern is None:
+            symbols = sorted(self.operators, key=len, reverse=True)
+            alternatives = [f"(?P<number>{_NUMBER})", f"(?P<name>{_NAME})"]
+            alternatives.append("(?P<op>" + "|".join(map(re.escape, symbols + ["(", ")"])) + ")")
+            self._token_pattern = re.compile("|".join(alternatives))
+
+        pieces = []
+        position = 0
+        while position < len(word):
+            match = self._token_pattern.match(word, position)
+            if match is None:
+                return None
+            text = match.group()
+            # After an operand, a sign is the binary operator, not part of the number
+            if match.lastgroup == "number" and text[0] in "+-" and pieces and (
+                pieces[-1][0] in (_PUSH, _VAR) or pieces[-1][1] == ")"
+            ):
+                pieces.append((_OP, text[0]))
+                position += 1
+                continue
+            if match.lastgroup == "op":
+                pieces.append((_OP, text))
+            else:
+                try:
+                    pieces.append((_PUSH, float(text)))
+                except ValueError:
+                    if match.lastgroup != "name":
+                        return None
+                    pieces.append((_VAR, text))
+            position = match.end()
+        return pieces
+
+    def _to_rpn(self, tokens):
+        # Same shunting-yard as _evaluate_infix, emitting instructions instead
+        # of applying operators, so running the program performs exactly the
+        # same operations in the same order (and fails the same way).
+        program = []
+        operators = []
+        for kind, value in tokens:
+            if kind == _OP and value == "(":
+                operators.append(value)
+            elif kind == _OP and value == ")":
+                while operators and operators[-1] != "(":
+                    program.append((_OP, operators.pop()))
+                if not operators:
+                    program.append((_RAISE, "mismatched parentheses"))
+                    return program
+                operators.pop()
+            elif kind == _OP:
+                while (
+                    operators
+                    and operators[-1] in self.operators
+                    and self.precedence[operators[-1]] >= self.precedence[value]
+                ):
+                    program.append((_OP, operators.pop()))
+                operators.append(value)
+            else:
+                program.append((kind, value))
+                if kind == _RAISE:
+                    return program
+
+        while operators:
+            symbol = operators.pop()
+            if symbol == "(":
+                program.append((_RAISE, "mismatched parentheses"))
+                return program
+            program.append((_OP, symbol))
+        return program
+
+    def _run_program(self, program, variables=None, operators=None):
+        operators = operators or self.operators
+        values = []
+        for kind, value in program:
+            if kind == _PUSH:
+                values.append(value)
+            elif kind == _VAR:
+                values.append(variables[value])
+            elif kind == _OP:
+                if len(values) < 2:
+                    raise ValueError(f"not enough operands for operator {value}")
+                b = values.pop()
+                a = values.pop()
+                values.append(operators[value](a, b))
+            else:
+                raise ValueError(value)
+
+        if len(values) != 1:
+            raise ValueError("invalid expression")
+
+        return values[0]
+
+    def _codegen(self, program, names, arrays=False):
+        # Only programs that cannot fail before their last operator become
+        # Python code; the rest are interpreted so errors surface in order.
+        # One statement per operator keeps very long expressions from hitting
+        # the parser's nesting limits. With arrays=True intermediate results
+        # are updated in place, so a formula over N rows allocates about one
+        # array of N floats instead of one per operator.
+        namespace = {}
+        arguments = {name: f"_v{i}" for i, name in enumerate(names)}
+        lines = [f"def _compiled({', '.join(arguments.values())}):"]
+        stack = []
+        # Temporaries holding arrays this function allocated itself
+        owned = set()
+        for kind, value in program:
+            if kind == _PUSH:
+                if value == value and abs(value) != float("inf"):
+                    stack.append(repr(value))
+                else:
+                    name = f"_k{len(namespace)}"
+                    namespace[name] = value
+                    stack.append(name)
+            elif kind == _VAR:
+                stack.append(arguments[value])
+            elif kind == _OP and len(stack) >= 2:
+                b = stack.pop()
+                a = stack.pop()
+                target = f"_t{len(lines)}"
+                function = self.operators[value]
+                if _INFIX.get(value) is not function:
+                    name = f"_f{len(namespace)}"
+                    namespace[name] = function
+                    lines.append(f"    {target} = {name}({a}, {b})")
+                elif not arrays:
+                    lines.append(f"    {target} = {a} {value} {b}")
+                else:
+                    if value == "/":
+                        namespace["_np"] = _numpy()
+                        lines.append(f"    if not _np.all({b}):")
+                        lines.append('        raise ZeroDivisionError("float division by zero")')
+                    if value in "+*" and b in owned and a not in owned:
+                        a, b = b, a
+                    if a in owned:
+                        # Never the caller's columns, so the array can be reused
+                        lines.append(f"    {a} {value}= {b}")
+                        target = a
+                    else:
+                        lines.append(f"    {target} = {a} {value} {b}")
+                    owned.add(target)
+                stack.append(target)
+            else:
+                return None
+        if len(stack) != 1:
+            return None
+        result = stack[0]
+        if arrays and result in arguments.values():
+            # Never hand back the caller's own column
+            result = f"{result}.copy()"
+        lines.append(f"    return {result}")
+        exec("\n".join(lines), namespace)
+        return namespace["_compiled"]
 
     def _evaluate_infix(self, tokens):
         values = []
@@ -58,4 +374,4 @@ class Calculator:
 
         b = values.pop()
         a = values.pop()
-        values.append(self.operators[operator](a, b))
\ No newline at end of file
+        values.append(self.operators[operator](a, b))
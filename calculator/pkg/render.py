@@ -1,10 +1,16 @@
 # render.py
 
-def render(expression, result):
+import sys
+
+
+def format_result(result):
     if isinstance(result, float) and result.is_integer():
-        result_str = str(int(result))
-    else:
-        result_str = str(result)
+        return str(int(result))
+    return str(result)
+
+
+def render(expression, result):
+    result_str = format_result(result)
 
     box_width = max(len(expression), len(result_str)) + 4
 
@@ -20,4 +26,40 @@ def render(expression, result):
         "│" + " " * 2 + result_str + " " * (box_width - len(result_str) - 2) + "│"
     )
     box.append("└" + "─" * box_width + "┘")
-    return "\n".join(box)
\ No newline at end of file
+    return "\n".join(box)
+
+
+def render_many(pairs, out=None, chunk_size=1000):
+    # Streams (expression, result) pairs into a two-column table. Rows are
+    # formatted chunk_size at a time and each chunk goes out in one write, so
+    # the table is never held in memory. Column widths only grow: a chunk is
+    # aligned to the widest cell seen so far, as there is no second pass.
+    # A result that is an exception is shown as its error message.
+    out = out or sys.stdout
+    widths = [len("expression"), len("result")]
+    rows = [("expression", "result")]
+    count = 0
+    for expression, result in pairs:
+        if isinstance(result, Exception):
+            result_str = f"Error: {result}"
+        else:
+            result_str = "" if result is None else format_result(result)
+        rows.append((expression, result_str))
+        count += 1
+        if len(rows) >= chunk_size:
+            _write_rows(rows, widths, out)
+            rows = []
+    if rows:
+        _write_rows(rows, widths, out)
+    return count
+
+
+def _write_rows(rows, widths, out):
+    widths[0] = max(widths[0], max(len(expression) for expression, _ in rows))
+    widths[1] = max(widths[1], max(len(result_str) for _, result_str in rows))
+    out.write(
+        "".join(
+            f"{expression:<{widths[0]}}  {result_str:>{widths[1]}}\n"
+            for expression, result_str in rows
+        )
+    )
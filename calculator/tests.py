@@ -1,7 +1,18 @@
 # tests.py
 
+import contextlib
+import io
 import unittest
+from unittest import mock
+from pkg.bulk import evaluate_stream
 from pkg.calculator import Calculator
+from pkg.render import render, render_many
+from main import bulk
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class TestCalculator(unittest.TestCase):
@@ -48,6 +59,232 @@ class TestCalculator(unittest.TestCase):
         result = self.calculator.evaluate("3 + 7 * 2")
         self.assertEqual(result, 17)
 
+    def test_no_spaces(self):
+        result = self.calculator.evaluate("3+7*2-1e1/4")
+        self.assertEqual(result, 14.5)
+
+    def test_signed_operands(self):
+        result = self.calculator.evaluate("2*-3 - -4")
+        self.assertEqual(result, -2)
+
+    def test_parentheses(self):
+        result = self.calculator.evaluate("(3 + 7) * 2")
+        self.assertEqual(result, 20)
+
+    def test_mismatched_parentheses(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("(3 + 7 * 2")
+
+    def test_compiled_expression_is_cached(self):
+        compiled = self.calculator.compile("3 * 4 + 5")
+        self.assertIs(self.calculator.compile("3 * 4 + 5"), compiled)
+        self.assertEqual(compiled.evaluate(self.calculator), 17)
+
+    def test_division_by_zero(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.calculator.evaluate("1 / 0")
+
+    def test_matches_infix_evaluation(self):
+        expressions = [
+            "3 + 5",
+            "2 * 3 - 8 / 2 + 5",
+            "-3 * 2",
+            "1e3 / 8 - 0.5",
+            "3 5 +",
+            "1 / 0 +",
+            "+ 3",
+            "3 + 5 6",
+            "$ 3 5",
+            "inf - inf",
+            "10 / 3 * 3",
+            " + ".join(["0.1"] * 500),
+        ]
+        for expression in expressions:
+            try:
+                expected = ("ok", self.calculator._evaluate_infix(expression.split()))
+            except (ValueError, ZeroDivisionError) as e:
+                expected = (type(e), str(e))
+            try:
+                # The compiled program, not evaluate's first-use infix path
+                actual = ("ok", self.calculator.compile(expression).evaluate(self.calculator))
+            except (ValueError, ZeroDivisionError) as e:
+                actual = (type(e), str(e))
+            if expected[0] == "ok" and expected[1] != expected[1]:
+                self.assertNotEqual(actual[1], actual[1], expression)  # both nan
+            else:
+                self.assertEqual(actual, expected, expression)
+
+    def test_variables(self):
+        result = self.calculator.evaluate("price * qty - discount", {"price": 2.5, "qty": 4, "discount": 1})
+        self.assertEqual(result, 9)
+
+    def test_missing_variable(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("price * qty", {"price": 2})
+
+    def test_sign_after_variable_is_an_operator(self):
+        self.assertEqual(self.calculator.evaluate("x+2", {"x": 3}), 5)
+        self.assertEqual(self.calculator.evaluate("x-1", {"x": 3}), 2)
+        self.assertEqual(self.calculator.evaluate("qty-1*x", {"qty": 4, "x": 2}), 2)
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestEvaluateBatch(unittest.TestCase):
+    def setUp(self):
+        self.calculator = Calculator()
+        self.columns = {
+            "price": numpy.array([2.5, 10.0, 0.1, 7.0]),
+            "qty": numpy.array([4.0, 1.0, 3.0, 0.5]),
+            "discount": numpy.array([1.0, 0.0, 0.05, 2.0]),
+        }
+
+    def assertMatchesScalar(self, expression):
+        results = self.calculator.evaluate_batch(expression, self.columns)
+        for row, result in enumerate(results):
+            variables = {name: column[row] for name, column in self.columns.items()}
+            self.assertEqual(result, self.calculator.evaluate(expression, variables), expression)
+
+    def test_matches_scalar_evaluate(self):
+        self.assertMatchesScalar("price * qty - discount")
+        self.assertMatchesScalar("(price + 1) * (qty - discount) / 2")
+        self.assertMatchesScalar("1 + price / qty * 2 - discount / 3")
+        self.assertMatchesScalar("qty 5 +")
+
+    def test_columns_are_not_modified(self):
+        before = {name: column.copy() for name, column in self.columns.items()}
+        self.calculator.evaluate_batch("price * qty - discount", self.columns)
+        result = self.calculator.evaluate_batch("price", self.columns)
+        result[0] = -1
+        for name, column in self.columns.items():
+            self.assertTrue((column == before[name]).all())
+
+    def test_constant_expression_fills_rows(self):
+        result = self.calculator.evaluate_batch("3 + 5", self.columns)
+        self.assertEqual(result.tolist(), [8.0] * 4)
+
+    def test_division_by_zero(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.calculator.evaluate_batch("price / discount", self.columns)
+
+    def test_invalid_expression(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate_batch("price qty", self.columns)
+
+    def test_sign_after_variable_is_an_operator(self):
+        self.assertEqual(self.calculator.evaluate_batch("qty-1", self.columns).tolist(), [3.0, 0.0, 2.0, -0.5])
+        self.assertEqual(self.calculator.evaluate_batch("qty+price", self.columns).tolist(), [6.5, 11.0, 3.1, 7.5])
+
+
+class TestEvaluateBatchWithoutNumpy(unittest.TestCase):
+    def setUp(self):
+        self.calculator = Calculator()
+        patcher = mock.patch("pkg.calculator._numpy", side_effect=ImportError)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rows_are_evaluated_one_by_one(self):
+        result = self.calculator.evaluate_batch("price * qty - 1", {"price": [2.5, 10], "qty": [4, 1]})
+        self.assertEqual(result, [9.0, 9.0])
+
+    def test_constant_expression_fills_rows(self):
+        self.assertEqual(self.calculator.evaluate_batch("3 + 5", {"qty": [1, 2, 3]}), [8.0] * 3)
+
+    def test_division_by_zero(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.calculator.evaluate_batch("price / qty", {"price": [1, 2], "qty": [1, 0]})
+
+
+class TestEvaluateStream(unittest.TestCase):
+    def test_results_keep_input_order(self):
+        lines = [f"{i} * 2 + 1\n" for i in range(50)]
+        results = list(evaluate_stream(lines, jobs=2, chunk_size=3))
+        self.assertEqual([result for _, result, _ in results], [i * 2 + 1 for i in range(50)])
+
+    def test_errors_do_not_stop_the_stream(self):
+        results = list(evaluate_stream(["3 + 5", "1 / 0", "$ 3", "", "2*4"], jobs=1))
+        self.assertEqual(results[0], ("3 + 5", 8, None))
+        self.assertEqual(results[1][2], "float division by zero")
+        self.assertEqual(results[2][2], "invalid token: $")
+        self.assertEqual(results[3], ("", None, None))
+        self.assertEqual(results[4], ("2*4", 8, None))
+
+
+class TestBulkArguments(unittest.TestCase):
+    def run_bulk(self, *args):
+        with contextlib.redirect_stdout(io.StringIO()) as out, contextlib.redirect_stderr(io.StringIO()) as err:
+            code = bulk(list(args))
+        return code, out.getvalue(), err.getvalue()
+
+    def test_stray_word_shows_usage(self):
+        code, out, _ = self.run_bulk("--stdin", "stray")
+        self.assertEqual(code, 2)
+        self.assertIn("Usage:", out)
+        self.assertNotIn("Unknown option", out)
+
+    def test_unknown_option(self):
+        code, out, _ = self.run_bulk("--stdin", "--colour")
+        self.assertEqual(code, 2)
+        self.assertIn("Unknown option: --colour", out)
+
+    def test_numbers_are_checked(self):
+        for option in ("--jobs=x", "--chunk-size=x"):
+            code, _, err = self.run_bulk("--stdin", option)
+            self.assertEqual(code, 2)
+            self.assertIn(f"{option.partition('=')[0]} needs a whole number, got 'x'", err)
+        code, _, err = self.run_bulk("--stdin", "--jobs", "two")
+        self.assertEqual(code, 2)
+        self.assertIn("got 'two'", err)
+
+    def test_missing_file(self):
+        code, _, err = self.run_bulk("--file", "/nonexistent/expressions.txt")
+        self.assertEqual(code, 2)
+        self.assertIn("Error: Cannot read '/nonexistent/expressions.txt'", err)
+
+
+class CountingWriter(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+class TestRenderMany(unittest.TestCase):
+    def test_columns_are_aligned(self):
+        out = io.StringIO()
+        count = render_many([("3 + 5", 8.0), ("10 / 4", 2.5), ("1 / 0", ZeroDivisionError("float division by zero"))], out)
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [
+                "expression                         result",
+                "3 + 5                                   8",
+                "10 / 4                                2.5",
+                "1 / 0       Error: float division by zero",
+            ],
+        )
+
+    def test_one_write_per_chunk(self):
+        out = CountingWriter()
+        pairs = ((f"{i} + 1", float(i + 1)) for i in range(25))
+        self.assertEqual(render_many(pairs, out, chunk_size=10), 25)
+        # The header counts towards the first chunk
+        self.assertEqual(out.writes, 3)
+        self.assertEqual(len(out.getvalue().splitlines()), 26)
+
+    def test_empty_input_writes_header(self):
+        out = io.StringIO()
+        self.assertEqual(render_many([], out), 0)
+        self.assertEqual(out.getvalue(), "expression  result\n")
+
+    def test_render_unchanged(self):
+        self.assertEqual(
+            render("3 + 5", 8.0),
+            "┌─────────┐\n│  3 + 5  │\n│         │\n│  =      │\n│         │\n│  8      │\n└─────────┘",
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -5,15 +5,71 @@ from .get_files_info import get_files_info
 from .get_file_content import get_file_content
 from .run_python_file import run_python_file
 from .write_file import write_file
-
-
-def call_function(function_call_part, verbose=False):
+from .edit_file import edit_file
+from .search_files import search_files
+from .read_files import read_files
+from .run_tests import run_tests
+from .result_cache import ResultCache
+from . import import_graph, search_index
+
+# Default working directory injected into every tool call
+WORKING_DIRECTORY = "./calculator"
+
+# Shared across calls (and threads) for the lifetime of the process
+result_cache = ResultCache()
+
+
+def _invalidate_cache(function_name, kwargs):
+	"""Drop cached results and re-index files that a workspace-modifying tool may have changed."""
+	if function_name in ("write_file", "edit_file"):
+		result_cache.invalidate(kwargs["working_directory"], kwargs.get("file_path"))
+		if kwargs.get("file_path"):
+			search_index.notify_changed(kwargs["working_directory"], kwargs["file_path"])
+			# Remembered so the next run_tests call selects the tests these edits can affect
+			import_graph.notify_changed(kwargs["working_directory"], kwargs["file_path"])
+	elif function_name in ("run_python_file", "run_tests"):
+		# A script or test can touch any file, so forget the whole working directory
+		result_cache.invalidate(kwargs["working_directory"])
+		search_index.notify_changed(kwargs["working_directory"])
+
+
+def _execute(function_name, func, kwargs, verbose):
+	"""Run a tool (or serve it from the cache). Returns (result, error_response, cached)."""
+	# Serve read-only results from the cache while their target is unchanged
+	cache_key = result_cache.key(function_name, kwargs)
+	hit = False
+	if cache_key is not None:
+		hit, function_result = result_cache.get(cache_key)
+		if hit and verbose:
+			print(f"   (cached result for {function_name})")
+
+	if not hit:
+		# Read before running, so a write that lands during the call keeps its result out of the cache
+		seen = result_cache.validator(cache_key) if cache_key is not None else None
+		try:
+			function_result = func(**kwargs)
+		except TypeError as e:
+			return None, {"error": f"Argument error: {str(e)}"}, False
+		except Exception as e:
+			return None, {"error": f"Execution error: {str(e)}"}, False
+		finally:
+			_invalidate_cache(function_name, kwargs)
+
+		if cache_key is not None:
+			result_cache.put(cache_key, function_result, seen)
+
+	return function_result, None, hit
+
+
+def call_function(function_call_part, verbose=False, working_directory=WORKING_DIRECTORY, tracer=None):
 	"""
 	Dispatch and execute a tool function based on a FunctionCall part.
 
 	Args:
 		function_call_part: types.FunctionCall with .name and .args
 		verbose (bool): whether to print detailed call information
+		working_directory (str): directory the tool is confined to
+		tracer (Tracer | None): records a span with the tool's duration and bytes returned
 
 	Returns:
 		types.Content: A tool response content with a function_response part.
@@ -36,10 +92,10 @@ def call_function(function_call_part, verbose=False):
 		kwargs = raw_args
 
 	# Security-controlled working directory (LLM cannot override)
-	kwargs["working_directory"] = "./calculator"
+	kwargs["working_directory"] = working_directory
 
 	# Optional arg compatibility shims
-	if function_name in ("run_python_file", "get_file_content"):
+	if function_name in ("run_python_file", "get_file_content", "edit_file"):
 		if "file_path" not in kwargs and "file" in kwargs:
 			kwargs["file_path"] = kwargs.pop("file")
 
@@ -49,6 +105,10 @@ def call_function(function_call_part, verbose=False):
 		"get_file_content": get_file_content,
 		"run_python_file": run_python_file,
 		"write_file": write_file,
+		"edit_file": edit_file,
+		"search_files": search_files,
+		"read_files": read_files,
+		"run_tests": run_tests,
 	}
 
 	func = registry.get(function_name)
@@ -63,25 +123,20 @@ def call_function(function_call_part, verbose=False):
 			],
 		)
 
-	try:
-		function_result = func(**kwargs)
-	except TypeError as e:
-		return types.Content(
-			role="tool",
-			parts=[
-				types.Part.from_function_response(
-					name=function_name,
-					response={"error": f"Argument error: {str(e)}"},
-				)
-			],
-		)
-	except Exception as e:
+	if tracer is None:
+		function_result, error, _ = _execute(function_name, func, kwargs, verbose)
+	else:
+		with tracer.span(function_name, "tool") as span:
+			function_result, error, span["cached"] = _execute(function_name, func, kwargs, verbose)
+			span["bytes"] = len(str(function_result if error is None else error).encode("utf-8"))
+
+	if error is not None:
 		return types.Content(
 			role="tool",
 			parts=[
 				types.Part.from_function_response(
 					name=function_name,
-					response={"error": f"Execution error: {str(e)}"},
+					response=error,
 				)
 			],
 		)
@@ -0,0 +1,112 @@
+import inspect
+import re
+from typing import is_typeddict
+
+# Injected by call_function, never chosen by the model
+INJECTED_ARGS = ("working_directory",)
+
+_ARG_LINE = re.compile(r"^(\w+) \(([^)]+)\):\s*(.*)$")
+_SECTIONS = ("Args:", "Returns:", "Raises:")
+
+_SCALAR_TYPES = {
+    "str": "STRING",
+    "int": "INTEGER",
+    "float": "NUMBER",
+    "bool": "BOOLEAN",
+}
+
+
+def parse_docstring(func):
+    """
+    Split a Google-style docstring into its summary and documented arguments.
+
+    Returns:
+        tuple: (summary, {name: (type string, description)})
+    """
+    doc = inspect.getdoc(func) or ""
+    summary = []
+    args = {}
+    section = None
+    current = None
+    for line in doc.splitlines():
+        stripped = line.strip()
+        if stripped in _SECTIONS:
+            section = stripped
+            continue
+        if section is None:
+            if stripped or summary:
+                summary.append(stripped)
+        elif section == "Args:" and stripped:
+            match = _ARG_LINE.match(stripped)
+            if match:
+                current = match.group(1)
+                args[current] = [match.group(2), match.group(3)]
+            elif current is not None:
+                # Continuation of the previous argument's description
+                args[current][1] += " " + stripped
+    # The first paragraph is the description; later ones are for readers of the code
+    first_paragraph = "\n".join(summary).strip().split("\n\n")[0]
+    description = " ".join(first_paragraph.split())
+    return description, {name: tuple(value) for name, value in args.items()}
+
+
+def _schema(types, annotation, namespace, description=None):
+    """Build a Schema from a docstring type ("list[str]", "int", a TypedDict name) or a Python type."""
+    if not isinstance(annotation, str):
+        annotation = annotation.__name__
+    annotation = annotation.replace(" ", "").removesuffix("|None")
+
+    if annotation in _SCALAR_TYPES:
+        return types.Schema(
+            type=getattr(types.Type, _SCALAR_TYPES[annotation]), description=description
+        )
+    if annotation.startswith("list[") and annotation.endswith("]"):
+        return types.Schema(
+            type=types.Type.ARRAY,
+            items=_schema(types, annotation[5:-1], namespace),
+            description=description,
+        )
+    record = namespace.get(annotation)
+    if record is not None and is_typeddict(record):
+        return types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                name: _schema(types, field_type, namespace)
+                for name, field_type in record.__annotations__.items()
+            },
+            description=description,
+        )
+    raise TypeError(f"Unsupported tool argument type: {annotation}")
+
+
+def declaration(func):
+    """
+    Generate the FunctionDeclaration for a tool from its signature and docstring.
+
+    The docstring summary becomes the tool description and each documented
+    argument becomes a parameter; arguments without a default are required.
+    """
+    from google.genai import types
+
+    description, documented = parse_docstring(func)
+    properties = {}
+    required = []
+    for name, parameter in inspect.signature(func).parameters.items():
+        if name in INJECTED_ARGS:
+            continue
+        if name not in documented:
+            raise TypeError(f"{func.__name__}: argument {name!r} is not documented")
+        annotation, arg_description = documented[name]
+        properties[name] = _schema(types, annotation, func.__globals__, arg_description)
+        if parameter.default is inspect.Parameter.empty:
+            required.append(name)
+
+    return types.FunctionDeclaration(
+        name=func.__name__,
+        description=description,
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties=properties,
+            required=required or None,
+        ),
+    )
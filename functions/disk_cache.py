@@ -0,0 +1,46 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+# Persistent caches live outside the working directory so tools never list them
+CACHE_DIR = os.environ.get(
+    "AI_AGENT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "ai-agent")
+)
+
+
+def cache_file(kind, root):
+    """Path of the on-disk cache of type `kind` for the directory `root`."""
+    root_abs = os.path.normpath(os.path.abspath(root))
+    digest = hashlib.sha1(root_abs.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, kind, f"{digest}.pickle")
+
+
+def load(path, version):
+    """Return the cached object, or None if it is missing, unreadable or from another version."""
+    try:
+        with open(path, "rb") as file:
+            data = pickle.load(file)
+    except (OSError, pickle.PickleError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != version:
+        return None
+    return data.get("payload")
+
+
+def save(path, version, payload):
+    """Atomically replace the cache file; failures are ignored since caches are optional."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as file:
+            pickle.dump({"version": version, "payload": payload}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except (OSError, pickle.PickleError):
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
@@ -0,0 +1,159 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .call_function import call_function, WORKING_DIRECTORY
+
+# Tools that never modify the working directory and may run side by side
+READ_ONLY_TOOLS = {"get_files_info", "get_file_content", "search_files", "read_files"}
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def _call_access(function_call_part, working_directory):
+    """
+    Describe what a call touches so conflicting calls can be ordered.
+
+    Returns:
+        tuple: (read_only, path) where path is the absolute, normalized path
+        the call targets, or None if the call may touch anything.
+    """
+    function_name = getattr(function_call_part, "name", None)
+    raw_args = getattr(function_call_part, "args", {}) or {}
+    try:
+        args = dict(raw_args)
+    except Exception:
+        args = {}
+
+    if function_name == "get_files_info":
+        path = args.get("directory") or "."
+    elif function_name in ("search_files", "read_files"):
+        path = "."
+    elif function_name in ("run_python_file", "run_tests"):
+        # A script or test can write anywhere, so treat it as a barrier
+        path = None
+    else:
+        path = args.get("file_path", args.get("file"))
+
+    if path is not None:
+        # Resolved the way call_function resolves it, so a relative and an
+        # absolute spelling of one file are seen as the same file
+        path = os.path.normpath(os.path.join(os.path.abspath(working_directory), str(path)))
+    return function_name in READ_ONLY_TOOLS, path
+
+
+def _paths_overlap(a, b):
+    if a is None or b is None:
+        return True
+    return a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+
+def _run_after(dependencies, function_call_part, verbose, working_directory, tracer):
+    if dependencies:
+        wait(dependencies)
+    return call_function(
+        function_call_part,
+        verbose=verbose,
+        working_directory=working_directory,
+        tracer=tracer,
+    )
+
+
+class Dispatcher:
+    """
+    Start function calls as they arrive and collect their results in order.
+
+    Calls follow the same rules as call_functions: read-only calls run side
+    by side, and a call that writes waits for every earlier call touching an
+    overlapping path. Tasks are queued in call order and the pool is FIFO,
+    so every dependency is already running or finished by the time a waiting
+    task occupies a worker. With max_workers=1 calls run one after another.
+
+    Use as a context manager; leaving it waits for every submitted call.
+    """
+
+    def __init__(
+        self,
+        verbose=False,
+        max_workers=DEFAULT_MAX_WORKERS,
+        working_directory=WORKING_DIRECTORY,
+        tracer=None,
+    ):
+        self.verbose = verbose
+        self.working_directory = working_directory
+        self.tracer = tracer
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.scheduled = []
+
+    def submit(self, function_call_part):
+        read_only, path = _call_access(function_call_part, self.working_directory)
+        dependencies = [
+            future
+            for other_read_only, other_path, future in self.scheduled
+            if not (read_only and other_read_only) and _paths_overlap(path, other_path)
+        ]
+        # Run in a copy of the caller's context, so context variables (such as
+        # where a daemon session's output goes) follow the call into the pool
+        future = self.executor.submit(
+            contextvars.copy_context().run,
+            _run_after,
+            dependencies,
+            function_call_part,
+            self.verbose,
+            self.working_directory,
+            self.tracer,
+        )
+        self.scheduled.append((read_only, path, future))
+        return future
+
+    def results(self):
+        """Tool responses of every submitted call, in submission order."""
+        return [future.result() for _, _, future in self.scheduled]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def call_functions(
+    function_call_parts,
+    verbose=False,
+    max_workers=DEFAULT_MAX_WORKERS,
+    working_directory=WORKING_DIRECTORY,
+    tracer=None,
+):
+    """
+    Execute the function calls of one model turn concurrently.
+
+    Read-only calls run in parallel. A call that writes (or may write) waits for
+    every earlier call touching an overlapping path, and later calls on that
+    path wait for it, so writes to the same path keep their original order.
+
+    Args:
+        function_call_parts: iterable of types.FunctionCall
+        verbose (bool): whether to print detailed call information
+        max_workers (int): size of the bounded thread pool
+        working_directory (str): directory the tools are confined to
+        tracer (Tracer | None): records a span per tool call
+
+    Returns:
+        list[types.Content]: tool responses in the original call order.
+    """
+    function_call_parts = list(function_call_parts)
+    if len(function_call_parts) <= 1 or max_workers <= 1:
+        return [
+            call_function(
+                part, verbose=verbose, working_directory=working_directory, tracer=tracer
+            )
+            for part in function_call_parts
+        ]
+
+    with Dispatcher(verbose, max_workers, working_directory, tracer) as dispatcher:
+        for part in function_call_parts:
+            dispatcher.submit(part)
+        return dispatcher.results()
@@ -0,0 +1,168 @@
+import os
+import re
+import tempfile
+from typing import TypedDict
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(Exception):
+    pass
+
+
+class Edit(TypedDict):
+    """One search/replace block: `search` must appear exactly once and is replaced by `replace`."""
+
+    search: str
+    replace: str
+
+
+def _apply_search_replace(content, edits):
+    for number, edit in enumerate(edits, start=1):
+        search = edit.get("search")
+        replace = edit.get("replace", "")
+        if not search:
+            raise PatchError(f"edit {number} has an empty search block")
+        count = content.count(search)
+        if count == 0:
+            raise PatchError(f"search block of edit {number} not found")
+        if count > 1:
+            raise PatchError(
+                f"search block of edit {number} matches {count} times; include more context"
+            )
+        content = content.replace(search, replace, 1)
+    return content
+
+
+def _parse_hunks(patch):
+    """Parse a unified diff into hunks of (expected start index, [(tag, text, newline)])."""
+    hunks = []
+    current = None
+    old_left = new_left = 0
+    for line in patch.splitlines():
+        if line.startswith("\\"):
+            # "\ No newline at end of file" applies to the previous line
+            if current:
+                tag, text, _ = current[-1]
+                current[-1] = (tag, text, False)
+            continue
+
+        if current is not None and (old_left > 0 or new_left > 0):
+            tag = line[:1] if line else " "  # Some tools drop the space of empty context lines
+            if tag not in (" ", "-", "+"):
+                raise PatchError(f"unexpected line in patch: {line!r}")
+            current.append((tag, line[1:], True))
+            old_left -= tag in (" ", "-")
+            new_left -= tag in (" ", "+")
+            continue
+
+        match = _HUNK_HEADER.match(line)
+        if match:
+            current = []
+            old_left = int(match.group(2)) if match.group(2) is not None else 1
+            new_left = int(match.group(4)) if match.group(4) is not None else 1
+            hunks.append((max(int(match.group(1)) - 1, 0), current))
+        # Anything else is a file header (diff --git, ---, +++, index ...)
+    if not hunks:
+        raise PatchError("patch contains no hunks")
+    return hunks
+
+
+def _find_block(lines, block, expected, start):
+    """Index where `block` matches `lines`, preferring the one closest to `expected`."""
+    last = len(lines) - len(block)
+    if last < start:
+        return None
+    candidates = sorted(range(start, last + 1), key=lambda i: abs(i - expected))
+    for i in candidates:
+        if all(lines[i + j].rstrip("\r\n") == text for j, text in enumerate(block)):
+            return i
+    return None
+
+
+def _apply_unified_diff(content, patch):
+    lines = content.splitlines(keepends=True)
+    newline = "\r\n" if "\r\n" in content else "\n"
+    result = []
+    pos = 0
+    for number, (expected, hunk) in enumerate(_parse_hunks(patch), start=1):
+        old_block = [text for tag, text, _ in hunk if tag in (" ", "-")]
+        index = _find_block(lines, old_block, expected, pos)
+        if index is None:
+            raise PatchError(f"hunk {number} does not match the file")
+        result.extend(lines[pos:index])
+        for tag, text, has_newline in hunk:
+            if tag in (" ", "+"):
+                result.append(text + (newline if has_newline else ""))
+        pos = index + len(old_block)
+    result.extend(lines[pos:])
+    return "".join(result)
+
+
+def _write_atomic(target_file_abs, content):
+    """Write through a temp file in the same directory and rename it over the target."""
+    directory = os.path.dirname(target_file_abs)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".edit-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as file:
+            file.write(content)
+        os.chmod(temp_path, os.stat(target_file_abs).st_mode & 0o7777)
+        os.replace(temp_path, target_file_abs)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def edit_file(working_directory, file_path, edits=None, patch=None):
+    """
+    Edit part of an existing file with exact search/replace blocks or a unified diff, without resending the whole file.
+
+    Args:
+        working_directory (str): The base directory to work within
+        file_path (str): Path to the file (relative to working_directory or absolute)
+        edits (list[Edit]): Search/replace blocks applied in order; each search text must appear exactly once in the file
+        patch (str): A unified diff for this file, used instead of edits
+
+    Returns:
+        str: A short confirmation or an error message
+    """
+    working_dir_abs = os.path.normpath(os.path.abspath(working_directory))
+    if not os.path.isabs(file_path):
+        target_file_abs = os.path.normpath(os.path.abspath(os.path.join(working_directory, file_path)))
+    else:
+        target_file_abs = os.path.normpath(os.path.abspath(file_path))
+
+    if not target_file_abs.startswith(working_dir_abs + os.sep):
+        return f'Error: Cannot edit "{file_path}" as it is outside the permitted working directory'
+    if not os.path.isfile(target_file_abs):
+        return f'Error: File not found or is not a regular file: "{file_path}" (use write_file to create files)'
+    if bool(edits) == bool(patch):
+        return "Error: Provide either edits or patch"
+
+    try:
+        with open(target_file_abs, "r", encoding="utf-8", newline="") as file:
+            original = file.read()
+
+        if edits:
+            updated = _apply_search_replace(original, list(edits))
+            applied = f"{len(edits)} edit{'s' if len(edits) != 1 else ''}"
+        else:
+            updated = _apply_unified_diff(original, patch)
+            applied = "patch"
+
+        if updated == original:
+            return f'No changes made to "{file_path}"'
+        _write_atomic(target_file_abs, updated)
+
+        delta = len(updated.splitlines()) - len(original.splitlines())
+        return f'Successfully edited "{file_path}" ({applied} applied, {delta:+d} lines)'
+
+    except PatchError as e:
+        return f"Error: Could not apply {'edits' if edits else 'patch'} to '{file_path}': {str(e)}"
+    except PermissionError:
+        return f"Error: Permission denied editing file '{file_path}'"
+    except UnicodeDecodeError:
+        return f"Error: Cannot decode file '{file_path}' as UTF-8 text"
+    except Exception as e:
+        return f"Error: Could not edit file '{file_path}': {str(e)}"
@@ -1,16 +1,76 @@
+import mmap
 import os
-from google import genai
 
-def get_file_content(working_directory, file_path):
+from .line_index import get_line_index
+
+MAX_CHARS = 10000
+
+
+def _as_int(value, name):
+    if value is None:
+        return None
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{name} must be an integer")
+    number = int(value)
+    if number < 0:
+        raise ValueError(f"{name} must be a non-negative integer")
+    return number
+
+
+def _read_range(target_file_abs, file_path, offset, length, start_line, end_line, max_chars):
+    """Read a byte or line range through mmap, touching only the requested pages."""
+    stat = os.stat(target_file_abs)
+    size = stat.st_size
+    if size == 0:
+        return f'[Empty file "{file_path}"]'
+
+    with open(target_file_abs, 'rb') as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        if offset is not None or length is not None:
+            start = min(offset or 0, size)
+            end = min(start + (length if length is not None else max_chars), size)
+            header = f'[Bytes {start}-{end} of {size} in "{file_path}"]'
+        else:
+            start_line = start_line or 1
+            if start_line < 1:
+                raise ValueError("start_line must be 1 or greater")
+            if end_line is not None and end_line < start_line:
+                raise ValueError("end_line must not be before start_line")
+            index = get_line_index(target_file_abs, stat)
+            start = index.line_start(mm, start_line)
+            if start is None:
+                return f'[File "{file_path}" has fewer than {start_line} lines]'
+            end = index.line_start(mm, end_line + 1) if end_line is not None else None
+            if end is None:
+                end = size
+                header = f'[Lines {start_line}-end of "{file_path}"]'
+            else:
+                header = f'[Lines {start_line}-{end_line} of "{file_path}"]'
+
+        # UTF-8 is at most 4 bytes per char
+        max_bytes = max_chars * 4
+        truncated = end - start > max_bytes
+        data = mm[start:min(end, start + max_bytes)]
+
+    content = data.decode('utf-8', errors='replace')
+    if truncated or len(content) > max_chars:
+        content = content[:max_chars] + f'\n\n[...Range truncated at {max_chars} characters]'
+    return f"{header}\n{content}"
+
+
+def read_file_content(working_directory, file_path, offset=None, length=None, start_line=None, end_line=None, max_chars=MAX_CHARS):
     """
-    Read and return the content of a file within the working directory.
-    
+    Read a file or a range of it the way get_file_content does, with an explicit error.
+
     Args:
         working_directory (str): The base directory to work within
         file_path (str): Path to the file (relative to working_directory or absolute)
-    
+        offset, length, start_line, end_line: Optional range, as for get_file_content
+        max_chars (int): Characters returned before the content is truncated
+
     Returns:
-        str: The file content or an error message
+        tuple: (content, None) on success or (None, error message) on failure
     """
     working_dir_abs = os.path.abspath(working_directory)
     
@@ -26,47 +86,68 @@ def get_file_content(working_directory, file_path):
     
     # Check if target file is within the working directory
     if not (target_file_abs == working_dir_abs or target_file_abs.startswith(working_dir_abs + os.sep)):
-        return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory'
+        return None, f'Cannot read "{file_path}" as it is outside the permitted working directory'
     
     # Check if the path exists and is a regular file
     if not os.path.exists(target_file_abs) or not os.path.isfile(target_file_abs):
-        return f'Error: File not found or is not a regular file: "{file_path}"'
+        return None, f'File not found or is not a regular file: "{file_path}"'
     
     try:
+        offset = _as_int(offset, "offset")
+        length = _as_int(length, "length")
+        start_line = _as_int(start_line, "start_line")
+        end_line = _as_int(end_line, "end_line")
+    except (TypeError, ValueError) as e:
+        return None, f"Invalid range for '{file_path}': {str(e)}"
+    if (offset is not None or length is not None) and (start_line is not None or end_line is not None):
+        return None, "Use either offset/length or start_line/end_line, not both"
+    
+    try:
+        if any(value is not None for value in (offset, length, start_line, end_line)):
+            return _read_range(target_file_abs, file_path, offset, length, start_line, end_line, max_chars), None
+
+        # Only decode as much as can be returned, instead of the whole file
         with open(target_file_abs, 'r', encoding='utf-8') as file:
-            content = file.read()
+            content = file.read(max_chars + 1)
         
-        # Truncate if content is longer than 10000 characters
-        if len(content) > 10000:
-            content = content[:10000] + f'\n\n[...File "{file_path}" truncated at 10000 characters]'
+        # Truncate if content is longer than max_chars
+        if len(content) > max_chars:
+            content = content[:max_chars] + f'\n\n[...File "{file_path}" truncated at {max_chars} characters]'
         
-        return content
+        return content, None
         
     except PermissionError:
-        return f"Error: Permission denied reading file '{file_path}'"
+        return None, f"Permission denied reading file '{file_path}'"
     except UnicodeDecodeError:
-        return f"Error: Cannot decode file '{file_path}' as UTF-8 text"
+        return None, f"Cannot decode file '{file_path}' as UTF-8 text"
     except FileNotFoundError:
-        return f"Error: File '{file_path}' not found"
+        return None, f"File '{file_path}' not found"
     except IsADirectoryError:
-        return f"Error: '{file_path}' is a directory, not a file"
+        return None, f"'{file_path}' is a directory, not a file"
     except OSError as e:
-        return f"Error: OS error reading file '{file_path}': {str(e)}"
-    except IOError as e:
-        return f"Error: I/O error reading file '{file_path}': {str(e)}"
+        return None, f"OS error reading file '{file_path}': {str(e)}"
+    except ValueError as e:
+        return None, f"Invalid range for '{file_path}': {str(e)}"
     except Exception as e:
-        return f"Error: Could not read file '{file_path}': {str(e)}"
-
-schema_get_file_content = genai.types.FunctionDeclaration(
-    name="get_file_content",
-    description="Reads specified files content.",
-    parameters=genai.types.Schema(
-        type=genai.types.Type.OBJECT,
-        properties={
-            "file": genai.types.Schema(
-                type=genai.types.Type.STRING,
-                description="Name of the file.",
-            ),
-        },
-    ),
-)
\ No newline at end of file
+        return None, f"Could not read file '{file_path}': {str(e)}"
+
+
+def get_file_content(working_directory, file_path, offset=None, length=None, start_line=None, end_line=None):
+    """
+    Read the content of a file within the working directory. Large files can be paged by byte range or line range.
+    
+    Args:
+        working_directory (str): The base directory to work within
+        file_path (str): Path to the file (relative to working_directory or absolute)
+        offset (int): Optional byte offset to start reading at
+        length (int): Optional number of bytes to read from offset
+        start_line (int): Optional first line to read (1-based)
+        end_line (int): Optional last line to read (inclusive)
+    
+    Returns:
+        str: The file content or an error message
+    """
+    content, error = read_file_content(working_directory, file_path, offset, length, start_line, end_line)
+    if error is not None:
+        return f"Error: {error}"
+    return content
@@ -1,7 +1,119 @@
 import os
-from google import genai
+from fnmatch import fnmatch
 
-def get_files_info(working_directory, directory=None):
+# Skipped by recursive listings unless a pattern in `include` names them
+DEFAULT_IGNORES = (".git", "__pycache__", ".venv", "venv", ".mypy_cache", ".pytest_cache", "node_modules")
+
+# Entries returned per page by recursive listings
+DEFAULT_LIMIT = 1000
+
+
+def _patterns(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [pattern.strip() for pattern in value if pattern and pattern.strip()]
+
+
+def _matches(rel_path, name, patterns):
+    return any(fnmatch(rel_path, pattern) or fnmatch(name, pattern) for pattern in patterns)
+
+
+def _walk(root, max_depth, include, exclude):
+    """
+    Yield (relative path, DirEntry) for the tree under root in sorted pre-order.
+
+    Directories are listed and descended into with a single scandir each;
+    ignored or excluded directories are pruned without being read.
+    """
+    ignores = [name for name in DEFAULT_IGNORES if not _matches(name, name, include)]
+    stack = [("", root, 1)]
+    while stack:
+        prefix, path, depth = stack.pop()
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        subdirs = []
+        for entry in entries:
+            rel_path = prefix + entry.name
+            if entry.name in ignores or _matches(rel_path, entry.name, exclude):
+                continue
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if not include or (not is_dir and _matches(rel_path, entry.name, include)):
+                yield rel_path, entry
+            if is_dir and (max_depth is None or depth < max_depth):
+                subdirs.append((rel_path + "/", entry.path, depth + 1))
+        # Reversed so the first subdirectory is walked first
+        stack.extend(reversed(subdirs))
+
+
+def walk_files(root, suffix=None):
+    """
+    Yield (relative path, stat) for every file under root, skipping DEFAULT_IGNORES.
+
+    Shared by the indexes that track a working directory (search, manifest,
+    import graph). Order is unspecified; unreadable directories are skipped.
+
+    Args:
+        root (str): Absolute directory to walk
+        suffix (str | None): Only yield files whose name ends with it, e.g. ".py"
+    """
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name in DEFAULT_IGNORES:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif (suffix is None or entry.name.endswith(suffix)) and entry.is_file(follow_symlinks=False):
+                        yield os.path.relpath(entry.path, root), entry.stat()
+        except OSError:
+            continue
+
+
+def _list_recursive(target_dir_abs, directory, max_depth, include, exclude, offset, limit):
+    entries = list(_walk(target_dir_abs, max_depth, _patterns(include), _patterns(exclude)))
+    total = len(entries)
+    page = entries[offset:offset + limit]
+
+    # Only the entries on this page are stat'ed
+    lines = [f"Contents of '{directory}' (recursive):"]
+    for rel_path, entry in page:
+        try:
+            file_size = entry.stat().st_size
+        except OSError:
+            file_size = 0
+        lines.append(f"- {rel_path}: file_size={file_size} bytes, is_dir={entry.is_dir()}")
+    if offset + len(page) < total:
+        lines.append(
+            f"[Showing entries {offset + 1}-{offset + len(page)} of {total}; "
+            f"pass offset={offset + len(page)} for more]"
+        )
+    elif offset:
+        lines.append(f"[Showing entries {offset + 1}-{offset + len(page)} of {total}]")
+    return "\n".join(lines)
+
+
+def get_files_info(working_directory, directory=None, recursive=False, max_depth=None, include=None, exclude=None, offset=0, limit=None):
+    """
+    List the files in a directory of the working directory along with their sizes. Can list a whole tree in one call.
+
+    Args:
+        working_directory (str): The base directory to work within
+        directory (str): Directory to list (relative to working_directory or absolute)
+        recursive (bool): List the whole tree instead of one level, skipping .git, __pycache__ and virtualenvs
+        max_depth (int): Optional depth limit for recursive listings (1 = direct children)
+        include (list[str]): Optional glob patterns; only matching files are listed
+        exclude (list[str]): Optional glob patterns for files and directories to skip
+        offset (int): Number of entries to skip (recursive listings)
+        limit (int): Maximum number of entries to return (recursive listings, default 1000)
+
+    Returns:
+        str: The listing or an error message
+    """
     if directory is None:
         directory = working_directory
     
@@ -25,35 +137,28 @@ def get_files_info(working_directory, directory=None):
         return f"Error: '{directory}' is not a valid directory"
     
     try:
-        items = os.listdir(target_dir_abs)
-        items.sort()  # Sort alphabetically
-        
-        result = f"Contents of '{directory}':\n"
+        if recursive or max_depth is not None or include or exclude:
+            return _list_recursive(
+                target_dir_abs,
+                directory,
+                int(max_depth) if max_depth is not None else None,
+                include,
+                exclude,
+                max(0, int(offset or 0)),
+                int(limit) if limit else DEFAULT_LIMIT,
+            )
+
+        # One scandir pass; DirEntry caches the type and stat of each item
+        with os.scandir(target_dir_abs) as it:
+            entries = sorted(it, key=lambda entry: entry.name)  # Sort alphabetically
         
-        for item in items:
-            item_path = os.path.join(target_dir_abs, item)
-            is_dir = os.path.isdir(item_path)
-            file_size = os.path.getsize(item_path)
-            result += f"- {item}: file_size={file_size} bytes, is_dir={is_dir}\n"
+        lines = [f"Contents of '{directory}':"]
+        for entry in entries:
+            lines.append(f"- {entry.name}: file_size={entry.stat().st_size} bytes, is_dir={entry.is_dir()}")
         
-        return result.rstrip()  # Remove trailing newline
+        return "\n".join(lines)
         
     except PermissionError:
         return f"Error: Permission denied accessing directory '{directory}'"
     except Exception as e:
         return f"Error: Could not read directory '{directory}': {str(e)}"
-    
-schema_get_files_info = genai.types.FunctionDeclaration(
-    name="get_files_info",
-    description="Lists files in the specified directory along with their sizes, constrained to the working directory.",
-    parameters=genai.types.Schema(
-        type=genai.types.Type.OBJECT,
-        properties={
-            "directory": genai.types.Schema(
-                type=genai.types.Type.STRING,
-                description="The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself.",
-            ),
-        },
-    ),
-)
-
@@ -0,0 +1,340 @@
+import ast
+import fnmatch
+import os
+import threading
+
+from . import disk_cache
+from .get_files_info import walk_files
+
+GRAPH_VERSION = 1
+
+# Python files larger than this are not parsed
+MAX_PARSED_BYTES = 1024 * 1024
+
+# File names treated as test modules
+TEST_PATTERNS = ("test*.py", "*_test.py")
+
+
+def is_test_module(rel_path):
+    name = os.path.basename(rel_path)
+    return any(fnmatch.fnmatch(name, pattern) for pattern in TEST_PATTERNS)
+
+
+def _refs(node):
+    """Names a piece of code reads; attribute chains count through their root name."""
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+
+def _is_main_guard(node):
+    """Whether a statement is `if __name__ == "__main__":`, which does not run under a test runner."""
+    test = node.test if isinstance(node, ast.If) else None
+    return (
+        isinstance(test, ast.Compare)
+        and isinstance(test.left, ast.Name)
+        and test.left.id == "__name__"
+    )
+
+
+def _test_classes(tree):
+    """
+    unittest classes of a module: {class: (shared refs, {test method: refs})}.
+
+    Shared refs are those of the bases and of every member that is not a
+    test method (setUp, helpers, class attributes), since every test of the
+    class runs them.
+    """
+    classes = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        bases = [base.attr if isinstance(base, ast.Attribute) else getattr(base, "id", "") for base in node.bases]
+        if not any(base.endswith("TestCase") or base in classes for base in bases):
+            continue
+        shared = set().union(*(_refs(base) for base in node.bases))
+        methods = {}
+        for base in bases:
+            if base in classes:
+                shared |= classes[base][0]
+                methods.update(classes[base][1])
+        for member in node.body:
+            if isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef)) and member.name.startswith("test"):
+                methods[member.name] = _refs(member)
+            else:
+                shared |= _refs(member)
+        classes[node.name] = (shared, methods)
+    return classes
+
+
+def _parse(data, test_module):
+    """
+    What the graph needs from one Python file, or None if it does not parse.
+
+    Returns:
+        dict: "imports" as (bound name, module, level, imported name or None)
+        tuples, "defs" mapping each top-level name to the names its definition
+        reads, "module_refs" read by other top-level code, and for test
+        modules "tests" as returned by _test_classes.
+    """
+    try:
+        tree = ast.parse(data)
+    except (SyntaxError, ValueError):
+        return None
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                bound = alias.asname or alias.name.split(".")[0]
+                imports.append((bound, alias.name, 0, None))
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                bound = alias.asname or alias.name
+                imports.append((bound, node.module or "", node.level, alias.name))
+
+    defs = {}
+    module_refs = set()
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)) or _is_main_guard(node):
+            continue
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            defs.setdefault(node.name, set()).update(_refs(node))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = {t.id for target in targets for t in ast.walk(target) if isinstance(t, ast.Name)}
+            value_refs = _refs(node.value) if node.value is not None else set()
+            for name in names:
+                defs.setdefault(name, set()).update(value_refs)
+        else:
+            module_refs |= _refs(node)
+    return {
+        "imports": imports,
+        "defs": defs,
+        "module_refs": module_refs,
+        "tests": _test_classes(tree) if test_module else None,
+    }
+
+
+class ImportGraph:
+    """
+    Import-dependency graph of the Python files under one working directory.
+
+    Every file's imports, top-level definitions and unittest test methods
+    are parsed with `ast` and cached on disk; a refresh only re-parses files
+    whose mtime or size changed. From a set of changed files the graph finds
+    every module that imports them directly or indirectly, and then the
+    smallest set of test methods that can reach the changed code: a test is
+    selected when its method, its class's shared code or the module helpers
+    they use read a name imported from an affected module.
+
+    Imports are resolved the way `python file.py` and `python -m unittest`
+    from the working directory would resolve them: against the importing
+    file's directory and against the working directory. Dynamic imports are
+    not seen.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.normpath(os.path.abspath(root))
+        self.path = disk_cache.cache_file("imports", self.root)
+        # rel path -> (mtime_ns, size, parsed); parsed is None for files that do not parse
+        self.files = disk_cache.load(self.path, GRAPH_VERSION) or {}
+        self.rescanned = 0
+        self._importers = None
+        self._lock = threading.Lock()
+
+    def _parse_file(self, rel_path, size):
+        if size > MAX_PARSED_BYTES:
+            return None
+        try:
+            with open(os.path.join(self.root, rel_path), "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        return _parse(data, is_test_module(rel_path))
+
+    def refresh(self):
+        """Re-parse changed Python files, forget deleted ones and save the cache if anything changed."""
+        with self._lock:
+            files = {}
+            self.rescanned = 0
+            for rel_path, stat in walk_files(self.root, ".py"):
+                entry = self.files.get(rel_path)
+                if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+                    entry = (stat.st_mtime_ns, stat.st_size, self._parse_file(rel_path, stat.st_size))
+                    self.rescanned += 1
+                files[rel_path] = entry
+            if self.rescanned or files.keys() != self.files.keys():
+                disk_cache.save(self.path, GRAPH_VERSION, files)
+                self._importers = None
+            self.files = files
+
+    def _module_files(self, base, module):
+        """Files executed by importing `module` from the directory `base`: its packages' __init__ and the module."""
+        found = []
+        parts = module.split(".") if module else []
+        for i in range(1, len(parts) + 1):
+            init = os.path.join(base, *parts[:i], "__init__.py")
+            if init in self.files:
+                found.append(init)
+        if parts:
+            module_file = os.path.join(base, *parts[:-1], parts[-1] + ".py")
+            if module_file in self.files:
+                found.append(module_file)
+        return found
+
+    def resolve(self, importer, module, level=0, name=None):
+        """Files in the working directory that an import in `importer` may load."""
+        found = set()
+        if level:
+            base = os.path.dirname(importer)
+            for _ in range(level - 1):
+                base = os.path.dirname(base)
+            bases = [base]
+            if not module and os.path.join(base, "__init__.py") in self.files:
+                # `from . import name` reads the package itself
+                found = {os.path.join(base, "__init__.py")}
+        else:
+            bases = list(dict.fromkeys([os.path.dirname(importer), ""]))
+        for base in bases:
+            found.update(self._module_files(base, module))
+            if name is not None and name != "*":
+                # `from pkg import mod` may name a submodule rather than an attribute
+                found.update(self._module_files(base, f"{module}.{name}" if module else name))
+        return found
+
+    def _importers_of(self):
+        if self._importers is None:
+            importers = {}
+            for rel_path, (_, _, parsed) in self.files.items():
+                for _, module, level, name in parsed["imports"] if parsed else ():
+                    for target in self.resolve(rel_path, module, level, name):
+                        importers.setdefault(target, set()).add(rel_path)
+            self._importers = importers
+        return self._importers
+
+    def affected(self, changed):
+        """Changed Python files plus every file that imports one of them, directly or not."""
+        importers = self._importers_of()
+        affected = {path for path in changed if path.endswith(".py")}
+        stack = list(affected)
+        while stack:
+            for importer in importers.get(stack.pop(), ()):
+                if importer not in affected:
+                    affected.add(importer)
+                    stack.append(importer)
+        return affected
+
+    def test_modules(self):
+        return sorted(path for path in self.files if is_test_module(path))
+
+    def impacted_tests(self, changed):
+        """
+        Select the tests that can reach the changed files.
+
+        Args:
+            changed (set[str]): changed paths relative to the working directory
+
+        Returns:
+            dict: {test module: None to run all of it, or sorted
+            ["Class.test_method", ...]}; modules with nothing to run are left out
+        """
+        with self._lock:
+            affected = self.affected(changed)
+            selected = {}
+            for module in self.test_modules():
+                if module not in affected:
+                    continue
+                parsed = self.files[module][2]
+                if module in changed or parsed is None or not parsed["tests"]:
+                    # Edited, unparsable or script-style test modules run whole
+                    selected[module] = None
+                    continue
+                tests = self._tests_reaching(module, parsed, affected)
+                if tests is None or tests:
+                    selected[module] = tests
+            return selected
+
+    def _tests_reaching(self, module, parsed, affected):
+        """Test methods of `module` that read a name bound to an affected module, or None for all of them."""
+        hit = set()
+        for bound, imported, level, name in parsed["imports"]:
+            if self.resolve(module, imported, level, name) & affected:
+                if bound == "*":
+                    return None
+                hit.add(bound)
+
+        defs = parsed["defs"]
+
+        def reaches_affected(refs):
+            # Follows the module-level helpers the code uses
+            seen = set()
+            stack = list(refs)
+            while stack:
+                ref = stack.pop()
+                if ref in hit:
+                    return True
+                if ref in seen or ref not in defs:
+                    continue
+                seen.add(ref)
+                stack.extend(defs[ref])
+            return False
+
+        if reaches_affected(parsed["module_refs"]):
+            return None
+        tests = []
+        for class_name, (shared, methods) in parsed["tests"].items():
+            class_hit = reaches_affected(shared - {class_name})
+            for method, refs in methods.items():
+                if class_hit or reaches_affected(refs - {class_name}):
+                    tests.append(f"{class_name}.{method}")
+        return sorted(tests)
+
+
+_graphs = {}
+_changed = {}
+_graphs_lock = threading.Lock()
+
+
+def get_graph(root):
+    """The refreshed import graph of `root`, shared by every caller in the process."""
+    key = os.path.normpath(os.path.abspath(root))
+    with _graphs_lock:
+        graph = _graphs.get(key)
+        if graph is None:
+            graph = _graphs[key] = ImportGraph(key)
+    graph.refresh()
+    return graph
+
+
+def notify_changed(working_directory, path):
+    """Record that a tool wrote `path`, so the next run_tests call selects its tests."""
+    key = os.path.normpath(os.path.abspath(working_directory))
+    abs_path = os.path.normpath(os.path.join(key, path))
+    if not abs_path.startswith(key + os.sep):
+        return
+    with _graphs_lock:
+        _changed.setdefault(key, set()).add(os.path.relpath(abs_path, key))
+
+
+def recorded_changes(working_directory):
+    """The paths recorded by notify_changed for `working_directory`, without forgetting them."""
+    key = os.path.normpath(os.path.abspath(working_directory))
+    with _graphs_lock:
+        return set(_changed.get(key, ()))
+
+
+def take_changes(working_directory, paths=None):
+    """
+    Return and forget the paths recorded by notify_changed for `working_directory`.
+
+    With `paths`, only those are forgotten, so changes recorded since they
+    were read with recorded_changes are kept for the next call.
+    """
+    key = os.path.normpath(os.path.abspath(working_directory))
+    with _graphs_lock:
+        if paths is None:
+            return _changed.pop(key, set())
+        changed = _changed.get(key, set())
+        taken = changed & set(paths)
+        changed -= taken
+        if not changed:
+            _changed.pop(key, None)
+        return taken
@@ -0,0 +1,69 @@
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, islice
+
+# Bytes scanned per step when the index has to grow
+SCAN_CHUNK = 1 << 20
+
+# Number of files whose line offsets are kept between calls
+MAX_INDEXED_FILES = 32
+
+
+class LineIndex:
+    """
+    Byte offsets of line starts in one file, built lazily.
+
+    The index is only extended (a chunk at a time) as far as the furthest
+    line requested so far, so paging through the top of a huge file never scans the rest of it, and
+    any line already indexed is located with a single array lookup.
+    """
+
+    def __init__(self, size, mtime_ns):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.offsets = array("Q", [0])
+        self.scanned = 0
+        self.complete = size == 0
+        self._lock = threading.Lock()
+
+    def _scan_chunk(self, mm):
+        chunk = mm[self.scanned:self.scanned + SCAN_CHUNK]
+        pieces = chunk.split(b"\n")
+        # Every piece but the last ends at a newline; the next line starts right after it
+        starts = accumulate((len(piece) + 1 for piece in pieces[:-1]), initial=self.scanned)
+        self.offsets.extend(islice(starts, 1, None))
+        self.scanned += len(chunk)
+        if self.offsets[-1] >= self.size:
+            # A trailing newline does not start another line
+            self.offsets.pop()
+        if self.scanned >= self.size:
+            self.complete = True
+
+    def line_start(self, mm, line):
+        """Byte offset where 1-based `line` starts, or None if the file has fewer lines."""
+        with self._lock:
+            while len(self.offsets) < line and not self.complete:
+                self._scan_chunk(mm)
+            if line <= len(self.offsets):
+                return self.offsets[line - 1]
+            return None
+
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_line_index(path, stat):
+    """Return the cached LineIndex for `path`, rebuilding it if the file changed."""
+    key = os.path.normpath(path)
+    with _lock:
+        index = _indexes.get(key)
+        if index is None or index.size != stat.st_size or index.mtime_ns != stat.st_mtime_ns:
+            index = LineIndex(stat.st_size, stat.st_mtime_ns)
+            _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXED_FILES:
+            _indexes.popitem(last=False)
+        return index
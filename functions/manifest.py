@@ -0,0 +1,121 @@
+import ast
+import hashlib
+import os
+
+from . import disk_cache
+from .get_files_info import walk_files
+
+MANIFEST_VERSION = 1
+
+# Files larger than this are listed without a hash or symbols
+MAX_SCANNED_BYTES = 1024 * 1024
+
+# Bounds on the manifest text, which is sent with every request
+MAX_MANIFEST_CHARS = 6000
+MAX_SYMBOLS = 12
+
+
+def _symbols(data):
+    """Top-level classes, functions and constants of Python source, or None if it does not parse."""
+    try:
+        tree = ast.parse(data)
+    except (SyntaxError, ValueError):
+        return None
+    symbols = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            symbols.append(node.name)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(f"{node.name}()")
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            symbols.extend(
+                target.id for target in targets if isinstance(target, ast.Name) and target.id.isupper()
+            )
+    return symbols
+
+
+def _scan(path, rel_path, size):
+    """Return (digest, symbols) for one file; symbols is None for non-Python files."""
+    if size > MAX_SCANNED_BYTES:
+        return None, None
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None, None
+    digest = hashlib.sha1(data).hexdigest()[:8]
+    return digest, _symbols(data) if rel_path.endswith(".py") else None
+
+
+def _size(size):
+    for unit in ("B", "K", "M"):
+        if size < 1024 or unit == "M":
+            return f"{size}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+class WorkspaceManifest:
+    """
+    Compact description of a working directory for the system prompt.
+
+    Lists every file with its size, a short content hash and, for Python
+    files, the top-level symbols found by `ast`, so the model sees the layout
+    without listing directories. It is sent with every request, so it adds
+    to the prompt tokens of each step.
+    Entries are cached on disk and a refresh only re-reads files whose mtime
+    or size changed.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.normpath(os.path.abspath(root))
+        self.path = disk_cache.cache_file("manifest", self.root)
+        # rel path -> (mtime_ns, size, digest, symbols)
+        self.files = disk_cache.load(self.path, MANIFEST_VERSION) or {}
+        self.rescanned = 0
+
+    def refresh(self):
+        """Re-scan changed files, forget deleted ones and save the cache if anything changed."""
+        files = {}
+        self.rescanned = 0
+        for rel_path, stat in walk_files(self.root):
+            entry = self.files.get(rel_path)
+            if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+                digest, symbols = _scan(os.path.join(self.root, rel_path), rel_path, stat.st_size)
+                entry = (stat.st_mtime_ns, stat.st_size, digest, symbols)
+                self.rescanned += 1
+            files[rel_path] = entry
+        if self.rescanned or files.keys() != self.files.keys():
+            disk_cache.save(self.path, MANIFEST_VERSION, files)
+        self.files = files
+
+    def render(self, max_chars=MAX_MANIFEST_CHARS):
+        """The manifest as text: one "path size hash: symbols" line per file."""
+        header = (
+            f"Workspace manifest ({len(self.files)} files; paths relative to the working "
+            "directory; size, content hash and top-level Python symbols):"
+        )
+        lines = [header]
+        used = len(header)
+        paths = sorted(self.files, key=lambda p: (p.count(os.sep), p))
+        for shown, rel_path in enumerate(paths):
+            _, size, digest, symbols = self.files[rel_path]
+            line = f"{rel_path} {_size(size)} {digest or '-'}"
+            if symbols is None and rel_path.endswith(".py"):
+                line += ": (too large)" if size > MAX_SCANNED_BYTES else ": (does not parse)"
+            elif symbols:
+                more = len(symbols) - MAX_SYMBOLS
+                line += ": " + ", ".join(symbols[:MAX_SYMBOLS]) + (f", +{more} more" if more > 0 else "")
+            if used + len(line) + 1 > max_chars:
+                lines.append(f"[... {len(paths) - shown} more files; use get_files_info to list them]")
+                break
+            lines.append(line)
+            used += len(line) + 1
+        return "\n".join(lines)
+
+
+def build_manifest(working_directory):
+    """Refresh the cached manifest of `working_directory` and return its text."""
+    manifest = WorkspaceManifest(working_directory)
+    manifest.refresh()
+    return manifest.render()
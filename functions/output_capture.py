@@ -0,0 +1,131 @@
+import os
+import selectors
+import subprocess
+import time
+from collections import namedtuple
+
+# Bytes kept from the start and the end of each stream
+HEAD_BYTES = 8000
+TAIL_BYTES = 4000
+
+# Combined stdout+stderr size after which the process is killed
+MAX_OUTPUT_BYTES = 16 * 1024 * 1024
+
+READ_CHUNK = 65536
+
+CapturedRun = namedtuple("CapturedRun", "returncode stdout stderr output_limit_reached")
+
+
+class HeadTailBuffer:
+    """
+    Keep the first `head_bytes` and last `tail_bytes` of a byte stream.
+
+    Memory stays bounded no matter how much is written; `total_bytes` counts
+    everything that went through.
+    """
+
+    def __init__(self, head_bytes=HEAD_BYTES, tail_bytes=TAIL_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+
+    def write(self, data):
+        self.total_bytes += len(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data and self.tail_bytes > 0:
+            self.tail += data[-self.tail_bytes:]
+            excess = len(self.tail) - self.tail_bytes
+            if excess > 0:
+                del self.tail[:excess]
+
+    @property
+    def truncated(self):
+        return self.total_bytes > len(self.head) + len(self.tail)
+
+    def __bool__(self):
+        return self.total_bytes > 0
+
+    def text(self):
+        """Decode the kept bytes, marking the omitted middle if any."""
+        head = _decode(self.head)
+        if not self.truncated:
+            return head + _decode(self.tail)
+        omitted = self.total_bytes - len(self.head) - len(self.tail)
+        return f"{head}\n[...{omitted} bytes omitted...]\n{_decode(self.tail)}"
+
+    def label(self):
+        if not self.truncated:
+            return ""
+        return f" ({self.total_bytes} bytes, showing first {len(self.head)} and last {len(self.tail)})"
+
+
+def _decode(data):
+    text = bytes(data).decode("utf-8", errors="replace")
+    # Same newline handling as subprocess text mode
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def read_streams(stdout_fd, stderr_fd, timeout, max_output_bytes=MAX_OUTPUT_BYTES):
+    """
+    Read two pipes into head/tail buffers until EOF, the timeout or the output cap.
+
+    Returns:
+        tuple: (stdout, stderr, reason) where reason is None, "timeout" or
+        "output_limit".
+    """
+    buffers = {stdout_fd: HeadTailBuffer(), stderr_fd: HeadTailBuffer()}
+    deadline = time.monotonic() + timeout
+    reason = None
+    with selectors.DefaultSelector() as selector:
+        for fd in buffers:
+            selector.register(fd, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                reason = "timeout"
+                break
+            for key, _ in selector.select(remaining):
+                data = os.read(key.fd, READ_CHUNK)
+                if data:
+                    buffers[key.fd].write(data)
+                else:
+                    selector.unregister(key.fd)
+            if sum(buffer.total_bytes for buffer in buffers.values()) > max_output_bytes:
+                reason = "output_limit"
+                break
+    return buffers[stdout_fd], buffers[stderr_fd], reason
+
+
+def run_captured(cmd, cwd, timeout, max_output_bytes=MAX_OUTPUT_BYTES):
+    """
+    Run a command like subprocess.run(capture_output=True) with bounded memory.
+
+    Returns:
+        CapturedRun
+
+    Raises:
+        subprocess.TimeoutExpired: if the command ran longer than `timeout`.
+    """
+    started = time.monotonic()
+    with subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd
+    ) as process:
+        stdout, stderr, reason = read_streams(
+            process.stdout.fileno(), process.stderr.fileno(), timeout, max_output_bytes
+        )
+        if reason is None:
+            try:
+                process.wait(timeout=max(0, timeout - (time.monotonic() - started)))
+            except subprocess.TimeoutExpired:
+                reason = "timeout"
+        if reason is not None:
+            process.kill()
+            process.wait()
+        if reason == "timeout":
+            raise subprocess.TimeoutExpired(cmd, timeout, output=stdout.text(), stderr=stderr.text())
+        return CapturedRun(process.returncode, stdout, stderr, reason == "output_limit")
@@ -0,0 +1,117 @@
+import json
+import os
+import signal
+import socket
+import sys
+
+# Imported once by each warm interpreter so forked runs don't pay for them again
+DEFAULT_PRELOAD = (
+    "argparse",
+    "collections",
+    "dataclasses",
+    "datetime",
+    "decimal",
+    "functools",
+    "itertools",
+    "json",
+    "math",
+    "pathlib",
+    "re",
+    "traceback",
+    "typing",
+    "unittest",
+)
+
+
+def _exit_code(exit_value):
+    """Translate a SystemExit value the way the interpreter does."""
+    if exit_value is None:
+        return 0
+    if isinstance(exit_value, int):
+        return exit_value
+    print(exit_value, file=sys.stderr)
+    return 1
+
+
+def _run_child(request, stdout_fd, stderr_fd):
+    """Body of the forked child: behave like `python3 file args...` in `cwd`."""
+    import atexit
+    import runpy
+    import traceback
+
+    code = 1
+    try:
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        for fd in (devnull, stdout_fd, stderr_fd):
+            os.close(fd)
+        os.chdir(request["cwd"])
+        file_path = request["file"]
+        sys.argv = [file_path] + list(request["args"])
+        sys.path[0] = os.path.dirname(file_path)
+        try:
+            runpy.run_path(file_path, run_name="__main__")
+            code = 0
+        except SystemExit as e:
+            code = _exit_code(e.code)
+        except BaseException as e:
+            # Hide the runpy frames so the traceback starts at the script
+            tb = e.__traceback__
+            while tb is not None and tb.tb_frame.f_code.co_filename != file_path:
+                tb = tb.tb_next
+            traceback.print_exception(type(e), e, tb or e.__traceback__)
+            code = 1
+        atexit._run_exitfuncs()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def serve(control_fd, preload=DEFAULT_PRELOAD):
+    """
+    Fork-server main loop, run inside a warm interpreter.
+
+    Each request arrives as one JSON line carrying the stdout/stderr pipe ends
+    as ancillary fds. The server forks a child for it, reports the child's pid,
+    waits for it and reports the return code (negative for a signal, like
+    subprocess).
+    """
+    for module in preload:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+    sock = socket.socket(fileno=control_fd)
+    buffer = b""
+    while True:
+        fds = []
+        while b"\n" not in buffer:
+            data, new_fds, _, _ = socket.recv_fds(sock, 65536, 2)
+            if not data:
+                return
+            buffer += data
+            fds.extend(new_fds)
+        line, buffer = buffer.split(b"\n", 1)
+        request = json.loads(line)
+        stdout_fd, stderr_fd = fds
+
+        pid = os.fork()
+        if pid == 0:
+            sock.close()
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            _run_child(request, stdout_fd, stderr_fd)
+        os.close(stdout_fd)
+        os.close(stderr_fd)
+        sock.sendall(f"{pid}\n".encode())
+        _, status = os.waitpid(pid, 0)
+        sock.sendall(f"{os.waitstatus_to_exitcode(status)}\n".encode())
+
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]))
@@ -0,0 +1,137 @@
+import json
+import os
+import queue
+import signal
+import socket
+import subprocess
+import threading
+
+from .output_capture import CapturedRun, read_streams, MAX_OUTPUT_BYTES
+
+# Script run by each warm interpreter
+FORK_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_fork_server.py")
+
+DEFAULT_POOL_SIZE = 2
+
+
+class _Worker:
+    """One warm interpreter running the fork server, handling one run at a time."""
+
+    def __init__(self, interpreter):
+        parent_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.process = subprocess.Popen(
+            [interpreter, FORK_SERVER, str(child_sock.fileno())],
+            pass_fds=[child_sock.fileno()],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        child_sock.close()
+        self.sock = parent_sock
+        self.replies = parent_sock.makefile("r", encoding="utf-8")
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, file_path, args, cwd, timeout, max_output_bytes):
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        try:
+            request = json.dumps({"file": file_path, "args": list(args), "cwd": cwd})
+            socket.send_fds(self.sock, [request.encode() + b"\n"], [stdout_w, stderr_w])
+        finally:
+            os.close(stdout_w)
+            os.close(stderr_w)
+
+        try:
+            pid = int(self.replies.readline())
+            stdout, stderr, reason = read_streams(
+                stdout_r, stderr_r, timeout, max_output_bytes
+            )
+            if reason is not None:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            returncode = int(self.replies.readline())
+        except ValueError:
+            raise RuntimeError("Python worker exited unexpectedly")
+        finally:
+            os.close(stdout_r)
+            os.close(stderr_r)
+
+        cmd = ["python3", file_path] + list(args)
+        if reason == "timeout":
+            raise subprocess.TimeoutExpired(
+                cmd, timeout, output=stdout.text(), stderr=stderr.text()
+            )
+        return CapturedRun(returncode, stdout, stderr, reason == "output_limit")
+
+    def close(self):
+        self.sock.close()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class PythonWorkerPool:
+    """
+    Pool of warm, pre-forked Python interpreters for run_python_file.
+
+    Every run forks a fresh child from a warm interpreter that has already
+    imported the common modules in `preload`, so the edit/run/verify cycle
+    skips interpreter startup. The child gets the same cwd, argv, timeout and
+    bounded stdout/stderr capture as `output_capture.run_captured`.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, interpreter="python3"):
+        if not hasattr(os, "fork") or not hasattr(socket, "send_fds"):
+            raise RuntimeError("Warm Python workers need os.fork and fd passing")
+        self.interpreter = interpreter
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        worker = _Worker(self.interpreter)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker):
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.close()
+        return self._spawn()
+
+    def run(self, file_path, args, cwd, timeout, max_output_bytes=MAX_OUTPUT_BYTES):
+        """
+        Run a Python file in a forked warm child.
+
+        Returns:
+            output_capture.CapturedRun
+
+        Raises:
+            subprocess.TimeoutExpired: if the run exceeded `timeout` seconds.
+        """
+        worker = self._idle.get()
+        if not worker.alive():
+            worker = self._replace(worker)
+        try:
+            return worker.run(file_path, args, cwd, timeout, max_output_bytes)
+        except (OSError, RuntimeError):
+            worker = self._replace(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
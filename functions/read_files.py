@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypedDict
+
+from .get_file_content import read_file_content
+
+# Combined budget for the contents returned by one call
+MAX_TOTAL_CHARS = 40000
+
+MAX_FILES = 20
+MAX_WORKERS = 8
+
+
+class FileRequest(TypedDict):
+    """A file to read: its path, and optionally the first and last line (1-based, inclusive) to return."""
+
+    file_path: str
+    start_line: int
+    end_line: int
+
+
+def _budgets(lengths, total):
+    """
+    Split `total` characters between files of the given lengths.
+
+    Files that fit in an equal share keep all their content and the rest of
+    their share goes to the larger files, so one huge file cannot crowd out
+    the others and small files are never cut.
+    """
+    budgets = [0] * len(lengths)
+    remaining = total
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    for position, i in enumerate(order):
+        share = remaining // (len(lengths) - position)
+        budgets[i] = min(lengths[i], share)
+        remaining -= budgets[i]
+    return budgets
+
+
+def read_files(working_directory, files):
+    """
+    Read several files (or line ranges of them) in one call. Prefer this over repeated get_file_content calls when you need more than one file. All files share one size budget; the largest files are truncated first.
+
+    Args:
+        working_directory (str): The base directory to work within
+        files (list[FileRequest]): Files to read, each with a file_path and optional start_line/end_line
+
+    Returns:
+        dict: {"files": [{"file_path", "content"} or {"file_path", "error"}, ...]} in request order, or an error message
+    """
+    if isinstance(files, (str, dict)):
+        files = [files]
+    if not files:
+        return "Error: files must list at least one file"
+    if len(files) > MAX_FILES:
+        return f"Error: Cannot read more than {MAX_FILES} files in one call"
+
+    requests = []
+    for request in files:
+        # A bare path is accepted as well as a FileRequest
+        if isinstance(request, str):
+            request = {"file_path": request}
+        if not isinstance(request, dict) or not request.get("file_path"):
+            return "Error: Every entry of files needs a file_path"
+        requests.append(request)
+
+    def read(request):
+        # Applies the working directory containment checks to every path. Files
+        # are only capped at the combined budget here; _budgets splits it below
+        return read_file_content(
+            working_directory,
+            request["file_path"],
+            start_line=request.get("start_line"),
+            end_line=request.get("end_line"),
+            max_chars=MAX_TOTAL_CHARS,
+        )
+
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(requests))) as executor:
+        reads = list(executor.map(read, requests))
+
+    lengths = [0 if error is not None else len(content) for content, error in reads]
+    budgets = _budgets(lengths, MAX_TOTAL_CHARS)
+    results = []
+    for request, (content, error), budget in zip(requests, reads, budgets):
+        file_path = request["file_path"]
+        if error is not None:
+            results.append({"file_path": file_path, "error": error})
+            continue
+        if len(content) > budget:
+            content = content[:budget] + (
+                f'\n\n[...File "{file_path}" truncated at {budget} characters to fit the combined '
+                f"budget of {MAX_TOTAL_CHARS}; read it on its own for more]"
+            )
+        results.append({"file_path": file_path, "content": content})
+    return {"files": results}
@@ -0,0 +1,174 @@
+import json
+import os
+import stat
+import threading
+from collections import OrderedDict
+
+# Read-only tools whose results may be cached, with the argument naming their target path
+CACHEABLE_TOOLS = {
+    "get_files_info": "directory",
+    "get_file_content": "file_path",
+}
+
+# get_files_info arguments that make a listing recursive; those listings are not cached
+_RECURSIVE_ARGS = ("recursive", "max_depth", "include", "exclude")
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+def _resolve(working_directory, path):
+    if path is None:
+        path = working_directory
+    if not os.path.isabs(path):
+        path = os.path.join(working_directory, path)
+    return os.path.normpath(os.path.abspath(path))
+
+
+def _is_within(path, directory):
+    return path == directory or path.startswith(directory + os.sep)
+
+
+class ResultCache:
+    """
+    LRU cache of read-only tool results, validated by the target's mtime and size.
+
+    Directory listings are also validated by the mtime and size of every
+    entry; recursive listings are never cached.
+
+    Entries are keyed by tool name, resolved target path and the remaining
+    arguments. A lookup re-stats the target and treats any change as a miss.
+    Tools that modify the workspace call `invalidate` so listings and contents
+    of the touched path (and of its parent directories) are dropped.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, function_name, kwargs):
+        """Return the cache key for a call, or None if the call is not cacheable."""
+        path_arg = CACHEABLE_TOOLS.get(function_name)
+        if path_arg is None:
+            return None
+        if function_name == "get_files_info" and any(kwargs.get(arg) for arg in _RECURSIVE_ARGS):
+            # Validating a tree listing would mean re-walking the tree
+            return None
+        working_directory = kwargs.get("working_directory", ".")
+        try:
+            target = _resolve(working_directory, kwargs.get(path_arg))
+            other_args = json.dumps(
+                {k: v for k, v in kwargs.items() if k not in (path_arg, "working_directory")},
+                sort_keys=True,
+                default=str,
+            )
+        except (TypeError, ValueError):
+            return None
+        return (function_name, target, other_args)
+
+    @staticmethod
+    def _validator(target):
+        """
+        What must be unchanged for a cached result to be served.
+
+        A file's mtime and size; for a directory also every entry's, since a
+        listing shows the sizes of files whose changes leave the directory's
+        own mtime alone.
+        """
+        try:
+            target_stat = os.stat(target)
+            if not stat.S_ISDIR(target_stat.st_mode):
+                return (target_stat.st_mtime_ns, target_stat.st_size)
+            with os.scandir(target) as it:
+                entries = []
+                for entry in it:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    entries.append((entry.name, entry_stat.st_mtime_ns, entry_stat.st_size))
+        except OSError:
+            return None
+        return (target_stat.st_mtime_ns, target_stat.st_size, tuple(sorted(entries)))
+
+    def get(self, key):
+        """Return (True, result) on a valid hit, else (False, None)."""
+        validator = self._validator(key[1])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and validator is not None and entry[0] == validator:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return False, None
+
+    def validator(self, key):
+        """The current validator of a key's target, to pass to `put` as `seen`."""
+        return self._validator(key[1])
+
+    def put(self, key, result, seen=None):
+        """
+        Store a tool result.
+
+        `seen` is the validator read before the tool ran. If the target has
+        changed since, the result may predate a concurrent write (whose
+        invalidation already ran), so it is not stored.
+        """
+        validator = self._validator(key[1])
+        if validator is None or not isinstance(result, str) or result.startswith("Error"):
+            return
+        if seen is not None and seen != validator:
+            return
+        size = len(result.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (validator, result, size)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, working_directory, path=None):
+        """
+        Drop entries affected by a change to `path`.
+
+        With no path the whole working directory is treated as changed.
+        """
+        changed = _resolve(working_directory, path)
+        with self._lock:
+            stale = [
+                key
+                for key in self._entries
+                if _is_within(key[1], changed) or _is_within(changed, key[1])
+            ]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return (
+            f"Tool cache: {self.hits} hits, {self.misses} misses, "
+            f"{self.invalidations} invalidated, {self.evictions} evicted, "
+            f"{len(self._entries)} entries ({self._bytes} bytes)"
+        )
@@ -1,8 +1,44 @@
+import atexit
 import os
-import subprocess
-from google import genai
+
+from .output_capture import run_captured
+
+# Optional pool of warm interpreters; None means a fresh python3 per run
+_worker_pool = None
+
+
+def enable_worker_pool(size=None):
+    """
+    Run Python files in forked children of warm interpreters instead of a new python3.
+
+    Returns:
+        bool: whether the pool could be started on this platform.
+    """
+    global _worker_pool
+    from .python_worker_pool import PythonWorkerPool, DEFAULT_POOL_SIZE
+
+    if _worker_pool is not None:
+        return True
+    try:
+        _worker_pool = PythonWorkerPool(size or DEFAULT_POOL_SIZE)
+    except (RuntimeError, OSError):
+        return False
+    atexit.register(_worker_pool.close)
+    return True
+
 
 def run_python_file(working_directory, file_path, args=[]):
+    """
+    Run a Python file in the working directory with optional command line arguments.
+
+    Args:
+        working_directory (str): The base directory to work within
+        file_path (str): Path to the .py file (relative to working_directory)
+        args (list[str]): Optional arguments passed to the script
+
+    Returns:
+        str: The script's stdout, stderr and exit code, or an error message
+    """
     abs_working_dir = os.path.abspath(working_directory)
     abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
     if not abs_file_path.startswith(abs_working_dir):
@@ -14,36 +50,26 @@ def run_python_file(working_directory, file_path, args=[]):
     timeout_seconds = 30
     cmd = ["python3", abs_file_path] + args
     try:
-        completed_process = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout_seconds,
-            cwd=abs_working_dir
-        )
+        if _worker_pool is not None:
+            completed_process = _worker_pool.run(
+                abs_file_path, args, abs_working_dir, timeout_seconds
+            )
+        else:
+            # Streams into bounded head/tail buffers instead of holding all output
+            completed_process = run_captured(cmd, abs_working_dir, timeout_seconds)
+        stdout = completed_process.stdout
+        stderr = completed_process.stderr
         output = ""
-        if completed_process.stdout:
-            output += f"STDOUT:\n{completed_process.stdout}"
-        if completed_process.stderr:
-            output += f"\nSTDERR:\n{completed_process.stderr}"
-        if completed_process.returncode != 0:
+        if stdout:
+            output += f"STDOUT{stdout.label()}:\n{stdout.text()}"
+        if stderr:
+            output += f"\nSTDERR{stderr.label()}:\n{stderr.text()}"
+        if completed_process.output_limit_reached:
+            output += f"\nProcess killed after printing {stdout.total_bytes + stderr.total_bytes} bytes (output limit reached)"
+        elif completed_process.returncode != 0:
             output += f"\nProcess exited with code {completed_process.returncode}"
         if not output.strip():
             return "No output produced."
         return output.strip()
     except Exception as e:
         return f"Error: executing Python file: {e}"
-    
-schema_run_python_file = genai.types.FunctionDeclaration(
-    name="run_python_file",
-    description="Runs a specified python file.",
-    parameters=genai.types.Schema(
-        type=genai.types.Type.OBJECT,
-        properties={
-            "file": genai.types.Schema(
-                type=genai.types.Type.STRING,
-                description="Name of the file to execute.",
-            ),
-        },
-    ),
-)
\ No newline at end of file
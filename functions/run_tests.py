@@ -0,0 +1,188 @@
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .import_graph import get_graph, recorded_changes, take_changes
+from .output_capture import run_captured
+
+MAX_WORKERS = 4
+TIMEOUT_SECONDS = 60
+
+# Traceback lines kept per failing test
+MAX_DETAIL_LINES = 12
+
+# Runs unittest ids in a child process and writes the outcome to the JSON file named by argv[1]
+_RUNNER = """
+import io, json, sys, unittest
+suite = unittest.defaultTestLoader.loadTestsFromNames(sys.argv[2:])
+result = unittest.TextTestRunner(stream=io.StringIO(), verbosity=0).run(suite)
+with open(sys.argv[1], "w") as file:
+    json.dump({
+        "ran": result.testsRun,
+        "failures": [[test.id(), detail] for test, detail in result.failures],
+        "errors": [[test.id(), detail] for test, detail in result.errors],
+        "skipped": len(result.skipped),
+    }, file)
+"""
+
+
+def _module_name(rel_path):
+    return os.path.splitext(rel_path)[0].replace(os.sep, ".")
+
+
+def _jobs(selected, graph):
+    """
+    Split the selection into subprocess runs, one per test class.
+
+    Returns:
+        list: (label, unittest ids, or None to run a script-style module as a script, module path)
+    """
+    jobs = []
+    for module, tests in sorted(selected.items()):
+        name = _module_name(module)
+        parsed = graph.files[module][2]
+        if tests is None and (not parsed or not parsed["tests"]):
+            jobs.append((name, None, module))
+        elif tests is None:
+            jobs.extend((f"{name}.{class_name}", [f"{name}.{class_name}"], module) for class_name in parsed["tests"])
+        else:
+            by_class = {}
+            for test in tests:
+                class_name, _ = test.split(".", 1)
+                by_class.setdefault(class_name, []).append(f"{name}.{test}")
+            jobs.extend((f"{name}.{class_name} ({len(ids)})", ids, module) for class_name, ids in by_class.items())
+    return jobs
+
+
+def _tail(text, lines=MAX_DETAIL_LINES):
+    kept = text.strip().splitlines()
+    if len(kept) > lines:
+        kept = [f"[...{len(kept) - lines} lines omitted]"] + kept[-lines:]
+    return "\n".join("    " + line for line in kept)
+
+
+def _run_unittest(working_directory, ids):
+    """Run unittest ids in a fresh interpreter. Returns the runner's outcome dict."""
+    fd, result_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        completed = run_captured(
+            ["python3", "-c", _RUNNER, result_path] + ids, working_directory, TIMEOUT_SECONDS
+        )
+        try:
+            with open(result_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            # The run died before reporting, e.g. an import error in the test module
+            output = completed.stderr.text() or completed.stdout.text()
+            return {"ran": 1, "failures": [], "errors": [[" ".join(ids), output]], "skipped": 0}
+    except subprocess.TimeoutExpired:
+        return {
+            "ran": 1,
+            "failures": [],
+            "errors": [[" ".join(ids), f"Timed out after {TIMEOUT_SECONDS} seconds"]],
+            "skipped": 0,
+        }
+    finally:
+        os.unlink(result_path)
+
+
+def _run_script(working_directory, module):
+    """Run a test module without unittest classes as a script; it passes when it exits with 0."""
+    try:
+        completed = run_captured(["python3", module], working_directory, TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired:
+        return {"ran": 1, "failures": [], "errors": [[module, f"Timed out after {TIMEOUT_SECONDS} seconds"]], "skipped": 0}
+    if completed.returncode == 0:
+        return {"ran": 1, "failures": [], "errors": [], "skipped": 0}
+    detail = completed.stderr.text() or completed.stdout.text()
+    return {
+        "ran": 1,
+        "failures": [[module, f"{detail}\nexit code {completed.returncode}"]],
+        "errors": [],
+        "skipped": 0,
+    }
+
+
+def run_tests(working_directory, files=None, all_tests=False):
+    """
+    Run only the tests affected by changed Python files and return a short pass/fail summary. Without arguments it selects the tests reached by files changed with write_file or edit_file since the last run_tests call, or runs every test if there are none. Use this instead of run_python_file to re-run tests after a change.
+
+    Tests are selected through an import-dependency graph of the working
+    directory (see functions.import_graph) and run in parallel, one process
+    per test class.
+
+    Args:
+        working_directory (str): The base directory to work within
+        files (list[str]): Optional changed files (relative to working_directory) to select tests for, instead of the recorded changes
+        all_tests (bool): Run every test, not only the affected ones
+
+    Returns:
+        str: Which tests ran and why, the pass/fail counts and the end of each failure's traceback, or an error message
+    """
+    abs_working_dir = os.path.abspath(working_directory)
+    if not os.path.isdir(abs_working_dir):
+        return f'Error: Working directory "{working_directory}" not found'
+
+    if isinstance(files, str):
+        files = [files]
+    # Explicit files leave the recorded changes for a later call
+    paths = files or recorded_changes(abs_working_dir)
+    changed = set()
+    for path in paths:
+        abs_path = os.path.normpath(os.path.join(abs_working_dir, path))
+        if not abs_path.startswith(abs_working_dir + os.sep):
+            return f'Error: Cannot select tests for "{path}" as it is outside the permitted working directory'
+        changed.add(os.path.relpath(abs_path, abs_working_dir))
+    if not files:
+        # Forgotten only once they are accepted, so an error keeps them for the next call
+        take_changes(abs_working_dir, paths)
+
+    graph = get_graph(abs_working_dir)
+    if all_tests or not changed:
+        selected = {module: None for module in graph.test_modules()}
+        reason = "All tests" if all_tests else "No recorded changes; all tests"
+        if not selected:
+            return "No test modules found (test*.py or *_test.py)"
+    else:
+        selected = graph.impacted_tests(changed)
+        reason = f"Tests affected by {', '.join(sorted(changed))}"
+        if not selected:
+            return f"No tests import {', '.join(sorted(changed))}, directly or indirectly"
+
+    jobs = _jobs(selected, graph)
+
+    def run(job):
+        _, ids, module = job
+        if ids is None:
+            return _run_script(abs_working_dir, module)
+        return _run_unittest(abs_working_dir, ids)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(jobs))) as executor:
+        outcomes = list(executor.map(run, jobs))
+    elapsed = time.monotonic() - started
+
+    ran = sum(outcome["ran"] for outcome in outcomes)
+    failures = [item for outcome in outcomes for item in outcome["failures"]]
+    errors = [item for outcome in outcomes for item in outcome["errors"]]
+    skipped = sum(outcome["skipped"] for outcome in outcomes)
+    passed = ran - len(failures) - len(errors) - skipped
+
+    lines = [
+        f"{reason}: {', '.join(label for label, _, _ in jobs)}",
+        f"{passed} passed, {len(failures)} failed, {len(errors)} errors, {skipped} skipped "
+        f"in {elapsed:.2f}s ({len(jobs)} {'process' if len(jobs) == 1 else 'processes'})",
+    ]
+    for kind, items in (("FAIL", failures), ("ERROR", errors)):
+        # Tests that failed the same way (say, an import error) share one traceback
+        by_detail = {}
+        for test_id, detail in items:
+            by_detail.setdefault(detail, []).append(test_id)
+        for detail, test_ids in by_detail.items():
+            lines.append(f"{kind}: {', '.join(dict.fromkeys(test_ids))}")
+            lines.append(_tail(detail))
+    return "\n".join(lines)
@@ -0,0 +1,127 @@
+import os
+import re
+from collections import deque
+from fnmatch import fnmatch
+
+from .search_index import get_index, required_literals
+
+DEFAULT_MAX_RESULTS = 50
+MAX_CONTEXT_LINES = 5
+MAX_LINE_CHARS = 300
+
+
+def _clip(line):
+    line = line.rstrip("\r\n")
+    if len(line) > MAX_LINE_CHARS:
+        return line[:MAX_LINE_CHARS] + "..."
+    return line
+
+
+def _search_file(path, rel_path, pattern, context_lines, limit):
+    """
+    Stream one file line by line, keeping only the context window in memory.
+
+    Returns:
+        tuple: (output lines, matches shown, whether a match past `limit` was found)
+    """
+    output = []
+    hits = 0
+    before = deque(maxlen=context_lines)
+    after = 0
+    more = False
+    last_shown = None
+
+    def show(number, line, separator):
+        nonlocal last_shown
+        if context_lines and last_shown is not None and number != last_shown + 1:
+            output.append("--")
+        output.append(f"{rel_path}{separator}{number}{separator} {_clip(line)}")
+        last_shown = number
+
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        for number, line in enumerate(file, start=1):
+            hit = pattern.search(line) is not None
+            if hit and hits < limit:
+                for previous in before:
+                    show(*previous, "-")
+                before.clear()
+                show(number, line, ":")
+                hits += 1
+                after = context_lines
+                continue
+            more = more or hit
+            if after:
+                # Matches past the limit still show as context of the last one kept
+                show(number, line, "-")
+                after -= 1
+            elif more:
+                break
+            elif hits < limit:
+                before.append((number, line))
+    return output, hits, more
+
+
+def search_files(working_directory, query, regex=False, case_sensitive=True, include=None, context_lines=0, max_results=None):
+    """
+    Search the files of the working directory for a literal string or a regex and return file:line matches. Much cheaper than reading files one by one.
+
+    Args:
+        working_directory (str): The base directory to work within
+        query (str): Text or regular expression to look for
+        regex (bool): Treat query as a Python regular expression
+        case_sensitive (bool): Match case exactly
+        include (list[str]): Optional glob patterns limiting which files are searched
+        context_lines (int): Lines of context to show around each match (0-5)
+        max_results (int): Maximum number of matching lines to return (default 50)
+
+    Returns:
+        str: Matches as "path:line: text" (context lines as "path-line- text") or an error message
+    """
+    if not query:
+        return "Error: query must not be empty"
+    working_dir_abs = os.path.normpath(os.path.abspath(working_directory))
+    if not os.path.isdir(working_dir_abs):
+        return f"Error: '{working_directory}' is not a valid directory"
+
+    flags = 0 if case_sensitive else re.IGNORECASE
+    try:
+        pattern = re.compile(query if regex else re.escape(query), flags)
+    except re.error as e:
+        return f"Error: Invalid regular expression '{query}': {str(e)}"
+
+    if isinstance(include, str):
+        include = include.split(",")
+    include = [p.strip() for p in include or [] if p and p.strip()]
+    context_lines = max(0, min(int(context_lines or 0), MAX_CONTEXT_LINES))
+    max_results = int(max_results) if max_results else DEFAULT_MAX_RESULTS
+
+    index = get_index(working_dir_abs)
+    index.refresh()
+    candidates = index.candidates(required_literals(query, regex, case_sensitive))
+
+    output = []
+    matches = 0
+    files_matched = 0
+    truncated = False
+    for rel_path in candidates:
+        if include and not any(fnmatch(rel_path, p) or fnmatch(os.path.basename(rel_path), p) for p in include):
+            continue
+        try:
+            lines, hits, more = _search_file(
+                os.path.join(working_dir_abs, rel_path), rel_path, pattern, context_lines, max_results - matches
+            )
+        except OSError:
+            continue
+        if hits:
+            files_matched += 1
+            output.extend(lines)
+            matches += hits
+        if more:
+            truncated = True
+            break
+
+    if not output:
+        return f"No matches for '{query}' ({len(candidates)} candidate files searched)"
+    summary = f"[{matches} matches in {files_matched} files"
+    summary += f"; stopped at max_results={max_results}]" if truncated else "]"
+    return "\n".join(output + [summary])
@@ -0,0 +1,238 @@
+import os
+import re
+import threading
+import time
+
+from . import disk_cache
+from .get_files_info import walk_files
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+INDEX_VERSION = 1
+
+# Files larger than this are not indexed and are always scanned directly
+MAX_INDEXED_BYTES = 1024 * 1024
+
+# Signature bits per distinct trigram; keeps false positives around 12% per trigram
+BITS_PER_TRIGRAM = 8
+MIN_SIGNATURE_BITS = 1024
+
+# Minimum seconds between full mtime scans of an index that is not known to be stale
+RESCAN_INTERVAL = 5.0
+
+
+def _trigrams(data):
+    """Distinct 3-byte substrings of `data` as 24-bit integers."""
+    return {(a << 16) | (b << 8) | c for a, b, c in zip(data, data[1:], data[2:])}
+
+
+def _bit(trigram, nbits):
+    return ((trigram * 0x9E3779B1) >> 8) & (nbits - 1)
+
+
+def _signature(trigrams):
+    """Pack a trigram set into a bitset sized to it. Returns (nbits, int)."""
+    nbits = MIN_SIGNATURE_BITS
+    while nbits < len(trigrams) * BITS_PER_TRIGRAM:
+        nbits <<= 1
+    bits = bytearray(nbits // 8)
+    for trigram in trigrams:
+        bit = _bit(trigram, nbits)
+        bits[bit >> 3] |= 1 << (bit & 7)
+    return nbits, int.from_bytes(bits, "little")
+
+
+def _read_indexable(path, size):
+    """Return the lowercased bytes to index, or None for large or binary files."""
+    if size > MAX_INDEXED_BYTES:
+        return None
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    if b"\0" in data[:8192]:
+        return None
+    return data.lower()
+
+
+class TrigramIndex:
+    """
+    Trigram signature index of the text files under one working directory.
+
+    Every indexed file stores a bitset (sized to the file) with one bit set
+    per distinct lowercased trigram it contains. A query only opens files
+    whose bitset has all the bits of the trigrams its literals require; a
+    bitset check is one integer AND, so a tree of 100k files is filtered in
+    milliseconds. Files are re-indexed when their mtime or size changes,
+    found either by `update_file` after a tool wrote them or by a periodic
+    scan of the tree, and the index is persisted to disk between runs.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.normpath(os.path.abspath(root))
+        self.path = disk_cache.cache_file("search", self.root)
+        # rel path -> (mtime_ns, size, nbits, signature); signature is None when not indexable
+        self.files = disk_cache.load(self.path, INDEX_VERSION) or {}
+        self.stale = True
+        self.last_scan = 0.0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _index_file(self, rel_path, stat):
+        data = _read_indexable(os.path.join(self.root, rel_path), stat.st_size)
+        nbits, signature = _signature(_trigrams(data)) if data is not None else (0, None)
+        self.files[rel_path] = (stat.st_mtime_ns, stat.st_size, nbits, signature)
+        self._dirty = True
+
+    def refresh(self, force=False):
+        """Re-index files whose mtime or size changed and forget deleted ones."""
+        with self._lock:
+            if not (force or self.stale or time.monotonic() - self.last_scan > RESCAN_INTERVAL):
+                return
+            seen = set()
+            for rel_path, stat in walk_files(self.root):
+                seen.add(rel_path)
+                entry = self.files.get(rel_path)
+                if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+                    self._index_file(rel_path, stat)
+            for rel_path in [p for p in self.files if p not in seen]:
+                del self.files[rel_path]
+                self._dirty = True
+            self.stale = False
+            self.last_scan = time.monotonic()
+            self._save()
+
+    def update_file(self, path):
+        """Re-index one file right after a tool changed it."""
+        abs_path = os.path.normpath(os.path.abspath(os.path.join(self.root, path)))
+        if not abs_path.startswith(self.root + os.sep):
+            return
+        rel_path = os.path.relpath(abs_path, self.root)
+        with self._lock:
+            try:
+                stat = os.stat(abs_path)
+            except OSError:
+                self.files.pop(rel_path, None)
+                self._dirty = True
+            else:
+                self._index_file(rel_path, stat)
+            self._save()
+
+    def _save(self):
+        if self._dirty:
+            disk_cache.save(self.path, INDEX_VERSION, self.files)
+            self._dirty = False
+
+    def candidates(self, required_literals):
+        """Sorted paths that may contain all of `required_literals` (lowercased bytes)."""
+        trigrams = set()
+        for literal in required_literals:
+            trigrams |= _trigrams(literal)
+        masks = {}
+        result = []
+        with self._lock:
+            for rel_path, (_, _, nbits, signature) in self.files.items():
+                # Files too large or binary to index can't be ruled out
+                if signature is not None and trigrams:
+                    mask = masks.get(nbits)
+                    if mask is None:
+                        mask = masks[nbits] = sum(1 << bit for bit in {_bit(t, nbits) for t in trigrams})
+                    if signature & mask != mask:
+                        continue
+                result.append(rel_path)
+        return sorted(result)
+
+
+# With re.IGNORECASE these also match characters outside ASCII (ı, İ, ſ and the
+# Kelvin sign), which the index, lowercased with bytes.lower(), cannot see
+_FOLDS_OUTSIDE_ASCII = re.compile(r"[^\x00-\x7f]|[iksIKS]")
+
+
+def _indexable_runs(literal, ignore_case):
+    """Parts of a literal the index can rule files out by; all of it unless case is ignored."""
+    if not ignore_case:
+        return [literal]
+    # bytes.lower() only folds ASCII, so case-insensitive literals are cut
+    # around every character that has a case partner outside ASCII
+    return _FOLDS_OUTSIDE_ASCII.split(literal)
+
+
+def _literal_runs(parsed, runs, ignore_case):
+    """Collect runs of literal characters every match of a parsed regex must contain."""
+    current = []
+
+    def flush():
+        if current:
+            runs.extend(_indexable_runs("".join(current), ignore_case))
+            current.clear()
+
+    for op, arg in parsed:
+        name = str(op)
+        if name == "LITERAL":
+            current.append(chr(arg))
+        elif name == "SUBPATTERN":
+            flush()
+            _, add_flags, del_flags, pattern = arg
+            # Scoped flags such as (?i:...) or (?-i:...)
+            group_ignore_case = (ignore_case or bool(add_flags & re.IGNORECASE)) and not del_flags & re.IGNORECASE
+            _literal_runs(pattern, runs, group_ignore_case)
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") and arg[0] >= 1:
+            flush()
+            _literal_runs(arg[2], runs, ignore_case)
+        else:
+            flush()
+    flush()
+    return runs
+
+
+def required_literals(query, regex, case_sensitive=True):
+    """Lowercased literals (3+ bytes) any matching line must contain."""
+    ignore_case = not case_sensitive
+    if not regex:
+        literals = _indexable_runs(query, ignore_case)
+    else:
+        try:
+            parsed = sre_parse.parse(query)
+            # Inline flags such as (?i) at the start of the pattern
+            ignore_case = ignore_case or bool(parsed.state.flags & re.IGNORECASE)
+            literals = _literal_runs(parsed, [], ignore_case)
+        except Exception:
+            literals = []
+    # bytes.lower() matches how file contents are lowercased for the index
+    encoded = [literal.encode("utf-8").lower() for literal in literals]
+    return [literal for literal in encoded if len(literal) >= 3]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(root):
+    key = os.path.normpath(os.path.abspath(root))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = TrigramIndex(key)
+        return index
+
+
+def notify_changed(working_directory, path=None):
+    """
+    Tell the index of `working_directory` that a tool modified files.
+
+    With a path, that file is re-indexed now; without one the next search
+    rescans the tree.
+    """
+    key = os.path.normpath(os.path.abspath(working_directory))
+    with _indexes_lock:
+        index = _indexes.get(key)
+    if index is None:
+        return
+    if path is None:
+        index.stale = True
+    else:
+        index.update_file(path)
@@ -1,145 +1,270 @@
 import os
 import sys
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
 
-from functions.get_files_info import schema_get_files_info
-from functions.get_file_content import schema_get_file_content
-from functions.run_python_file import schema_run_python_file
-from functions.write_file import schema_write_file
-from functions.call_function import call_function
+from agent.history import HistoryManager, DEFAULT_TOKEN_BUDGET
+from agent.tracing import Tracer
 
-load_dotenv()
-api_key = os.environ.get("GEMINI_API_KEY")
+# The SDK and the agent loop take most of a second to import, so they are only
+# imported inside main() once the arguments are known to be usable.
+
+
+def _flag_value(args, i, value):
+    """Return the value of a --flag=value or --flag value option and the next index."""
+    if value:
+        return value, i
+    if i < len(args):
+        return args[i], i + 1
+    print(f"Missing value for {args[i - 1]}")
+    sys.exit(1)
 
 
 def main():
-    if len(sys.argv) < 2 or sys.argv[1] is None:
+    args = sys.argv[1:]
+    user_prompt = None
+    verbose = False
+    parallel = False
+    stream = False
+    manifest = False
+    max_workers = None
+    batch_path = None
+    batch_output = None
+    concurrency = 4
+    keep_workspaces = False
+    history_budget = None
+    record_path = None
+    replay_path = None
+    trace_path = None
+    requests_per_minute = None
+    tokens_per_minute = None
+    max_retries = None
+    resume = None
+    session_log_enabled = True
+    serve = False
+    connect = False
+    socket_path = None
+    sessions = None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        i += 1
+        if not arg.startswith("--"):
+            if user_prompt is None:
+                user_prompt = arg
+            continue
+        name, _, value = arg[2:].partition("=")
+        match name:
+            case "verbose":
+                verbose = True
+            case "parallel":
+                # --parallel or --parallel=N to bound the worker pool
+                parallel = True
+                if value:
+                    max_workers = int(value)
+            case "stream":
+                # Print text as it is generated and start tools before the turn ends
+                stream = True
+            case "manifest":
+                # Describe the working directory up front instead of letting the model explore it
+                manifest = True
+            case "batch":
+                batch_path, i = _flag_value(args, i, value)
+            case "output":
+                batch_output, i = _flag_value(args, i, value)
+            case "keep-workspaces":
+                # Keep each batch session's copy of the calculator for inspection
+                keep_workspaces = True
+            case "concurrency":
+                concurrency, i = _flag_value(args, i, value)
+                concurrency = int(concurrency)
+            case "warm-python":
+                # --warm-python or --warm-python=N forked interpreters for run_python_file
+                from functions.run_python_file import enable_worker_pool
+
+                if not enable_worker_pool(int(value) if value else None):
+                    print("Warm Python workers are not supported here; using python3 per run")
+            case "history-budget":
+                # --history-budget or --history-budget=TOKENS to compact old tool output
+                history_budget = int(value) if value else DEFAULT_TOKEN_BUDGET
+            case "record":
+                # Save every model response so the session can be replayed offline
+                record_path, i = _flag_value(args, i, value)
+            case "replay":
+                # Serve model responses from a recording instead of the API
+                replay_path, i = _flag_value(args, i, value)
+            case "trace":
+                # Spans as JSON lines, or Chrome trace format for a .json file
+                trace_path, i = _flag_value(args, i, value)
+            case "rpm":
+                # Client-side quota, shared by every session of this process
+                requests_per_minute, i = _flag_value(args, i, value)
+                requests_per_minute = int(requests_per_minute)
+            case "tpm":
+                tokens_per_minute, i = _flag_value(args, i, value)
+                tokens_per_minute = int(tokens_per_minute)
+            case "max-retries":
+                max_retries, i = _flag_value(args, i, value)
+                max_retries = int(max_retries)
+            case "resume":
+                # Continue a session from its log: SESSION is an id, a path or "last"
+                resume, i = _flag_value(args, i, value)
+            case "no-session-log":
+                # Skip the crash log; the session cannot be resumed
+                session_log_enabled = False
+            case "serve":
+                # Run as a daemon serving sessions on a Unix socket
+                serve = True
+            case "connect":
+                # Run the prompt on a daemon started with --serve. --replay and --trace
+                # files must be under the directory the daemon was started in
+                connect = True
+            case "socket":
+                socket_path, i = _flag_value(args, i, value)
+            case "sessions":
+                sessions, i = _flag_value(args, i, value)
+                sessions = int(sessions)
+            case _:
+                pass
+
+    if batch_path is None and user_prompt is None and resume is None and not serve:
         print("Prompt value not found!")
         sys.exit(1)
 
-    user_prompt = sys.argv[1]
-    verbose = False
-    for arg in sys.argv:
-        if arg.startswith("--"):
-            match arg[2:]:
-                case "verbose":
-                    verbose = True
-                case _:
-                    pass
-    client = genai.Client(api_key=api_key)
-
-    available_functions = types.Tool(
-        function_declarations=[
-            schema_get_files_info,
-            schema_get_file_content,
-            schema_run_python_file,
-            schema_write_file
-        ]
-    )
-
+    if connect:
+        from agent.client import run_remote
 
-    messages = [types.Content(role="user", parts=[types.Part(text=user_prompt)])]
+        # Model options (--record, --rpm, ...) belong to the daemon's own command line
+        request = {
+            "prompt": user_prompt,
+            "verbose": verbose,
+            "parallel": parallel,
+            "max_workers": max_workers,
+            "history_budget": history_budget,
+            "stream": stream,
+            "manifest": manifest,
+            # Relative to this directory (sent as "cwd"); both must be under the daemon's directory
+            "trace": trace_path,
+            "replay": replay_path,
+        }
+        sys.exit(run_remote(request, socket_path))
 
-    system_prompt = """
-    You are a helpful AI coding agent.
+    if resume is not None:
+        from agent.session_log import SessionLog
 
-    When a user asks a question or makes a request, make a function call plan and use the available tools to accomplish the task end-to-end:
+        try:
+            session_log = SessionLog.resume(resume)
+        except (OSError, ValueError) as e:
+            print(f"Error: Cannot resume session: {e}")
+            sys.exit(1)
+        if session_log.done:
+            print(f"Session {session_log.session_id} already finished:")
+            print("".join(part.text or "" for part in session_log.messages[-1].parts))
+            return
+        user_prompt = session_log.prompt
 
-    - List files and directories (get_files_info)
-    - Read file contents (get_file_content)
-    - Write or modify files (write_file)
-    - Run a Python file with optional args (run_python_file)
+    from agent.backends import LazyBackend, LiveBackend, RecordingBackend, ReplayBackend
 
-    For bug fixes or changes:
-    1) Reproduce the issue (e.g., run a file or tests),
-    2) Propose a minimal code change,
-    3) Apply the change by writing the file,
-    4) Re-run to verify the fix,
-    5) Summarize what changed and the result.
+    def live_backend():
+        from dotenv import load_dotenv
+        from google import genai
+        from agent.scheduler import RateLimiter, SchedulingBackend, DEFAULT_MAX_RETRIES
 
-    All paths you provide should be relative to the working directory. You do not need to specify the working directory in your function calls as it is automatically injected for security reasons.
-    """
+        load_dotenv()
+        backend = SchedulingBackend(
+            LiveBackend(genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))),
+            RateLimiter(requests_per_minute, tokens_per_minute),
+            max_retries=DEFAULT_MAX_RETRIES if max_retries is None else max_retries,
+        )
+        if record_path is not None:
+            backend = RecordingBackend(backend, record_path)
+        return backend
 
-    model = "gemini-2.0-flash-001"
+    if replay_path is not None:
+        backend = ReplayBackend(replay_path)
+    elif serve:
+        # Built on the first request that is not a replay
+        backend = LazyBackend(live_backend)
+    else:
+        backend = live_backend()
 
-    # Iteratively call the model, append candidates, run tools, append tool responses
-    max_iterations = 20
-    step = 0
-    response = None
+    if serve:
+        from agent.daemon import AgentDaemon, DEFAULT_SESSIONS
 
-    while step < max_iterations:
-        step += 1
+        daemon = AgentDaemon(backend, socket_path, sessions or DEFAULT_SESSIONS)
+        print(f"Serving agent sessions on {daemon.socket_path}")
+        print(f"Replay and trace files of clients must be under {daemon.root}")
         try:
-            response = client.models.generate_content(
-                model=model,
-                contents=messages,  # Always pass the full conversation so the model continues from current state
-                config=types.GenerateContentConfig(
-                    tools=[available_functions],
-                    system_instruction=system_prompt,
-                ),
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    tracer = Tracer()
+
+    if batch_path is not None:
+        import asyncio
+        from agent.async_loop import run_batch
+
+        if batch_output is None:
+            batch_output = os.path.splitext(batch_path)[0] + ".results.jsonl"
+        asyncio.run(
+            run_batch(
+                backend,
+                batch_path,
+                batch_output,
+                concurrency=concurrency,
+                verbose=verbose,
+                history_budget=history_budget,
+                tracer=tracer,
+                manifest=manifest,
+                keep_workspaces=keep_workspaces,
             )
+        )
+        if trace_path is not None:
+            tracer.write(trace_path)
+        return
 
-            # Add each candidate's content to the conversation history
-            candidates = getattr(response, "candidates", None) or []
-            for cand in candidates:
-                content = getattr(cand, "content", None)
-                if content is not None:
-                    messages.append(content)
-
-            # Execute any function calls and append tool responses
-            function_calls = getattr(response, "function_calls", None) or []
-            if len(function_calls) > 0:
-                for function_call_part in function_calls:
-                    function_call_result = call_function(function_call_part, verbose=verbose)
-
-                    # Validate structure
-                    try:
-                        if not function_call_result.parts or not getattr(
-                            function_call_result.parts[0], "function_response", None
-                        ):
-                            raise RuntimeError(
-                                "Invalid tool response structure: missing function_response part"
-                            )
-                    except Exception:
-                        # Print and stop if tool response is malformed
-                        print(
-                            "Error: Invalid tool response structure: missing function_response part",
-                            file=sys.stderr,
-                        )
-                        break
-
-                    if verbose:
-                        print(
-                            f"-> {function_call_result.parts[0].function_response.response}"
-                        )
-
-                    # Append tool response message back into the conversation
-                    messages.append(function_call_result)
-
-                # Continue loop to let the model consume the tool outputs
-                continue
-
-            # If the model returned final text and there are no tool calls, we're done
-            if getattr(response, "text", None):
-                print(response.text)
-                break
-
-            # Neither final text nor tool calls: iterate again until max iterations
-            continue
+    from agent.loop import run_session, session_summary
+    from functions.call_function import WORKING_DIRECTORY
+    from functions.dispatch import DEFAULT_MAX_WORKERS
 
-        except Exception as e:
-            print(f"Error during generate_content at step {step}: {e}", file=sys.stderr)
-            break
+    if resume is not None:
+        working_directory = session_log.working_directory
+    else:
+        working_directory = os.path.abspath(WORKING_DIRECTORY)
+        session_log = None
+        if session_log_enabled:
+            from agent.session_log import SessionLog
+
+            session_log = SessionLog.create(user_prompt, working_directory)
+    if verbose and session_log is not None:
+        print(f"Session log: {session_log.path}")
+
+    history = HistoryManager(history_budget) if history_budget is not None else None
+    response, _ = run_session(
+        backend,
+        user_prompt,
+        working_directory=working_directory,
+        verbose=verbose,
+        parallel=parallel,
+        max_workers=max_workers or DEFAULT_MAX_WORKERS,
+        history=history,
+        tracer=tracer,
+        stream=stream,
+        manifest=manifest,
+        session_log=session_log,
+    )
+    if trace_path is not None:
+        tracer.write(trace_path)
+    if session_log is not None and not session_log.done:
+        print(
+            f"Session {session_log.session_id} stopped after step {session_log.step}; "
+            f"continue it with --resume {session_log.session_id}",
+            file=sys.stderr,
+        )
 
     if verbose and response is not None:
-        print(f"User prompt: {user_prompt} ")
-        if getattr(response, "usage_metadata", None):
-            print(f"Prompt tokens: {response.usage_metadata.prompt_token_count}")
-            print(
-                f"Response tokens: {response.usage_metadata.candidates_token_count}"
-            )
+        print(session_summary(user_prompt, tracer, history))
 
 
-main()
+if __name__ == "__main__":
+    main()
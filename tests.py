@@ -2,12 +2,71 @@
 
 import sys
 import os
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # Add the calculator directory to the Python path so we can import the function
 sys.path.append(os.path.join(os.path.dirname(__file__), 'calculator'))
 
 from functions.write_file import write_file
 from functions.run_python_file import run_python_file
+from functions.get_file_content import get_file_content
+from functions.get_files_info import get_files_info
+from functions.edit_file import edit_file
+from functions.search_files import search_files
+from functions.read_files import read_files
+from functions.run_tests import run_tests
+from functions.manifest import WorkspaceManifest
+from functions.declarations import declaration
+from agent.scheduler import RateLimiter, SchedulingBackend
+from agent.streaming import StreamAssembler, split_response
+
+
+def fake_model_server(responses):
+    """
+    Serve generateContent on localhost, answering POSTs with (status, headers, body)
+    from `responses` in order and a plain text reply once they run out.
+    """
+    responses = list(responses)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                status, headers, body = responses.pop(0) if responses else (200, {}, None)
+            if body is None:
+                body = {
+                    "candidates": [{"content": {"role": "model", "parts": [{"text": "done"}]}}],
+                    "usageMetadata": {"promptTokenCount": 3, "candidatesTokenCount": 1, "totalTokenCount": 4},
+                }
+            self.send_response(status)
+            for name, value in {"Content-Type": "application/json", **headers}.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(json.dumps(body).encode("utf-8"))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fake_model_backend(server, limiter=None):
+    from google import genai
+    from google.genai import types
+    from agent.backends import LiveBackend
+
+    client = genai.Client(
+        api_key="test",
+        http_options=types.HttpOptions(base_url=f"http://127.0.0.1:{server.server_port}"),
+    )
+    return SchedulingBackend(LiveBackend(client), limiter, base_delay=0.01)
+
 
 def main():
     print("Testing write_file function:")
@@ -48,5 +107,793 @@ def main():
     print('\nTest 5: calculator/nonexistent.py (should error)')
     print(run_python_file("calculator", "nonexistent.py"))
 
+    print("\nTesting get_file_content ranges:")
+    print("=" * 60)
+
+    print('Test 1: get_file_content("calculator", "main.py", start_line=1, end_line=3)')
+    print(get_file_content("calculator", "main.py", start_line=1, end_line=3))
+
+    print('\nTest 2: get_file_content("calculator", "main.py", offset=0, length=10)')
+    print(get_file_content("calculator", "main.py", offset=0, length=10))
+
+    print('\nTest 3: get_file_content("calculator", "main.py", start_line=1000) (past the end)')
+    print(get_file_content("calculator", "main.py", start_line=1000))
+
+    print('\nTest 4: get_file_content("calculator", "main.py", offset=-5) (should error)')
+    print(get_file_content("calculator", "main.py", offset=-5))
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="ranged-read-test-") as large_dir:
+        with open(os.path.join(large_dir, "large.txt"), "w", encoding="utf-8") as file:
+            file.writelines(f"line {n}\n" for n in range(1, 200_001))
+        size = os.path.getsize(os.path.join(large_dir, "large.txt"))
+        print('\nTest 5: lines 150000-150002 of a 200000 line file')
+        print(get_file_content(large_dir, "large.txt", start_line=150000, end_line=150002))
+        print(f'Test 6: the last 12 bytes: {get_file_content(large_dir, "large.txt", offset=size - 12, length=100)!r}')
+        whole = get_file_content(large_dir, "large.txt", start_line=1)
+        print(f"Test 7: a range past the limit is cut: {len(whole)} characters, marked: {whole.endswith('characters]')}")
+
+    print("\nTesting get_files_info recursive listing:")
+    print("=" * 60)
+
+    print('Test 1: get_files_info("calculator", ".", recursive=True, include=["*.py"])')
+    print(get_files_info("calculator", ".", recursive=True, include=["*.py"]))
+
+    print('\nTest 2: get_files_info("calculator", ".", recursive=True, limit=2)')
+    print(get_files_info("calculator", ".", recursive=True, limit=2))
+
+    print("\nTesting edit_file function:")
+    print("=" * 60)
+
+    print('Test 1: edit_file("calculator", "pkg/morelorem.txt", edits=[{"search": "dolor", "replace": "DOLOR"}])')
+    print(edit_file("calculator", "pkg/morelorem.txt", edits=[{"search": "dolor", "replace": "DOLOR"}]))
+
+    print('\nTest 2: edit_file("calculator", "pkg/morelorem.txt", patch=...) (undo Test 1)')
+    patch = "@@ -1 +1 @@\n-lorem ipsum DOLOR sit amet\n\\ No newline at end of file\n+lorem ipsum dolor sit amet\n\\ No newline at end of file\n"
+    print(edit_file("calculator", "pkg/morelorem.txt", patch=patch))
+
+    print('\nTest 3: edit_file("calculator", "pkg/morelorem.txt", edits=[{"search": "missing", "replace": "x"}]) (should error)')
+    print(edit_file("calculator", "pkg/morelorem.txt", edits=[{"search": "missing", "replace": "x"}]))
+
+    print('\nTest 4: edit_file("calculator", "../main.py", edits=[...]) (should error)')
+    print(edit_file("calculator", "../main.py", edits=[{"search": "import", "replace": "x"}]))
+
+    print("\nTesting search_files function:")
+    print("=" * 60)
+
+    print('Test 1: search_files("calculator", "def render")')
+    print(search_files("calculator", "def render"))
+
+    print('\nTest 2: search_files("calculator", r"def _\\w+", regex=True, include=["*.py"])')
+    print(search_files("calculator", r"def _\w+", regex=True, include=["*.py"]))
+
+    print('\nTest 3: search_files("calculator", "no such text anywhere")')
+    print(search_files("calculator", "no such text anywhere"))
+
+    with tempfile.TemporaryDirectory(prefix="search-test-") as search_dir:
+        with open(os.path.join(search_dir, "notes.txt"), "w", encoding="utf-8") as file:
+            file.write("ÄPFEL UND BIRNEN\n21 \u212aELVIN\n")
+        with open(os.path.join(search_dir, "large.log"), "w", encoding="utf-8") as file:
+            file.writelines(f"entry {n}\n" if n % 50_000 else f"checkpoint {n}\n" for n in range(1, 200_001))
+        print('\nTest 4: search_files(..., "äpfel und", case_sensitive=False) (non-ASCII letters in another case)')
+        print(search_files(search_dir, "äpfel und", case_sensitive=False))
+        print('\nTest 5: search_files(..., "(?i)kelvin", regex=True) (the Kelvin sign matches k)')
+        print(search_files(search_dir, "(?i)kelvin", regex=True))
+        print('\nTest 6: search_files(..., "checkpoint", context_lines=1, max_results=3) in a file too large to index')
+        print(search_files(search_dir, "checkpoint", context_lines=1, max_results=3))
+
+    print("\nTesting read_files function:")
+    print("=" * 60)
+
+    print('Test 1: read_files("calculator", ["main.py", {"file_path": "pkg/render.py", "start_line": 1, "end_line": 3}])')
+    result = read_files("calculator", ["main.py", {"file_path": "pkg/render.py", "start_line": 1, "end_line": 3}])
+    for entry in result["files"]:
+        print(f'{entry["file_path"]}: {len(entry["content"])} characters, starts {entry["content"][:30]!r}')
+
+    print('\nTest 2: read_files("calculator", ["lorem.txt", "pkg/morelorem.txt", "pkg/calculator.py", "../main.py", "missing.py"])')
+    result = read_files("calculator", ["lorem.txt", "pkg/morelorem.txt", "pkg/calculator.py", "../main.py", "missing.py"])
+    for entry in result["files"]:
+        if "error" in entry:
+            print(f'{entry["file_path"]}: {entry["error"]}')
+        else:
+            print(f'{entry["file_path"]}: {len(entry["content"])} characters')
+
+    print('\nTest 3: read_files("calculator", [])')
+    print(read_files("calculator", []))
+
+    with tempfile.TemporaryDirectory(prefix="read-files-test-") as read_dir:
+        with open(os.path.join(read_dir, "notes.txt"), "w", encoding="utf-8") as file:
+            file.write("Error: this line is file content, not a failure\n")
+        with open(os.path.join(read_dir, "big.txt"), "w", encoding="utf-8") as file:
+            file.write("x" * 25000)
+        result = read_files(read_dir, ["notes.txt", "big.txt"])
+        notes, big = result["files"]
+        print(f'\nTest 4: a file starting with "Error:" is content: {"content" in notes and "error" not in notes}')
+        print(f"Test 5: a lone large file gets the combined budget, not the 10000 character cap: {len(big['content'])} characters")
+
+    print("\nTesting workspace manifest:")
+    print("=" * 60)
+
+    import shutil
+    import tempfile
+
+    workspace = tempfile.mkdtemp(prefix="manifest-test-")
+    shutil.copytree("calculator", workspace, dirs_exist_ok=True)
+    manifest = WorkspaceManifest(workspace)
+    manifest.refresh()
+    print(f"Test 1: first build scanned {manifest.rescanned} files")
+    print("\n".join(line for line in manifest.render().splitlines() if line.startswith("pkg/")))
+
+    with open(os.path.join(workspace, "pkg", "extra.py"), "w") as file:
+        file.write("LIMIT = 3\n\nclass Extra:\n    pass\n\ndef helper():\n    pass\n")
+    manifest = WorkspaceManifest(workspace)
+    manifest.refresh()
+    print(f"\nTest 2: after adding pkg/extra.py, rebuilt from the disk cache rescanning {manifest.rescanned} file(s)")
+    print([line for line in manifest.render().splitlines() if "extra.py" in line][0].split(": ")[1])
+
+    with open(os.path.join(workspace, "broken.py"), "w") as file:
+        file.write("def broken(:\n")
+    with open(os.path.join(workspace, "generated.py"), "w") as file:
+        file.write("VALUES = [\n" + "    0,\n" * 200_000 + "]\n")
+    manifest.refresh()
+    print("\nTest 3: files without symbols say why")
+    print("\n".join(line.split(" ", 1)[0] + line.rpartition(":")[2] for line in manifest.render().splitlines() if line.startswith(("broken", "generated"))))
+    shutil.rmtree(workspace)
+
+    print("\nTesting run_tests impacted-test selection:")
+    print("=" * 60)
+
+    import contextlib
+    import io
+    from google.genai import types
+    from functions.call_function import call_function
+    from functions.import_graph import ImportGraph
+
+    def summary(result):
+        # Drop the timing and tracebacks so the output is stable
+        selection, counts, *details = result.splitlines()
+        failed = [line for line in details if line.startswith(("FAIL:", "ERROR:"))]
+        return "\n".join([selection, counts.split(" in ")[0]] + failed)
+
+    workspace = tempfile.mkdtemp(prefix="run-tests-test-")
+    shutil.copytree("calculator", workspace, dirs_exist_ok=True)
+    graph = ImportGraph(workspace)
+    graph.refresh()
+    print(f"Test 1: parsed {graph.rescanned} Python files")
+    for changed in ("pkg/render.py", "pkg/bulk.py", "main.py"):
+        selected = graph.impacted_tests({changed})
+        print(f"{changed}: {sorted({test.split('.')[0] for tests in selected.values() for test in tests})}")
+
+    print('\nTest 2: run_tests(workspace, files=["pkg/render.py"])')
+    print(summary(run_tests(workspace, files=["pkg/render.py"])))
+
+    print("\nTest 3: a write_file call that breaks pkg/bulk.py, then run_tests with no arguments")
+    with open(os.path.join(workspace, "pkg", "bulk.py")) as file:
+        source = file.read()
+    broken = source.replace("return results", "return results[:1]")
+    with contextlib.redirect_stdout(io.StringIO()):
+        call_function(
+            types.FunctionCall(name="write_file", args={"file_path": "pkg/bulk.py", "content": broken}),
+            working_directory=workspace,
+        )
+        response = call_function(types.FunctionCall(name="run_tests", args={}), working_directory=workspace)
+    print(summary(response.parts[0].function_response.response["result"]))
+
+    print("\nTest 4: the recorded change was consumed, so the next call runs every test")
+    write_file(workspace, "pkg/bulk.py", source)
+    print(summary(run_tests(workspace)))
+
+    from functions.import_graph import notify_changed, recorded_changes, take_changes
+
+    print("\nTest 5: a call that errors leaves the recorded changes for the next one")
+    notify_changed(workspace, "pkg/render.py")
+    print(run_tests(workspace, files=["../outside.py"]))
+    print(f"still recorded: {sorted(recorded_changes(workspace))}")
+    seen = recorded_changes(workspace)
+    notify_changed(workspace, "pkg/bulk.py")
+    print(f"taking what was seen keeps a later change: {sorted(take_changes(workspace, seen))} taken, {sorted(recorded_changes(workspace))} kept")
+    print(summary(run_tests(workspace)))
+    print(f"recorded after a successful call: {sorted(recorded_changes(workspace))}")
+    shutil.rmtree(workspace)
+
+    print("\nTesting the agent daemon:")
+    print("=" * 60)
+
+    from agent.client import run_remote
+    from agent.daemon import AgentDaemon
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="agent-daemon-test-"), "agent.sock")
+    daemon = AgentDaemon(None, socket_path, sessions=2)
+    ready = threading.Event()
+    server = threading.Thread(target=daemon.serve_forever, kwargs={"ready": ready}, daemon=True)
+    server.start()
+    ready.wait(10)
+    replay = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "sessions", "large_reads.jsonl")
+    outputs = [io.StringIO(), io.StringIO()]
+    statuses = [None, None]
+    steps = [[], []]
+
+    def client(n):
+        statuses[n] = run_remote(
+            {"prompt": "Summarize the lorem files.", "replay": replay, "parallel": n == 1},
+            socket_path,
+            on_event=lambda event: steps[n].append(event["step"]),
+        )
+
+    # Both clients print through this process's stdout; collect each one's lines separately
+    with contextlib.redirect_stdout(io.StringIO()) as captured:
+        clients = [threading.Thread(target=client, args=(n,)) for n in range(2)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+    lines = captured.getvalue().splitlines()
+    print(f"Test 1: two concurrent sessions, statuses {statuses}, steps {steps}")
+    print(f"final answers: {lines.count('Both files are placeholder lorem ipsum text.')}, tool calls: {sum(line.startswith(' - Calling') for line in lines)}")
+
+    print("\nTest 2: a session without a backend fails cleanly")
+    with contextlib.redirect_stderr(io.StringIO()) as errors:
+        status = run_remote({"prompt": "hello"}, socket_path)
+    print(f"status {status}: {errors.getvalue().strip()}")
+
+    print("\nTest 3: replay and trace files outside the daemon's working directory are refused")
+    outside = os.path.join(tempfile.gettempdir(), "agent-daemon-trace.jsonl")
+    for request in ({"prompt": "hello", "replay": "/etc/hostname"}, {"prompt": "hello", "replay": replay, "trace": outside}):
+        with contextlib.redirect_stderr(io.StringIO()) as errors, contextlib.redirect_stdout(io.StringIO()):
+            status = run_remote(request, socket_path)
+        print(f"status {status}: {errors.getvalue().strip().replace(daemon.root, '<root>')}")
+    print(f"trace written: {os.path.exists(outside)}")
+
+    client_dir = tempfile.mkdtemp(prefix="client-cwd-", dir=daemon.root)
+    request = {
+        "prompt": "Summarize the lorem files.",
+        "replay": os.path.relpath(replay, client_dir),
+        "trace": "trace.jsonl",
+        "cwd": client_dir,
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        status = run_remote(request, socket_path)
+    print(f"relative paths are taken from the client's cwd: status {status}, trace written there: {os.path.exists(os.path.join(client_dir, 'trace.jsonl'))}")
+    shutil.rmtree(client_dir)
+
+    daemon.shutdown()
+    server.join(10)
+    print(f"\nTest 4: after shutdown the socket is removed: {not os.path.exists(socket_path)}")
+
+    from agent.backends import LazyBackend
+
+    built = []
+    daemon = AgentDaemon(LazyBackend(lambda: built.append(1)), socket_path, sessions=1)
+    ready = threading.Event()
+    server = threading.Thread(target=daemon.serve_forever, kwargs={"ready": ready}, daemon=True)
+    server.start()
+    ready.wait(10)
+    with contextlib.redirect_stdout(io.StringIO()):
+        status = run_remote({"prompt": "Summarize the lorem files.", "replay": replay}, socket_path)
+    daemon.shutdown()
+    server.join(10)
+    print(f"Test 5: a replay on a daemon with a lazy live backend: status {status}, backend built: {bool(built)}")
+
+    print("\nTesting resumable session logs:")
+    print("=" * 60)
+
+    from agent.backends import ReplayBackend
+    from agent.loop import run_session
+    from agent.session_log import SessionLog
+
+    class CrashingBackend(ReplayBackend):
+        """Replay a recording but fail on one call, like a process dying mid-session."""
+
+        crash_at = None
+
+        def generate_content(self, model, contents, config):
+            if self.step + 1 == self.crash_at:
+                self.crash_at = None
+                raise RuntimeError("simulated crash")
+            return super().generate_content(model, contents, config)
+
+    sessions_dir = tempfile.mkdtemp(prefix="session-log-test-")
+    workspace = tempfile.mkdtemp(prefix="session-log-workspace-")
+    shutil.copytree("calculator", workspace, dirs_exist_ok=True)
+    backend = CrashingBackend(replay.replace("large_reads", "explore"))
+    backend.crash_at = 3
+    log = SessionLog.create("What does the calculator project contain?", workspace, sessions_dir)
+    with contextlib.redirect_stdout(io.StringIO()) as first_run, contextlib.redirect_stderr(io.StringIO()):
+        run_session(backend, log.prompt, working_directory=workspace, session_log=log)
+    print(f"Test 1: crashed at step 3; log has {log.step} completed steps, done={log.done}")
+    print(f"tool calls before the crash: {first_run.getvalue().count('Calling function')}")
+
+    resumed = SessionLog.resume(log.session_id, sessions_dir)
+    print(f"\nTest 2: resumed with {len(resumed.messages)} messages from step {resumed.step}")
+    with contextlib.redirect_stdout(io.StringIO()) as second_run:
+        _, messages = run_session(backend, resumed.prompt, working_directory=workspace, session_log=resumed)
+    print(f"tool calls after resuming: {second_run.getvalue().count('Calling function')}, finished: {resumed.done}")
+    print(f"final answer: {second_run.getvalue().splitlines()[-1]}")
+    print(f"history matches the log: {SessionLog.resume('last', sessions_dir).messages == messages}")
+
+    with open(resumed.path, "a", encoding="utf-8") as file:
+        file.write('{"step": 9, "contents": [')
+    print(f"\nTest 3: a torn last line is dropped: step {SessionLog.resume(resumed.path).step}")
+
+    import glob
+    from unittest import mock
+    from agent import session_log as session_log_module
+
+    def session_files():
+        return sorted(os.path.basename(path) for path in glob.glob(os.path.join(sessions_dir, "*.jsonl")))
+
+    for n in range(4):
+        path = os.path.join(sessions_dir, f"old-{n}.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("{}\n")
+        # old-0 is past the age limit, the others are minutes old
+        age = session_log_module.MAX_AGE + 60 if n == 0 else 60 * (10 - n)
+        os.utime(path, (os.path.getmtime(path) - age,) * 2)
+    with mock.patch.object(session_log_module, "MAX_SESSIONS", 10):
+        newest = SessionLog.create("Another prompt", workspace, sessions_dir)
+    print(f"\nTest 4: creating a log expires old ones: {session_files()}")
+    print(f"new log kept: {os.path.basename(newest.path) in session_files()}")
+    session_log_module.prune(sessions_dir, keep=2)
+    print(f"Test 5: pruning keeps the newest logs: {len(session_files())} left, "
+          f"new log kept: {os.path.basename(newest.path) in session_files()}")
+    shutil.rmtree(sessions_dir)
+    shutil.rmtree(workspace)
+
+    print("\nTesting concurrent tool dispatch:")
+    print("=" * 60)
+
+    import time
+    from functions import dispatch
+
+    timeline = {}
+
+    def slow_call(function_call_part, verbose=False, working_directory=None, tracer=None):
+        # Stands in for call_function: each call takes 0.2s and records when it ran
+        key = f"{function_call_part.name}({function_call_part.args.get('file_path')})"
+        started = time.monotonic()
+        time.sleep(0.2)
+        timeline[key] = (started, time.monotonic())
+        return key
+
+    calls = [
+        types.FunctionCall(name="write_file", args={"file_path": "a.txt", "content": "x"}),
+        types.FunctionCall(name="get_file_content", args={"file_path": "a.txt"}),
+        types.FunctionCall(name="get_file_content", args={"file_path": "b.txt"}),
+        types.FunctionCall(name="read_files", args={"files": ["b.txt"]}),
+    ]
+    dispatch.call_function = slow_call
+    try:
+        results = dispatch.call_functions(calls, max_workers=4)
+    finally:
+        dispatch.call_function = call_function
+    write, read_a, read_b, read_all = (timeline[key] for key in results)
+    print(f"Test 1: results in call order: {results}")
+    print(f"read of a.txt waits for the write to it: {read_a[0] >= write[1]}")
+    print(f"read of b.txt runs alongside the write: {read_b[0] < write[1]}")
+    print(f"read_files covers every path, so it waits for the write: {read_all[0] >= write[1]}")
+
+    root = os.path.abspath("calculator")
+    calls = [
+        types.FunctionCall(name="write_file", args={"file_path": os.path.join(root, "pkg", "render.py"), "content": "x"}),
+        types.FunctionCall(name="get_file_content", args={"file_path": "pkg/./render.py"}),
+        types.FunctionCall(name="get_file_content", args={"file_path": "main.py"}),
+    ]
+    timeline.clear()
+    dispatch.call_function = slow_call
+    try:
+        results = dispatch.call_functions(calls, max_workers=4, working_directory="calculator")
+    finally:
+        dispatch.call_function = call_function
+    write, read_same, read_other = (timeline[key] for key in results)
+    print(f"an absolute and a relative path to one file are ordered: {read_same[0] >= write[1]}, other files are not: {read_other[0] < write[1]}")
+
+    workspace = tempfile.mkdtemp(prefix="dispatch-test-")
+    with contextlib.redirect_stdout(io.StringIO()):
+        responses = dispatch.call_functions(
+            [
+                types.FunctionCall(name="write_file", args={"file_path": "notes.txt", "content": "first"}),
+                types.FunctionCall(name="get_file_content", args={"file_path": "notes.txt"}),
+                types.FunctionCall(name="write_file", args={"file_path": "notes.txt", "content": "second"}),
+                types.FunctionCall(name="get_file_content", args={"file_path": "notes.txt"}),
+            ],
+            working_directory=workspace,
+        )
+    reads = [response.parts[0].function_response.response["result"] for response in responses[1::2]]
+    print(f"\nTest 2: interleaved writes and reads of one file with real tools see {reads}")
+    shutil.rmtree(workspace)
+
+    print("\nTesting history compaction:")
+    print("=" * 60)
+
+    from agent.history import HistoryManager, estimate_tokens
+
+    def exchange(n):
+        call = types.Content(role="model", parts=[types.Part.from_function_call(name="get_file_content", args={"file_path": f"f{n}.txt"})])
+        response = types.Content(role="tool", parts=[types.Part.from_function_response(name="get_file_content", response={"result": str(n % 10) * 4000})])
+        return [call, response]
+
+    prompt = types.Content(role="user", parts=[types.Part(text="Summarize every file.")])
+    messages = [prompt] + [content for n in range(6) for content in exchange(n)]
+    before = sum(estimate_tokens(content) for content in messages)
+    history = HistoryManager(token_budget=2000)
+    history.compact(messages)
+    after = sum(estimate_tokens(content) for content in messages)
+    print(f"Test 1: {before} estimated tokens compacted to {after} under a budget of 2000: {after <= 2000}")
+    print(f"first user turn kept as is: {messages[0] is prompt}")
+    print(f"latest tool output kept in full: {messages[-1].parts[0].function_response.response['result'] == '5' * 4000}")
+    print(f"tokens_saved equals what was removed: {history.tokens_saved == before - after}")
+
+    history.compact(messages)
+    print(f"\nTest 2: a second request saves the same tokens again: {history.tokens_saved == 2 * (before - after)}")
+
+    messages = [prompt] + [content for n in range(40) for content in exchange(n)]
+    history = HistoryManager(token_budget=1500)
+    history.compact(messages)
+    after = sum(estimate_tokens(content) for content in messages)
+    print(f"\nTest 3: when stubs are not enough, old exchanges are dropped: {len(messages)} messages, {after} tokens, under budget: {after <= 1500}")
+    print(f"starts with the prompt and a model turn: {messages[0] is prompt and messages[1].role == 'model'}")
+
+    print("\nTesting the tool result cache:")
+    print("=" * 60)
+
+    from functions.call_function import result_cache
+    from functions.result_cache import ResultCache
+
+    workspace = tempfile.mkdtemp(prefix="result-cache-test-")
+    for name in ("a.txt", "b.txt", "c.txt"):
+        write_file(workspace, name, name)
+    cache = ResultCache(max_entries=2)
+    keys = {name: cache.key("get_file_content", {"working_directory": workspace, "file_path": name}) for name in ("a.txt", "b.txt", "c.txt")}
+    cache.put(keys["a.txt"], "a")
+    cache.put(keys["b.txt"], "b")
+    cache.get(keys["a.txt"])
+    cache.put(keys["c.txt"], "c")
+    print(f"Test 1: LRU eviction keeps the recently used entry: a={cache.get(keys['a.txt'])[0]}, b={cache.get(keys['b.txt'])[0]}, c={cache.get(keys['c.txt'])[0]}")
+
+    time.sleep(0.01)
+    with open(os.path.join(workspace, "a.txt"), "w") as file:
+        file.write("changed outside the tools")
+    print(f"Test 2: a file changed outside the tools is a miss: {cache.get(keys['a.txt']) == (False, None)}")
+
+    def tool(name, **args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = call_function(types.FunctionCall(name=name, args=args), working_directory=workspace)
+        return response.parts[0].function_response.response["result"]
+
+    result_cache.clear()
+    hits = result_cache.hits
+    tool("get_file_content", file_path="b.txt")
+    tool("get_files_info", directory=".")
+    tool("get_file_content", file_path="b.txt")
+    print(f"\nTest 3: repeated read served from the cache: {result_cache.hits - hits == 1}")
+    tool("edit_file", file_path="b.txt", edits=[{"search": "b.txt", "replace": "edited"}])
+    print(f"after edit_file the read sees: {tool('get_file_content', file_path='b.txt')!r}")
+    tool("write_file", file_path="b.txt", content="written again")
+    print(f"after write_file the read sees: {tool('get_file_content', file_path='b.txt')!r}")
+
+    listing = tool("get_files_info", directory=".")
+    with open(os.path.join(workspace, "c.txt"), "a") as file:
+        file.write("grown")
+    print(f"\nTest 4: a cached listing of {listing.count('- ')} files is revalidated when one grows")
+    print(f"listing sees the grown file: {'c.txt: file_size=10' in tool('get_files_info', directory='.')}")
+    print(f"recursive listings are not cached: {result_cache.key('get_files_info', {'working_directory': workspace, 'recursive': True}) is None}")
+
+    cache = ResultCache(max_bytes=10)
+    cache.put(keys["b.txt"], "é" * 6)
+    print(f"\nTest 5: the byte budget counts UTF-8 bytes: 6 characters of 12 bytes cached: {cache.get(keys['b.txt'])[0]}")
+
+    cache = ResultCache()
+    seen = cache.validator(keys["b.txt"])
+    stale = get_file_content(workspace, "b.txt")
+    time.sleep(0.01)
+    write_file(workspace, "b.txt", "written while the read was running")
+    cache.invalidate(workspace, "b.txt")
+    cache.put(keys["b.txt"], stale, seen)
+    print(f"Test 6: a result read before a concurrent write is not stored: {cache.get(keys['b.txt']) == (False, None)}")
+    shutil.rmtree(workspace)
+
+    print("\nTesting the warm Python worker pool:")
+    print("=" * 60)
+
+    from functions.python_worker_pool import PythonWorkerPool
+
+    workspace = tempfile.mkdtemp(prefix="worker-pool-test-")
+    scripts = {
+        "parent.py": "import os\nprint(os.getppid())\n",
+        "fails.py": "def helper():\n    raise KeyError('missing')\n\nhelper()\n",
+        "exits.py": "import sys\nprint('bye')\nsys.exit(3)\n",
+        "chatty.py": "while True:\n    print('x' * 1000)\n",
+    }
+    for name, source in scripts.items():
+        write_file(workspace, name, source)
+    pool = PythonWorkerPool(size=1)
+    try:
+        runs = [pool.run(os.path.join(workspace, "parent.py"), [], workspace, 10) for _ in range(2)]
+        parents = {run.stdout.text().strip() for run in runs}
+        print(f"Test 1: both runs forked from the same warm interpreter: {len(parents) == 1 and str(os.getpid()) not in parents}")
+
+        failed = pool.run(os.path.join(workspace, "fails.py"), [], workspace, 10)
+        traceback_lines = failed.stderr.text().strip().splitlines()
+        print(f"Test 2: an exception exits with code {failed.returncode}; traceback ends with {traceback_lines[-1]!r}")
+        print(f"traceback starts at the script: {'runpy' not in failed.stderr.text()}")
+
+        exited = pool.run(os.path.join(workspace, "exits.py"), ["arg"], workspace, 10)
+        print(f"Test 3: sys.exit(3) gives code {exited.returncode} after printing {exited.stdout.text().strip()!r}")
+
+        chatty = pool.run(os.path.join(workspace, "chatty.py"), [], workspace, 10, max_output_bytes=1_000_000)
+        print(f"Test 4: endless output is killed at the limit: {chatty.output_limit_reached}, code {chatty.returncode}")
+        print(f"the pool still works afterwards: {pool.run(os.path.join(workspace, 'exits.py'), [], workspace, 10).returncode == 3}")
+    finally:
+        pool.close()
+    shutil.rmtree(workspace)
+
+    print("\nTesting bounded output capture:")
+    print("=" * 60)
+
+    from functions.output_capture import HeadTailBuffer, run_captured
+
+    buffer = HeadTailBuffer(head_bytes=10, tail_bytes=5)
+    for chunk in (b"0123456789", b"abcdefghij", b"KLMNO"):
+        buffer.write(chunk)
+    print(f"Test 1: {buffer.total_bytes} bytes kept as {buffer.text()!r}")
+    print(f"label: {buffer.label()!r}")
+
+    small = HeadTailBuffer(head_bytes=10, tail_bytes=5)
+    small.write(b"short")
+    print(f"Test 2: output within the head is not marked: {small.text()!r}, truncated={small.truncated}")
+
+    command = [sys.executable, "-c", "import sys\nfor i in range(100000): print(i)\nprint('err', file=sys.stderr)\nsys.exit(2)"]
+    captured = run_captured(command, ".", 30)
+    print(f"Test 3: {captured.stdout.total_bytes} bytes of stdout, {len(captured.stdout.head) + len(captured.stdout.tail)} kept, exit code {captured.returncode}")
+    print(f"ends with the last line: {captured.stdout.text().endswith('99999' + chr(10))}, marker present: {'bytes omitted' in captured.stdout.text()}")
+    print(f"stderr: {captured.stderr.text().strip()!r}")
+
+    captured = run_captured([sys.executable, "-c", "while True: print('x' * 1000)"], ".", 30, max_output_bytes=500_000)
+    print(f"Test 4: endless output killed: {captured.output_limit_reached}, code {captured.returncode}")
+
+    print("\nTesting batch sessions on the asyncio loop:")
+    print("=" * 60)
+
+    from agent.async_loop import run_batch
+
+    batch_dir = tempfile.mkdtemp(prefix="batch-test-")
+    answers = os.path.join(batch_dir, "answers.jsonl")
+    with open(answers, "w", encoding="utf-8") as file:
+        for n in range(3):
+            response = {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": f"answer {n}"}]}}],
+                "usageMetadata": {"promptTokenCount": 10, "candidatesTokenCount": 2, "totalTokenCount": 12},
+            }
+            file.write(json.dumps({"step": n + 1, "response": response}) + "\n")
+    prompts = os.path.join(batch_dir, "prompts.jsonl")
+    with open(prompts, "w", encoding="utf-8") as file:
+        for n in range(3):
+            file.write(json.dumps({"id": f"p{n}", "prompt": f"question {n}", "working_directory": "calculator"}) + "\n")
+    results_path = os.path.join(batch_dir, "results.jsonl")
+    replayed = ReplayBackend(answers, latency=0.2)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        count = asyncio.run(run_batch(replayed, prompts, results_path, concurrency=3))
+    elapsed = time.perf_counter() - started
+    with open(results_path, encoding="utf-8") as file:
+        results = [json.loads(line) for line in file]
+    print(f"Test 1: {count} sessions, {len(results)} result lines, ids {sorted(result['id'] for result in results)}")
+    print(f"answers: {sorted(result['text'] for result in results)}, errors: {[result['error'] for result in results]}")
+    print(f"each session has its own tokens: {[result['prompt_tokens'] for result in results]}")
+    serial = sum(replayed.latency * len(replayed._chunks(record)) for record in replayed.records)
+    print(f"Test 2: replayed latency overlaps across sessions: {elapsed < serial * 2 / 3}")
+
+    with open(prompts, "w", encoding="utf-8") as file:
+        for n in range(2):
+            file.write(json.dumps({"id": f"copy{n}", "prompt": f"question {n}"}) + "\n")
+    for keep in (False, True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(run_batch(ReplayBackend(answers), prompts, results_path, keep_workspaces=keep))
+        with open(results_path, encoding="utf-8") as file:
+            workspaces = [json.loads(line)["working_directory"] for line in file]
+        left = [path for path in workspaces if path is not None and os.path.isdir(path)]
+        print(f"Test {3 + keep}: keep_workspaces={keep}: {len(left)} of {len(workspaces)} session copies left behind")
+        for path in left:
+            shutil.rmtree(path)
+
+    from unittest import mock
+    from agent.async_loop import run_session_async
+
+    with open(answers, "w", encoding="utf-8") as file:
+        for n, part in enumerate([{"function_call": {"name": "get_files_info", "args": {}}}, {"text": "done"}], start=1):
+            file.write(json.dumps({"step": n, "response": {"candidates": [{"content": {"role": "model", "parts": [part]}}]}}) + "\n")
+    with mock.patch("agent.async_loop.call_function", return_value=types.Content(role="tool", parts=[])):
+        result = asyncio.run(run_session_async(ReplayBackend(answers), "hello", "calculator"))
+    print(f"Test 5: an invalid tool response ends the session: steps={result['steps']}, text={result['text']!r}, error={result['error']!r}")
+    shutil.rmtree(batch_dir)
+
+    print("\nTesting record and replay backends:")
+    print("=" * 60)
+
+    from agent.backends import RecordingBackend
+    from benchmarks import agent_bench
+
+    record_dir = tempfile.mkdtemp(prefix="record-test-")
+    recording = os.path.join(record_dir, "recording.jsonl")
+    backend = RecordingBackend(ReplayBackend(replay.replace("large_reads", "explore")), recording)
+    with contextlib.redirect_stdout(io.StringIO()):
+        first, first_messages = run_session(backend, "What does the calculator project contain?", working_directory="calculator")
+        second, second_messages = run_session(ReplayBackend(recording), "What does the calculator project contain?", working_directory="calculator")
+    print(f"Test 1: recorded {backend.step} responses; the replay gives the same answer: {first.text == second.text}")
+    print(f"same number of messages: {len(first_messages) == len(second_messages)}")
+    shutil.rmtree(record_dir)
+
+    for name in sorted(agent_bench.SCRIPTS):
+        wall, steps, _, prompt_tokens = agent_bench.run_once(os.path.join(agent_bench.SESSIONS_DIR, f"{name}.jsonl"))
+        print(f"Test 2: benchmark session {name}: {len(steps)} steps, history grows: {steps[-1][3] > steps[0][3]}, prompt tokens > 0: {prompt_tokens > 0}")
+
+    print("\nTesting tracing and token accounting:")
+    print("=" * 60)
+
+    from agent.tracing import Tracer
+
+    trace_dir = tempfile.mkdtemp(prefix="trace-test-")
+    turns = [
+        ({"function_call": {"name": "get_file_content", "args": {"file_path": "main.py"}}}, (10, 2, 12)),
+        ({"text": "It is a calculator."}, (20, 3, 23)),
+    ]
+    session = os.path.join(trace_dir, "session.jsonl")
+    with open(session, "w", encoding="utf-8") as file:
+        for step, (part, (prompt_count, response_count, total_count)) in enumerate(turns, start=1):
+            response = {
+                "candidates": [{"content": {"role": "model", "parts": [part]}}],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_count,
+                    "candidatesTokenCount": response_count,
+                    "totalTokenCount": total_count,
+                },
+            }
+            file.write(json.dumps({"step": step, "response": response}) + "\n")
+    tracer = Tracer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_session(ReplayBackend(session), "What is this?", working_directory="calculator", tracer=tracer)
+    calls, _, returned = tracer.tools["get_file_content"]
+    print(f"Test 1: tokens summed over steps: prompt={tracer.prompt_tokens} response={tracer.response_tokens} total={tracer.total_tokens}")
+    print(f"model calls: {tracer.model_calls}, get_file_content: {calls} call, bytes returned match main.py: {returned == len(get_file_content('calculator', 'main.py'))}")
+    print("summary:")
+    print(tracer.summary())
+
+    tracer.write(os.path.join(trace_dir, "trace.jsonl"))
+    tracer.write(os.path.join(trace_dir, "trace.json"))
+    with open(os.path.join(trace_dir, "trace.jsonl"), encoding="utf-8") as file:
+        spans = [json.loads(line) for line in file]
+    with open(os.path.join(trace_dir, "trace.json"), encoding="utf-8") as file:
+        chrome = json.load(file)["traceEvents"]
+    print(f"Test 2: span categories: {sorted(set(span['cat'] for span in spans))}")
+    print(f"chrome trace has one complete event per span: {sum(event['ph'] == 'X' for event in chrome) == len(spans)}")
+    shutil.rmtree(trace_dir)
+
+    print("\nTesting the calculator benchmark harness:")
+    print("=" * 60)
+
+    from unittest import mock
+    from benchmarks import calculator_bench
+
+    cases = calculator_bench.build_cases()
+    for function, _ in cases.values():
+        function()
+    print(f"Test 1: every case runs once: {', '.join(cases)}")
+
+    bench_dir = tempfile.mkdtemp(prefix="bench-test-")
+    baseline_path = os.path.join(bench_dir, "baseline.json")
+    with open(baseline_path, "w", encoding="utf-8") as file:
+        unreachable = {"ops_per_second": 1e15, "calibration": 1.0}
+        json.dump({"render_many": unreachable, "evaluate_batch_rows": unreachable}, file)
+
+    def run_bench(*args):
+        with mock.patch.multiple(calculator_bench, BASELINE_PATH=baseline_path, REPEATS=1, RETRIES=0), \
+                mock.patch.object(sys, "argv", ["calculator_bench.py", *args]), \
+                contextlib.redirect_stdout(io.StringIO()) as output:
+            try:
+                calculator_bench.main()
+                code = 0
+            except SystemExit as e:
+                code = e.code
+        return code, output.getvalue()
+
+    code, output = run_bench("--only", "render_many")
+    print(f"Test 2: a case far below its baseline fails the run: exit code {code}, flagged: {'REGRESSION' in output}")
+    if "evaluate_batch_rows" in cases:
+        code, output = run_bench("--only", "evaluate_batch_rows")
+        print(f"Test 3: an ungated case only reports: exit code {code}, flagged: {'REGRESSION' in output}")
+    code, _ = run_bench("--only", "render_many", "--save-baseline")
+    with open(baseline_path, encoding="utf-8") as file:
+        saved = json.load(file)["render_many"]
+    print(f"Test 4: --save-baseline replaces the baseline: exit code {code}, replaced: {saved != unreachable}")
+    shutil.rmtree(bench_dir)
+
+    print("\nTesting generated tool declarations:")
+    print("=" * 60)
+
+    for func in (get_files_info, get_file_content, run_python_file, write_file, edit_file, search_files, read_files, run_tests):
+        schema = declaration(func)
+        print(f"{schema.name}: {schema.description}")
+        print(f"    parameters: {', '.join(schema.parameters.properties)}")
+        print(f"    required: {', '.join(schema.parameters.required or [])}")
+
+    print("\nTesting rate-limited retries against a local fake server:")
+    print("=" * 60)
+
+    from google.genai import types
+
+    contents = [types.Content(role="user", parts=[types.Part(text="hello")])]
+    exhausted = {"code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}
+    retry_info = {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "0.05s"}
+
+    print("Test 1: 429 with Retry-After, 429 with RetryInfo, 503, then success")
+    server = fake_model_server([
+        (429, {"Retry-After": "0"}, {"error": exhausted}),
+        (429, {}, {"error": dict(exhausted, details=[retry_info])}),
+        (503, {}, {"error": {"code": 503, "message": "Unavailable", "status": "UNAVAILABLE"}}),
+    ])
+    backend = fake_model_backend(server)
+    response = backend.generate_content("test-model", contents, None)
+    print(f"text: {response.text}, retries: {backend.retries}")
+    server.shutdown()
+
+    print("\nTest 2: a 400 is not retried")
+    server = fake_model_server([(400, {}, {"error": {"code": 400, "message": "Bad request", "status": "INVALID_ARGUMENT"}})])
+    backend = fake_model_backend(server)
+    try:
+        backend.generate_content("test-model", contents, None)
+    except Exception as e:
+        print(f"raised {type(e).__name__} {e.code}, retries: {backend.retries}")
+    server.shutdown()
+
+    print("\nTest 3: concurrent async sessions sharing one limiter")
+    server = fake_model_server([(429, {"Retry-After": "0"}, {"error": exhausted})] * 3)
+    backend = fake_model_backend(server, RateLimiter(requests_per_minute=6000))
+
+    async def sessions():
+        return await asyncio.gather(
+            *(backend.generate_content_async("test-model", contents, None) for _ in range(4))
+        )
+
+    print([response.text for response in asyncio.run(sessions())], f"retries: {backend.retries}")
+    server.shutdown()
+
+    print("\nTest 4: token bucket spacing (fake clock)")
+    now = [0.0]
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=1000, clock=lambda: now[0])
+    print("waits for 4 requests:", [limiter.reserve(100) for _ in range(4)])
+    now[0] = 60.0
+    limiter.settle(100, 900)
+    print("wait after using 800 more tokens than estimated:", limiter.reserve(100))
+
+    print("\nTesting streamed responses:")
+    print("=" * 60)
+
+    response = types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(
+                    role="model",
+                    parts=[
+                        types.Part(text="Reading both files before answering. " * 3),
+                        types.Part(function_call=types.FunctionCall(name="get_file_content", args={"file_path": "main.py"})),
+                        types.Part(function_call=types.FunctionCall(name="get_files_info", args={"directory": "pkg"})),
+                    ],
+                ),
+                finish_reason="STOP",
+            )
+        ],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(total_token_count=42),
+    )
+    assembler = StreamAssembler()
+    arrivals = []
+    for chunk in split_response(response, text_chunk=16):
+        text, function_calls = assembler.add(chunk)
+        arrivals.append(text or ", ".join(call.name for call in function_calls))
+    print(f"{len(arrivals)} chunks: {arrivals}")
+    assembled = assembler.response()
+    print("same content as the whole response:", assembled.candidates[0].content == response.candidates[0].content)
+    print("usage and finish reason kept:", assembled.usage_metadata.total_token_count, assembled.candidates[0].finish_reason)
+
 if __name__ == "__main__":
     main()